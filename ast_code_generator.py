@@ -0,0 +1,170 @@
+import ast
+import gc
+
+from code_generator import CodeGenerator
+from ir import Const, parse_ir
+
+# Operator and context nodes carry no location, so one instance of each is shared.
+BINARY_OPERATORS = {"+": ast.Add(), "-": ast.Sub(), "*": ast.Mult(), "/": ast.Div(), "%": ast.Mod()}
+COMPARE_OPERATORS = {
+    "<": ast.Lt(), ">": ast.Gt(), "<=": ast.LtE(), ">=": ast.GtE(), "==": ast.Eq(), "!=": ast.NotEq(),
+}
+BOOL_OPERATORS = {"&&": ast.And(), "||": ast.Or()}
+_LOAD = ast.Load()
+_STORE = ast.Store()
+
+_literals = {}
+
+
+def _literal(const):
+    # Literals keep their Python meaning: the text backend emits them verbatim.
+    value = _literals.get(const.text, _literals)
+    if value is _literals:
+        try:
+            value = _literals[const.text] = ast.literal_eval(const.text)
+        except (ValueError, SyntaxError):
+            raise Exception(f"Erro de geração de código: literal inválido: {const.text}")
+    return value
+
+
+class ASTCodeGenerator(CodeGenerator):
+    # Same structuring as CodeGenerator, but builds an ast.Module instead of
+    # source text, so it can be compiled without a round trip through the
+    # parser. Every statement gets the line number it has in the text output,
+    # so tracebacks point at the same lines as the generated .py file.
+    def __init__(self, ir_code, filename="<charmeleon>"):
+        super().__init__(ir_code)
+        self.filename = filename
+        self.module = ast.Module(body=[], type_ignores=[])
+        self.blocks = [self.module.body]
+        self.line = 0
+
+    def _add(self, node):
+        self.line += 1
+        node.lineno = node.end_lineno = self.line
+        node.col_offset = node.end_col_offset = 4 * (len(self.blocks) - 1)
+        self.blocks[-1].append(node)
+        return node
+
+    def _at(self, node):
+        # Expressions are built just before the statement holding them is
+        # added, so they get its line and column; this spares the module-wide
+        # walk of ast.fix_missing_locations.
+        node.lineno = self.line + 1
+        node.col_offset = 4 * (len(self.blocks) - 1)
+        return node
+
+    def _name(self, name, ctx=_LOAD):
+        return self._at(ast.Name(name, ctx))
+
+    def _operand(self, arg):
+        if arg.__class__ is Const:
+            return self._at(ast.Constant(_literal(arg)))
+        return self._name(arg.text)
+
+    def _binary(self, instr):
+        left, right = instr.args
+        left, right = self._operand(left), self._operand(right)
+        operator = instr.operator
+        if operator in BINARY_OPERATORS:
+            return self._at(ast.BinOp(left, BINARY_OPERATORS[operator], right))
+        if operator in COMPARE_OPERATORS:
+            return self._at(ast.Compare(left, [COMPARE_OPERATORS[operator]], [right]))
+        if operator in BOOL_OPERATORS:
+            return self._at(ast.BoolOp(BOOL_OPERATORS[operator], [left, right]))
+        raise Exception(f"Erro de geração de código: operador desconhecido: {operator}")
+
+    def _assign(self, dest, value):
+        self._add(ast.Assign([self._name(dest.text, _STORE)], value))
+
+    def _print(self, value):
+        self._add(ast.Expr(self._at(ast.Call(self._name("print"), [value], []))))
+
+    def _return(self, value):
+        self._add(ast.Return(value))
+
+    def _comment(self, text):
+        self.line += 1
+
+    def _blank(self):
+        self.line += 1
+
+    def _open_def(self, name):
+        arguments = ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[], kw_defaults=[],
+                                  kwarg=None, defaults=[])
+        self._open_node(ast.FunctionDef(name, arguments, [], [], None))
+
+    def _open_while(self, cond):
+        self._open_node(ast.While(cond, [], []))
+
+    def _open_if(self, cond):
+        self._open_node(ast.If(cond, [], []))
+
+    def _open_else(self):
+        # The else branch belongs to the `if` just closed.
+        self.line += 1
+        self.blocks.append(self.blocks[-1][-1].orelse)
+
+    def _open_for(self, target, bounds):
+        call = self._at(ast.Call(self._name("range"), bounds, []))
+        self._open_node(ast.For(self._name(target.text, _STORE), call, [], []))
+
+    def _open_node(self, node):
+        self._add(node)
+        self.blocks.append(node.body)
+
+    def _mark(self):
+        return self.line
+
+    def _close(self, mark=None):
+        body = self.blocks.pop()
+        if not body:
+            # Only takes a line of its own when the text output has one.
+            if mark is not None:
+                self.line += 1
+            body.append(ast.Pass(lineno=self.line, col_offset=4 * len(self.blocks),
+                                 end_lineno=self.line, end_col_offset=4 * len(self.blocks)))
+
+    def _close_else(self, mark):
+        if not self.blocks.pop():
+            # The text output drops the "else:" and any comments under it.
+            self.line = mark - 1
+
+    def gen(self):
+        # Hundreds of thousands of small nodes, none in a reference cycle: the
+        # cyclic collector would only rescan them over and over.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return super().gen()
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _result(self):
+        return self.module
+
+    def compile(self):
+        # Builds the module and returns its code object.
+        return compile(self.gen(), self.filename, "exec")
+
+
+if __name__ == "__main__":
+    ir_code_example = [
+        "FUNC main:",
+        "ASSIGN x, 3",
+        "L1:",
+        "BIN_OP t1, x, >, 0",
+        "IF_FALSE t1 GOTO L2",
+        "PRINT x",
+        "BIN_OP t2, x, -, 1",
+        "ASSIGN x, t2",
+        "GOTO L1",
+        "L2:",
+        "END_FUNC main",
+    ]
+    module = ASTCodeGenerator(parse_ir(ir_code_example)).gen()
+    print(ast.unparse(module))
+    namespace = {}
+    exec(compile(module, "<charmeleon>", "exec"), namespace)
+    namespace["main"]()
@@ -0,0 +1,242 @@
+from types import MappingProxyType
+
+_NO_METADATA = MappingProxyType({})
+
+
+class Node:
+    # Base of the typed AST. Every concrete class declares its own __slots__ and
+    # a small integer `kind` used by the passes to index their dispatch tables.
+    # `position` is the source offset of the node's first token (of the
+    # operator, for binary expressions), or None for nodes built by hand.
+    __slots__ = ("position",)
+    kind = -1
+    type = "Node"
+    value = None
+    children = ()
+    metadata = _NO_METADATA
+
+    def __repr__(self):
+        return f"ASTNode(type=\\\\\\\\\'{self.type}\\\\\\, value={self.value!r}, children={list(self.children)}, metadata={dict(self.metadata)})"
+
+
+class Program(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, children, position=None):
+        self.children = children
+        self.position = position
+
+
+class FunctionDeclaration(Node):
+    __slots__ = ("value", "params", "body", "return_type")
+
+    def __init__(self, value, params, body, return_type=None, position=None):
+        self.value = value
+        self.params = params
+        self.body = body
+        self.return_type = return_type
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.params, self.body]
+
+    @property
+    def metadata(self):
+        return {"return_type": self.return_type}
+
+
+class ParameterList(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, children, position=None):
+        self.children = children
+        self.position = position
+
+
+class Parameter(Node):
+    __slots__ = ("value", "param_type")
+
+    def __init__(self, value, param_type, position=None):
+        self.value = value
+        self.param_type = param_type
+        self.position = position
+
+    @property
+    def metadata(self):
+        return {"type": self.param_type}
+
+
+class Block(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, children, position=None):
+        self.children = children
+        self.position = position
+
+
+class VariableDeclaration(Node):
+    __slots__ = ("value", "expr", "var_type")
+
+    def __init__(self, value, expr, var_type=None, position=None):
+        self.value = value
+        self.expr = expr
+        self.var_type = var_type
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.expr]
+
+    @property
+    def metadata(self):
+        return {"type": self.var_type}
+
+
+class AssignmentStatement(Node):
+    __slots__ = ("value", "expr")
+
+    def __init__(self, value, expr, position=None):
+        self.value = value
+        self.expr = expr
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.expr]
+
+
+class IfStatement(Node):
+    __slots__ = ("condition", "then_block", "else_block")
+
+    def __init__(self, condition, then_block, else_block=None, position=None):
+        self.condition = condition
+        self.then_block = then_block
+        self.else_block = else_block
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.condition, self.then_block, self.else_block]
+
+
+class ForStatement(Node):
+    __slots__ = ("init", "condition", "update", "body")
+
+    def __init__(self, init, condition, update, body, position=None):
+        self.init = init
+        self.condition = condition
+        self.update = update
+        self.body = body
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.init, self.condition, self.update, self.body]
+
+
+class WhileStatement(Node):
+    __slots__ = ("condition", "body")
+
+    def __init__(self, condition, body, position=None):
+        self.condition = condition
+        self.body = body
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.condition, self.body]
+
+
+class ReturnStatement(Node):
+    __slots__ = ("expr",)
+
+    def __init__(self, expr, position=None):
+        self.expr = expr
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.expr]
+
+
+class PrintStatement(Node):
+    __slots__ = ("expr",)
+
+    def __init__(self, expr, position=None):
+        self.expr = expr
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.expr]
+
+
+class BinaryExpression(Node):
+    __slots__ = ("value", "left", "right")
+
+    def __init__(self, value, left, right, position=None):
+        self.value = value
+        self.left = left
+        self.right = right
+        self.position = position
+
+    @property
+    def children(self):
+        return [self.left, self.right]
+
+
+class NumberLiteral(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value, position=None):
+        self.value = value
+        self.position = position
+
+
+class StringLiteral(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value, position=None):
+        self.value = value
+        self.position = position
+
+
+class Identifier(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value, position=None):
+        self.value = value
+        self.position = position
+
+
+NODE_CLASSES = (
+    Program, FunctionDeclaration, ParameterList, Parameter, Block,
+    VariableDeclaration, AssignmentStatement, IfStatement, ForStatement,
+    WhileStatement, ReturnStatement, PrintStatement, BinaryExpression,
+    NumberLiteral, StringLiteral, Identifier,
+)
+
+for _kind, _cls in enumerate(NODE_CLASSES):
+    _cls.kind = _kind
+    _cls.type = _cls.__name__
+
+NODE_KINDS = {cls.__name__: cls.kind for cls in NODE_CLASSES}
+# Extra slot at the end of every dispatch table for nodes of unknown type.
+UNKNOWN_KIND = len(NODE_CLASSES)
+
+_dispatch_tables = {}
+
+
+def dispatch_table(visitor_class, default="generic_visit", prefix="visit_"):
+    # List indexed by node kind holding <prefix><Type> when the visitor defines
+    # it and its `default` method otherwise (None when default is None). Built
+    # once per visitor class.
+    key = (visitor_class, default, prefix)
+    table = _dispatch_tables.get(key)
+    if table is None:
+        fallback = getattr(visitor_class, default) if default is not None else None
+        table = [getattr(visitor_class, f"{prefix}{cls.__name__}", fallback) for cls in NODE_CLASSES]
+        table.append(fallback)
+        _dispatch_tables[key] = table
+    return table
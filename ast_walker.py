@@ -0,0 +1,154 @@
+from inspect import isgeneratorfunction
+
+from ast_nodes import dispatch_table
+
+_RESUME = 0
+_REDUCE = 1
+
+
+class Walker:
+    # Non-recursive AST traversal shared by the compiler passes. Pending work
+    # lives on an explicit stack, so tree depth is bounded by memory rather than
+    # by the interpreter's recursion limit. Per node kind, a pass may define:
+    #
+    #   visit_<Type>(node)  returns the node's result directly, or is a generator
+    #                       that yields child nodes and is sent each child's
+    #                       result back (`left = yield node.left`);
+    #   leave_<Type>(node, *child_results)
+    #                       post-order hook, called once all of node.children
+    #                       have been walked;
+    #
+    # and otherwise the walker just descends into the children. enter(node) and
+    # leave(node, result) are optional pre/post hooks run for every node.
+    #
+    # Shallow subtrees are walked with plain recursion, which is cheaper per
+    # node in CPython; below RECURSION_BUDGET levels the explicit stack takes over.
+    RECURSION_BUDGET = 200
+
+    def __init__(self):
+        cls = type(self)
+        visits = dispatch_table(cls, default=None)
+        # Generator visitors suspend on the stack; plain ones are simply called.
+        self._generators = [v if v is not None and isgeneratorfunction(v) else None for v in visits]
+        self._plain = [v if v is not None and not isgeneratorfunction(v) else None for v in visits]
+        self._leaves = dispatch_table(cls, default=None, prefix="leave_")
+        self._has_enter = cls.enter is not Walker.enter
+        self._has_leave = cls.leave is not Walker.leave
+
+    def enter(self, node):
+        pass
+
+    def leave(self, node, result):
+        pass
+
+    def generic_visit(self, node):
+        for child in node.children:
+            if child is not None:
+                yield child
+
+    def visit(self, node):
+        return self.walk(node)
+
+    def walk(self, root):
+        generators = self._generators
+        plain = self._plain
+        leaves = self._leaves
+        enter = self.enter if self._has_enter else None
+        leave = self.leave if self._has_leave else None
+        hooked = enter is not None or leave is not None
+        walk_iterative = self.walk_iterative
+
+        def walk(node, budget):
+            if node is None:
+                return None
+            if not budget:
+                return walk_iterative(node)
+            budget -= 1
+            if enter is not None:
+                enter(node)
+            kind = node.kind
+            visit = plain[kind]
+            if visit is not None:
+                value = visit(self, node)
+            elif generators[kind] is not None:
+                generator = generators[kind](self, node)
+                try:
+                    child = generator.send(None)
+                    while True:
+                        child = generator.send(walk(child, budget))
+                except StopIteration as stop:
+                    value = stop.value
+            else:
+                func = leaves[kind]
+                if func is not None:
+                    args = []
+                    for child in node.children:
+                        # Plain leaf visitors are called in place when no hooks run.
+                        visit = plain[child.kind] if child is not None and not hooked else None
+                        args.append(visit(self, child) if visit is not None else walk(child, budget))
+                    value = func(self, node, *args)
+                else:
+                    for child in node.children:
+                        walk(child, budget)
+                    value = None
+            if leave is not None:
+                leave(node, value)
+            return value
+
+        return walk(root, self.RECURSION_BUDGET)
+
+    def walk_iterative(self, root):
+        generators = self._generators
+        plain = self._plain
+        leaves = self._leaves
+        enter = self.enter if self._has_enter else None
+        leave = self.leave if self._has_leave else None
+        stack = [root]
+        results = []
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            item = pop()
+            if item is None:
+                results.append(None)
+            elif item.__class__ is tuple:
+                if item[0] is _RESUME:
+                    try:
+                        child = item[1].send(results.pop())
+                    except StopIteration as stop:
+                        value = stop.value
+                        if leave is not None:
+                            leave(item[2], value)
+                        results.append(value)
+                    else:
+                        push(item)
+                        push(child)
+                else:
+                    _, func, node, count = item
+                    if count:
+                        args = results[-count:]
+                        del results[-count:]
+                    else:
+                        args = ()
+                    value = func(self, node, *args) if func is not None else None
+                    if leave is not None:
+                        leave(node, value)
+                    results.append(value)
+            else:
+                if enter is not None:
+                    enter(item)
+                kind = item.kind
+                visit = plain[kind]
+                if visit is not None:
+                    value = visit(self, item)
+                    if leave is not None:
+                        leave(item, value)
+                    results.append(value)
+                elif generators[kind] is not None:
+                    results.append(None)
+                    push((_RESUME, generators[kind](self, item), item))
+                else:
+                    children = item.children
+                    push((_REDUCE, leaves[kind], item, len(children)))
+                    stack.extend(reversed(children))
+        return results[-1]
@@ -0,0 +1,122 @@
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bytecode import write_pyc
+from compile_cache import CompileCache
+from ir import format_ir
+from main import DEFAULT_OPT_LEVEL, _compile, compile_cached, output_path
+
+SOURCE_SUFFIX = ".charmeleon"
+
+
+def expand_inputs(patterns):
+    # Files, directories (searched recursively for .charmeleon files) and glob
+    # patterns, flattened into a sorted list without duplicates.
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in files if name.endswith(SOURCE_SUFFIX))
+        elif glob.has_magic(pattern):
+            paths.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+_caches = {}
+
+
+def compile_file(input_file, cache_dir=None, opt_level=DEFAULT_OPT_LEVEL, emit_pyc=False, emit_ir=False):
+    # Compiles one file and writes its .py next to it (with emit_pyc, also its
+    # bytecode under __pycache__; with emit_ir, the optimized IR in a .ir file).
+    # Runs inside the worker processes, so it returns a plain tuple:
+    # (path, SAST report, error, seconds).
+    start = time.perf_counter()
+    try:
+        with open(input_file, "r", encoding="utf-8") as f:
+            source_code = f.read()
+        if cache_dir is None:
+            sast_report, python_code, ir_code = _compile(source_code, opt_level=opt_level)
+            ir_lines = format_ir(ir_code) if emit_ir else None
+        else:
+            cache = _caches.get(cache_dir)
+            if cache is None:
+                cache = _caches[cache_dir] = CompileCache(cache_dir)
+            sast_report, python_code, ir_lines = compile_cached(source_code, cache, keep_ir=emit_ir, opt_level=opt_level)
+        py_file = output_path(input_file)
+        with open(py_file, "w", encoding="utf-8") as f:
+            f.write(python_code)
+        if emit_pyc:
+            write_pyc(py_file, python_code)
+        if emit_ir:
+            with open(py_file[:-3] + ".ir", "w", encoding="utf-8") as f:
+                f.write("\n".join(ir_lines) + "\n")
+        error = None
+    except Exception as e:
+        sast_report = None
+        error = str(e)
+    return input_file, sast_report, error, time.perf_counter() - start
+
+
+def _compile_file_star(args):
+    return compile_file(*args)
+
+
+def compile_batch(input_files, workers=None, chunksize=None, cache_dir=None, opt_level=DEFAULT_OPT_LEVEL,
+                  emit_pyc=False, emit_ir=False):
+    # Results come back in input order whatever the worker scheduling was.
+    workers = workers or os.cpu_count() or 1
+    jobs = [(input_file, cache_dir, opt_level, emit_pyc, emit_ir) for input_file in input_files]
+    if workers == 1 or len(jobs) < 2:
+        return [compile_file(*job) for job in jobs]
+    if chunksize is None:
+        # A few chunks per worker keeps the pool busy without much IPC per file.
+        chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_compile_file_star, jobs, chunksize=chunksize))
+
+
+def merge_sast_reports(results):
+    # One report for the whole batch, with each file's findings under its path.
+    lines = ["Resultados da Análise SAST:"]
+    findings = 0
+    for input_file, sast_report, error, _ in results:
+        if error is not None:
+            continue
+        body = sast_report.split("\n", 1)[1]
+        if body.startswith("- Tipo:"):
+            lines.append(f"Arquivo: {input_file}")
+            lines.append(body.rstrip("\n"))
+            findings += body.count("\n- Tipo:") + 1
+    if findings == 0:
+        lines.append("Nenhuma vulnerabilidade encontrada.")
+    return "\n".join(lines) + "\n", findings
+
+
+def run_batch(patterns, workers=None, chunksize=None, cache_dir=None, out=sys.stderr, opt_level=DEFAULT_OPT_LEVEL,
+              emit_pyc=False, emit_ir=False):
+    # Compiles everything matched by `patterns` and prints the merged SAST report
+    # plus a timing summary. Returns the number of files that failed.
+    input_files = expand_inputs(patterns)
+    start = time.perf_counter()
+    results = compile_batch(input_files, workers, chunksize, cache_dir, opt_level, emit_pyc, emit_ir)
+    elapsed = time.perf_counter() - start
+
+    sast_report, findings = merge_sast_reports(results)
+    print("\n" + "="*30 + "\nResultados da Análise SAST\n" + "="*30, file=out)
+    print("\n" + sast_report, file=out)
+
+    failures = 0
+    print("Tempo por arquivo:", file=out)
+    for input_file, _, error, seconds in results:
+        status = "ok" if error is None else "erro: " + error.replace("\n", "\n" + " " * 16)
+        print(f"  {seconds * 1000:9.1f} ms  {input_file}  {status}", file=out)
+        failures += error is not None
+    total = sum(seconds for _, _, _, seconds in results)
+    print(f"{len(results)} arquivos ({failures} com erro, {findings} vulnerabilidades) em {elapsed:.2f}s "
+          f"(soma dos tempos por arquivo: {total:.2f}s)", file=out)
+    return failures
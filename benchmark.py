@@ -0,0 +1,524 @@
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from ast_nodes import dispatch_table
+from ir import BIN_OP
+from ir_generator import IRGenerator
+from optimizer import Optimizer
+from lexer import Lexer, StreamingLexer, relex
+from parser import ASTNode, Parser
+from sast_analyzer import SASTAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+
+
+def generate_source(functions=200, statements=50):
+    # Synthetic program in the shape of our generated handlers.
+    lines = []
+    for f in range(functions):
+        lines.append(f"func handler_{f}(a: int, b: int) -> int {{")
+        lines.append("    var total = 0;")
+        for s in range(statements):
+            lines.append(f"    var v{s} = a * {s} + b - (total / 3);")
+            lines.append(f"    if (v{s} > {s}) {{ total = total + v{s}; }} else {{ print(\"v{s}\"); }}")
+        lines.append("    for (var i = 0; i < 10; i = i + 1) { total = total + i; } /* fim */")
+        lines.append("    return total;")
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def timed(fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_lexer(source):
+    legacy_time, legacy_tokens = timed(lambda: Lexer(source).tokenize_legacy(), repeat=1)
+    new_time, new_tokens = timed(lambda: Lexer(source).tokenize())
+    assert new_tokens == legacy_tokens, "fluxo de tokens divergente"
+    count = len(new_tokens)
+    print(f"lexer: {count} tokens")
+    print(f"  legado:        {count / legacy_time:12.0f} tokens/s ({legacy_time:.3f}s)")
+    print(f"  master regex:  {count / new_time:12.0f} tokens/s ({new_time:.3f}s)")
+    print(f"  ganho:         {legacy_time / new_time:.1f}x")
+
+
+_RSS_SNIPPET = """
+import resource, sys, time
+from benchmark import generate_source
+from lexer import Lexer
+from parser import Parser
+source = generate_source(functions=530)
+start = time.perf_counter()
+lexer = Lexer(source)
+tokens = lexer.tokenize() if sys.argv[1] == "dicts" else lexer.tokenize_stream()
+Parser(tokens).parse()
+elapsed = time.perf_counter() - start
+print(len(tokens), elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def bench_tokens(source):
+    # Peak RSS needs a fresh process per mode; ~1M tokens each.
+    print("token stream (lex + parse, ~1M tokens, processo separado):")
+    for mode in ("dicts", "stream"):
+        out = subprocess.run([sys.executable, "-c", _RSS_SNIPPET, mode], capture_output=True, text=True, check=True)
+        count, elapsed, rss_kb = out.stdout.split()
+        print(f"  {mode:7s} {int(count)} tokens  {float(elapsed):6.2f}s  pico RSS {int(rss_kb) / 1024:7.1f} MB")
+
+
+def bench_streaming(source):
+    # Peak traced memory while only counting tokens, whole-buffer vs streaming.
+    chunks = [source[i:i + (1 << 16)] for i in range(0, len(source), 1 << 16)]
+    tracemalloc.start()
+    count = len(Lexer("".join(chunks)).tokenize_stream())
+    whole_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    streamed = sum(1 for _ in StreamingLexer(iter(chunks)))
+    stream_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert streamed == count
+    print(f"lexer streaming: {count} tokens")
+    print(f"  buffer inteiro: pico {whole_peak / 1024:10.0f} KiB")
+    print(f"  streaming:      pico {stream_peak / 1024:10.0f} KiB")
+
+
+def _to_legacy(node):
+    # Rebuilds a typed tree with the old dict-backed ASTNode, recursively.
+    if node is None:
+        return None
+    return ASTNode(node.type, node.value, [_to_legacy(c) for c in node.children], dict(node.metadata))
+
+
+class _LegacyCounter:
+    # Visitor using the previous per-node f-string + getattr dispatch.
+    def __init__(self):
+        self.count = 0
+
+    def visit(self, node):
+        visitor = getattr(self, f"visit_{node.type}", self.generic_visit)
+        return visitor(node)
+
+    def generic_visit(self, node):
+        self.count += 1
+        for child in node.children:
+            if child is not None:
+                self.visit(child)
+
+
+class _TableCounter(_LegacyCounter):
+    def __init__(self):
+        super().__init__()
+        self._dispatch = dispatch_table(type(self))
+
+    def visit(self, node):
+        return self._dispatch[node.kind](self, node)
+
+
+def _count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current is not None:
+            count += 1
+            stack.extend(current.children)
+    return count
+
+
+def bench_ast(source):
+    tokens = Lexer(source).tokenize_stream()
+    tracemalloc.start()
+    typed = Parser(tokens).parse()
+    typed_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    legacy = _to_legacy(typed)
+    tracemalloc.start()
+    legacy_copy = _to_legacy(typed)
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del legacy_copy
+    nodes = _count_nodes(typed)
+    print(f"AST: {nodes} nós")
+    print(f"  memória/nó  ASTNode: {legacy_bytes / nodes:6.1f} B   __slots__: {typed_bytes / nodes:6.1f} B")
+    legacy_time, _ = timed(lambda: _LegacyCounter().visit(legacy))
+    table_time, _ = timed(lambda: _TableCounter().visit(typed))
+    print(f"  visitante   getattr: {nodes / legacy_time:10.0f} nós/s   tabela por kind: {nodes / table_time:10.0f} nós/s")
+
+
+def bench_expressions(source):
+    # Parse time of one long operator chain and of deep parentheses, per term.
+    print("expressões (precedence climbing):")
+    for terms in (10000, 100000):
+        chain = Lexer(f"func main() {{ x = {' + '.join(['a * 2'] * terms)}; }}").tokenize_stream()
+        nested = Lexer("func main() { x = " + "(" * terms + "a" + ")" * terms + "; }").tokenize_stream()
+        chain_time, _ = timed(lambda: Parser(chain).parse())
+        nested_time, _ = timed(lambda: Parser(nested).parse())
+        print(f"  {terms:6d} termos: cadeia {chain_time * 1e6 / terms:6.2f} us/termo   parênteses {nested_time * 1e6 / terms:6.2f} us/nível")
+
+
+def _run_passes(ast, budget):
+    # Semantic + SAST + IR over one tree with the walker's recursion budget
+    # forced to `budget` (0 = explicit stack only).
+    passes = (SemanticAnalyzer(), SASTAnalyzer(), IRGenerator())
+    for walker in passes:
+        walker.RECURSION_BUDGET = budget
+    passes[0].analyze(ast)
+    passes[1].analyze(ast)
+    return passes[2].generate(ast)
+
+
+def bench_walkers(source):
+    ast = Parser(Lexer(source).tokenize_stream()).parse()
+    nodes = _count_nodes(ast)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(100000)
+    try:
+        recursive_time, recursive_ir = timed(lambda: _run_passes(ast, 100000))
+    finally:
+        sys.setrecursionlimit(limit)
+    hybrid_time, hybrid_ir = timed(lambda: _run_passes(ast, 200))
+    stack_time, stack_ir = timed(lambda: _run_passes(ast, 0))
+    assert recursive_ir == hybrid_ir == stack_ir
+    print(f"walkers (semântico + SAST + IR): {nodes} nós")
+    print(f"  recursivo:       {recursive_time:.3f}s")
+    print(f"  híbrido (200):   {hybrid_time:.3f}s")
+    print(f"  pilha explícita: {stack_time:.3f}s")
+    depth = 50000
+    # Literal operands only: resolving names through 50k nested scopes is a
+    # symbol-table cost, not a traversal one.
+    deep = Parser(Lexer("func main() { " + "if (1 > 0) { print(\"a\"); } else " * depth + "{ print(\"b\"); } }").tokenize_stream()).parse()
+    deep_time, _ = timed(lambda: _run_passes(deep, 200), repeat=1)
+    print(f"  {depth} else-if aninhados: {deep_time:.3f}s")
+
+
+def _separate_passes(ast):
+    SemanticAnalyzer().analyze(ast)
+    vulnerabilities = SASTAnalyzer().analyze(ast)
+    return vulnerabilities, IRGenerator().generate(ast)
+
+
+def bench_fused_front_end(source):
+    # Semantic analysis, SAST and IR generation as three walks of the AST
+    # against FusedFrontEnd's single one, on 1x and 4x the synthetic program.
+    from front_end import FusedFrontEnd
+    print("front end (semântico + SAST + IR):")
+    for scale in (1, 4):
+        ast = Parser(Lexer(generate_source(200 * scale)).tokenize_stream()).parse()
+        separate_time, (separate_findings, separate_ir) = timed(lambda: _separate_passes(ast))
+        fused_time, (fused_findings, fused_ir) = timed(lambda: FusedFrontEnd().run(ast))
+        assert fused_ir == separate_ir and len(fused_findings) == len(separate_findings)
+        print(f"  {_count_nodes(ast):8d} nós: três passes {separate_time:.3f}s   fundido {fused_time:.3f}s "
+              f"({separate_time / fused_time:.2f}x)")
+
+
+def bench_symbols(source):
+    # Name resolution at growing nesting depths: 2000 reads of a variable
+    # declared in the function scope, from inside `depth` nested ifs.
+    print("resolução de nomes (análise semântica) por profundidade de aninhamento:")
+    reads = 2000
+    for depth in (1, 10, 100, 250):
+        code = ("func main() { var x = 1; " + "if (1 > 0) { " * depth + "print(x);" * reads
+                + " }" * depth + " }")
+        ast = Parser(Lexer(code).tokenize_stream()).parse()
+        elapsed, _ = timed(lambda: SemanticAnalyzer().analyze(ast))
+        print(f"  {depth:5d} níveis: {elapsed * 1e6 / reads:6.2f} us/leitura")
+
+
+def _dce_source(statements):
+    # One large function: straight-line code, branches and a loop per group,
+    # with a dead assignment in every group.
+    lines = ["func main(a: int) {", "    var total = 0;"]
+    for s in range(statements):
+        lines.append(f"    var v{s} = a * {s} + total;")
+        lines.append(f"    var dead{s} = v{s} - 1;")
+        lines.append(f"    if (v{s} > {s}) {{ total = total + v{s}; }} else {{ total = total - 1; }}")
+        lines.append(f"    while (total > {s * 10}) {{ total = total - v{s}; }}")
+    lines.append("    return total;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def bench_dce(source):
+    print("DCE (CFG + liveness por bitset):")
+    for statements in (1000, 5000, 10000):
+        ir_code = IRGenerator().generate(Parser(Lexer(_dce_source(statements)).tokenize_stream()).parse())
+        optimizer = Optimizer(ir_code)
+        elapsed, optimized = timed(optimizer.eliminate_dead_code, repeat=1)
+        print(f"  {len(ir_code):7d} instruções: {elapsed:6.2f}s  ({len(ir_code) / elapsed:8.0f} instr/s, {optimizer.removed} removidas)")
+    # A chain of dead definitions in consecutive blocks, each only read by the
+    # next: removing one makes the previous one dead.
+    for length in (1000, 10000):
+        chain = ["func main(a: int) {", "    var d0 = a;"]
+        chain += [f"    var d{i} = d{i - 1} + 1; if (a > {i}) {{ print(a); }}" for i in range(1, length)]
+        chain += ["    print(a);", "}"]
+        ir_code = IRGenerator().generate(Parser(Lexer("\n".join(chain)).tokenize_stream()).parse())
+        optimizer = Optimizer(ir_code)
+        elapsed, _ = timed(optimizer.eliminate_dead_code, repeat=1)
+        print(f"  cadeia morta de {length:5d}: {elapsed:6.3f}s  ({optimizer.removed} removidas)")
+
+
+def _config_source(statements):
+    # A configuration-heavy handler: settings are literals, every step is
+    # guarded by a debug flag and scaled by derived settings.
+    lines = [
+        "func handler() -> int {",
+        "    var retries = 3;",
+        "    var timeout = 30 * 1000;",
+        "    var debug = 0;",
+        "    var level = 2;",
+        "    var total = 0;",
+    ]
+    for s in range(statements):
+        lines.append(f"    var w{s} = timeout / retries + {s} * level;")
+        lines.append(f"    if (debug > 0) {{ print(\"w{s}\"); }} else {{ total = total + w{s}; }}")
+    lines.append("    return total;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def bench_constants(source):
+    from main import _compile
+    print("propagação de constantes (tempo de execução do código gerado):")
+    config = _config_source(200)
+    results = {}
+    for level in (1, 2):
+        _, python_code, _ = _compile(config, opt_level=level)
+        namespace = {}
+        exec(python_code, namespace)
+        handler = namespace["handler"]
+        elapsed, results[level] = timed(lambda: [handler() for _ in range(2000)])
+        print(f"  -O {level}: {elapsed / 2000 * 1e6:8.2f} µs por chamada ({python_code.count(chr(10)) + 1} linhas geradas)")
+    assert results[1] == results[2], "resultados divergentes entre -O 1 e -O 2"
+
+
+def _arithmetic_source(statements):
+    # An arithmetic-heavy handler: every step recomputes products of the loop
+    # state and passes them through intermediate variables.
+    lines = ["func handler() -> int {", "    var total = 0;", "    var i = 0;", "    while (i < 100) {"]
+    for s in range(statements):
+        lines.append(f"        var p{s} = i * {s + 2} + i * {s + 2};")
+        lines.append(f"        var q{s} = p{s};")
+        lines.append(f"        total = total + q{s} * (i * {s + 2}) - (i * {s + 2});")
+    lines.append("        i = i + 1;")
+    lines.append("    }")
+    lines.append("    return total;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def bench_redundancy(source):
+    from main import _compile
+    print("numeração de valores + propagação de cópias (tempo de execução do código gerado):")
+    arithmetic = _arithmetic_source(50)
+    results = {}
+    for level in (1, 2):
+        _, python_code, ir_code = _compile(arithmetic, opt_level=level)
+        namespace = {}
+        exec(python_code, namespace)
+        handler = namespace["handler"]
+        elapsed, results[level] = timed(lambda: [handler() for _ in range(100)])
+        operations = sum(1 for instr in ir_code if instr.op == BIN_OP)
+        print(f"  -O {level}: {elapsed / 100 * 1e3:7.3f} ms por chamada ({operations} BIN_OPs)")
+    assert results[1] == results[2], "resultados divergentes entre -O 1 e -O 2"
+
+
+def _pagination_source(statements):
+    # A pagination loop whose bounds come from an earlier loop, so they are
+    # not compile-time constants, and are recomputed on every page.
+    lines = [
+        "func handler() -> int {",
+        "    var limit = 0;",
+        "    while (limit < 20) { limit = limit + 3; }",
+        "    var total = limit * 2000;",
+        "    var offset = 0;",
+        "    var sent = 0;",
+        "    while (offset < total) {",
+    ]
+    for s in range(statements):
+        lines.append(f"        var bound{s} = total - limit * {s + 1} + offset * 0;")
+        lines.append(f"        var span{s} = (total - limit * {s + 1}) * {s + 2};")
+        lines.append(f"        sent = sent + span{s} - bound{s};")
+    lines.append("        offset = offset + limit;")
+    lines.append("    }")
+    lines.append("    return sent;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def bench_licm(source):
+    from main import _compile
+    print("movimentação de código invariante (tempo de execução do código gerado):")
+    pagination = _pagination_source(20)
+    results = {}
+    for level in (1, 2):
+        _, python_code, _ = _compile(pagination, opt_level=level)
+        namespace = {}
+        exec(python_code, namespace)
+        handler = namespace["handler"]
+        elapsed, results[level] = timed(lambda: [handler() for _ in range(20)])
+        print(f"  -O {level}: {elapsed / 20 * 1e3:7.3f} ms por chamada")
+    assert results[1] == results[2], "resultados divergentes entre -O 1 e -O 2"
+
+
+def _counted_source(iterations):
+    lines = [
+        "func handler() -> int {",
+        "    var total = 0;",
+        f"    for (var i = 0; i < {iterations}; i = i + 1) {{",
+        "        total = total + i * 3;",
+        "    }",
+        f"    for (var j = 0; j < {iterations}; j = j + 1) {{",
+        "        total = total - j;",
+        "    }",
+        "    return total;",
+        "}",
+    ]
+    return "\n".join(lines)
+
+
+def bench_induction(source):
+    from main import _compile
+    print("laços contados como range() (tempo de execução do código gerado):")
+    counted = _counted_source(100000)
+    results = {}
+    for level in (1, 2):
+        _, python_code, _ = _compile(counted, opt_level=level)
+        namespace = {}
+        exec(python_code, namespace)
+        handler = namespace["handler"]
+        elapsed, results[level] = timed(handler)
+        print(f"  -O {level}: {elapsed * 1e3:7.2f} ms por chamada")
+    assert results[1] == results[2], "resultados divergentes entre -O 1 e -O 2"
+
+
+def bench_ssa(source):
+    # The SSA round trip (construction, mark-and-sweep, destruction) alone, on
+    # the IR of 1x, 2x and 4x the synthetic program.
+    print("ida e volta pela forma SSA:")
+    for scale in (1, 2, 4):
+        ir_code = IRGenerator().generate(Parser(Lexer(generate_source(200 * scale)).tokenize_stream()).parse())
+        optimizer = Optimizer(ir_code)
+        elapsed, _ = timed(optimizer.eliminate_dead_ssa)
+        print(f"  {len(ir_code):7d} instruções: {elapsed:.3f}s ({elapsed * 1e6 / len(ir_code):.2f} us/instrução, "
+              f"{optimizer.ssa_removed} removidas)")
+
+
+def bench_incremental(source):
+    # One edited function in the synthetic program: full recompilation against
+    # IncrementalCompiler after the edit.
+    from incremental import IncrementalCompiler
+    from main import _compile
+    position = source.index("var v25 = a * 25", len(source) // 2)
+    edited = source[:position] + "var v25 = a * 26" + source[position + len("var v25 = a * 25"):]
+    compiler = IncrementalCompiler()
+    cold_time, _ = timed(lambda: IncrementalCompiler().compile(source), repeat=1)
+    compiler.compile(source)
+    full_time, _ = timed(lambda: _compile(edited), repeat=1)
+    edit_time, _ = timed(lambda: (compiler.compile(edited), compiler.compile(source)), repeat=3)
+    print(f"recompilação incremental ({len(compiler.units)} funções, uma editada):")
+    print(f"  arquivo inteiro:           {full_time:.3f}s")
+    print(f"  incremental, primeira vez: {cold_time:.3f}s")
+    print(f"  incremental, após edição:  {edit_time / 2:.3f}s")
+
+
+def bench_relex(source):
+    # One keystroke typed near the start, middle and end of a ~50k-line file:
+    # relex() of the previous tokens against a full re-lex.
+    big = generate_source(490)
+    tokens = Lexer(big).tokenize_stream()
+    full_time, _ = timed(lambda: Lexer(big).tokenize_stream(), repeat=1)
+    print(f"re-lexing incremental ({big.count(chr(10))} linhas, {len(tokens)} tokens):")
+    print(f"  arquivo inteiro: {full_time * 1e3:9.1f} ms")
+    for label, fraction in (("início", 0.01), ("meio", 0.5), ("fim", 0.99)):
+        position = tokens.source.index("total", int(len(tokens.source) * fraction))
+        relex(tokens, position, 0, "x")
+        elapsed, _ = timed(lambda: (relex(tokens, position + 1, 0, "y"), relex(tokens, position + 1, 1, "")))
+        print(f"  tecla no {label + ':':8s} {elapsed / 2 * 1e3:9.3f} ms")
+    elapsed, _ = timed(lambda: (relex(tokens, 0, 0, " "), relex(tokens, len(tokens.source) - 1, 0, " ")), repeat=1)
+    print(f"  saltos início/fim: {elapsed / 2 * 1e3:7.1f} ms")
+
+
+def bench_backend(source):
+    from ast_code_generator import ASTCodeGenerator
+    from code_generator import CodeGenerator
+    from main import _analyze_and_optimize
+    _, ir_code = _analyze_and_optimize(source)
+    print(f"backend: {len(ir_code)} instruções de IR até objeto de código")
+    text_time, _ = timed(lambda: compile(CodeGenerator(ir_code).gen(), "<charmeleon>", "exec"))
+    ast_time, _ = timed(lambda: ASTCodeGenerator(ir_code).compile())
+    print(f"  texto + compile(): {text_time:.3f}s")
+    print(f"  ast.Module:        {ast_time:.3f}s")
+
+
+def bench_taint(source):
+    # Taint analysis alone, on the IR of 1x, 2x and 4x the synthetic program.
+    print("análise de taint (SAST) sobre o IR:")
+    for scale in (1, 2, 4):
+        ir_code = IRGenerator().generate(Parser(Lexer(generate_source(200 * scale)).tokenize_stream()).parse())
+        elapsed, findings = timed(lambda: SASTAnalyzer().analyze_ir(ir_code))
+        print(f"  {len(ir_code):7d} instruções: {elapsed:.3f}s ({elapsed * 1e6 / len(ir_code):.2f} us/instrução, "
+              f"{len(findings)} achados)")
+
+
+def bench_import(source):
+    import importlib
+    import os
+    import shutil
+    import tempfile
+    from import_hook import install, uninstall
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, "bench_modulo.charmeleon"), "w", encoding="utf-8") as f:
+        f.write(source)
+    sys.path.insert(0, directory)
+    install()
+    dont_write_bytecode, sys.dont_write_bytecode = sys.dont_write_bytecode, False
+    try:
+        print("import de .charmeleon via import_hook:")
+        for attempt in ("primeiro (compila)", "seguinte (cache)"):
+            sys.modules.pop("bench_modulo", None)
+            elapsed, _ = timed(lambda: importlib.import_module("bench_modulo"), repeat=1)
+            print(f"  {attempt}: {elapsed * 1e3:9.1f} ms")
+    finally:
+        sys.dont_write_bytecode = dont_write_bytecode
+        uninstall()
+        sys.path.remove(directory)
+        sys.modules.pop("bench_modulo", None)
+        shutil.rmtree(directory)
+
+
+BENCHMARKS = {
+    "lexer": bench_lexer,
+    "tokens": bench_tokens,
+    "streaming": bench_streaming,
+    "ast": bench_ast,
+    "expressions": bench_expressions,
+    "walkers": bench_walkers,
+    "fused": bench_fused_front_end,
+    "symbols": bench_symbols,
+    "dce": bench_dce,
+    "constants": bench_constants,
+    "redundancy": bench_redundancy,
+    "licm": bench_licm,
+    "induction": bench_induction,
+    "ssa": bench_ssa,
+    "incremental": bench_incremental,
+    "relex": bench_relex,
+    "backend": bench_backend,
+    "taint": bench_taint,
+    "import": bench_import,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    source = generate_source()
+    for name in names:
+        BENCHMARKS[name](source)
@@ -0,0 +1,101 @@
+import importlib.util
+import marshal
+import os
+import struct
+import sys
+import tempfile
+
+# PEP 552 flags: the .pyc records a hash of its source instead of an mtime,
+# and the import system checks that hash against the .py on every import.
+PYC_CHECKED_HASH = 0b11
+
+PYC_HEADER_SIZE = 16
+
+# Header of the code caches kept for .charmeleon sources (see import_hook.py):
+# Python's magic number, ours, the source's mtime (ns) and size, then SHA-256
+# digests of the compiler configuration and of the source.
+CHARMELEON_MAGIC = b"CHML"
+CACHE_HEADER = struct.Struct("<4s4sqq32s32s")
+
+
+def pyc_data(code, source_bytes):
+    return (importlib.util.MAGIC_NUMBER + PYC_CHECKED_HASH.to_bytes(4, "little")
+            + importlib.util.source_hash(source_bytes) + marshal.dumps(code))
+
+
+def pyc_code(data, source_bytes):
+    # The code object stored in a hash-based .pyc, or None when the .pyc was
+    # written by another Python version or for a different source.
+    if (len(data) < PYC_HEADER_SIZE or data[:4] != importlib.util.MAGIC_NUMBER
+            or int.from_bytes(data[4:8], "little") & 1 == 0
+            or data[8:16] != importlib.util.source_hash(source_bytes)):
+        return None
+    return marshal.loads(data[PYC_HEADER_SIZE:])
+
+
+def write_atomic(path, data):
+    # Readers (and concurrent importers) never see a partial file.
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_pyc(py_file, python_code, code=None):
+    # Writes __pycache__/<name>.<tag>.pyc for the generated `py_file`, so the
+    # first import skips parsing and compiling it. `code` may be an already
+    # compiled code object for `python_code`. Returns the .pyc path.
+    source_bytes = python_code.encode("utf-8")
+    if code is None:
+        code = compile(source_bytes, py_file, "exec", dont_inherit=True)
+    pyc_file = importlib.util.cache_from_source(py_file)
+    write_atomic(pyc_file, pyc_data(code, source_bytes))
+    return pyc_file
+
+
+def cache_path(source_file):
+    directory, name = os.path.split(source_file)
+    base = name.rsplit(".", 1)[0]
+    return os.path.join(directory, "__pycache__", f"{base}.{sys.implementation.cache_tag}.charmeleonc")
+
+
+def cache_data(stat, compiler_digest, source_digest, payload):
+    # `payload` is anything marshal accepts, typically a code object.
+    return CACHE_HEADER.pack(importlib.util.MAGIC_NUMBER, CHARMELEON_MAGIC, stat.st_mtime_ns, stat.st_size,
+                             compiler_digest, source_digest) + marshal.dumps(payload)
+
+
+def cache_header(data):
+    # (mtime_ns, size, compiler digest, source digest), or None when `data` is
+    # not a cache written by this Python version.
+    if len(data) < CACHE_HEADER.size:
+        return None
+    python_magic, magic, mtime_ns, size, compiler_digest, source_digest = CACHE_HEADER.unpack_from(data)
+    if python_magic != importlib.util.MAGIC_NUMBER or magic != CHARMELEON_MAGIC:
+        return None
+    return mtime_ns, size, compiler_digest, source_digest
+
+
+def cache_payload(data):
+    return marshal.loads(memoryview(data)[CACHE_HEADER.size:])
+
+
+if __name__ == "__main__":
+    py_file = os.path.join(tempfile.mkdtemp(), "exemplo.py")
+    python_code = "def main():\n    print('olá')\n"
+    with open(py_file, "w", encoding="utf-8") as f:
+        f.write(python_code)
+    pyc_file = write_pyc(py_file, python_code)
+    with open(pyc_file, "rb") as f:
+        data = f.read()
+    print(pyc_file, len(data), "bytes")
+    sys.path.insert(0, os.path.dirname(py_file))
+    import exemplo
+    exemplo.main()
+    print("desatualizado:", pyc_code(data, b"# editado\n" + python_code.encode()) is None)
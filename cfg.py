@@ -0,0 +1,222 @@
+from collections import deque
+
+from ir import Const, GOTO, JUMPS, LABEL, RETURN
+
+
+class BasicBlock:
+    __slots__ = ("index", "instrs", "succs", "preds")
+
+    def __init__(self, index):
+        self.index = index
+        self.instrs = []
+        self.succs = []
+        self.preds = []
+
+    def __repr__(self):
+        return f"BasicBlock({self.index}, {len(self.instrs)} instrs, succs={[b.index for b in self.succs]})"
+
+
+class CFG:
+    # Basic blocks of one function body, in IR order. A block starts at a
+    # LABEL or after a jump/return and ends at the next jump/return.
+    __slots__ = ("blocks", "labels")
+
+    def __init__(self, blocks, labels):
+        self.blocks = blocks
+        self.labels = labels
+
+    def instructions(self):
+        return [instr for block in self.blocks for instr in block.instrs]
+
+
+def build_cfg(instrs):
+    blocks = []
+    labels = {}
+    current = None
+    for instr in instrs:
+        op = instr.op
+        if current is None or (op == LABEL and current.instrs):
+            current = BasicBlock(len(blocks))
+            blocks.append(current)
+        if op == LABEL:
+            labels[instr.label] = current
+        current.instrs.append(instr)
+        if op in JUMPS or op == RETURN:
+            current = None
+    last = len(blocks) - 1
+    for block in blocks:
+        tail = block.instrs[-1]
+        op = tail.op
+        if op in JUMPS:
+            target = labels.get(tail.label)
+            if target is None:
+                raise Exception(f"Erro de IR: rótulo '{tail.label}' não definido.")
+            block.succs.append(target)
+        if op != GOTO and op != RETURN and block.index < last:
+            following = blocks[block.index + 1]
+            if following not in block.succs:
+                block.succs.append(following)
+        for succ in block.succs:
+            succ.preds.append(block)
+    return CFG(blocks, labels)
+
+
+class Liveness:
+    # Live-in/live-out sets per block as int bitsets. Only names that are live
+    # across a block boundary (read in some block before being written there)
+    # get a bit; temporaries confined to one block never enter the sets.
+    __slots__ = ("names", "bits", "live_in", "live_out")
+
+    def __init__(self, cfg):
+        blocks = cfg.blocks
+        exposed = []
+        killed = []
+        names = {}
+        for block in blocks:
+            uses = set()
+            kills = set()
+            for instr in block.instrs:
+                for arg in instr.args:
+                    if arg.__class__ is not Const and arg not in kills:
+                        uses.add(arg)
+                if instr.dest is not None:
+                    kills.add(instr.dest)
+            exposed.append(uses)
+            killed.append(kills)
+            for name in uses:
+                if name not in names:
+                    names[name] = len(names)
+        self.names = list(names)
+        self.bits = names
+
+        use_bits = [0] * len(blocks)
+        def_bits = [0] * len(blocks)
+        for i in range(len(blocks)):
+            mask = 0
+            for name in exposed[i]:
+                mask |= 1 << names[name]
+            use_bits[i] = mask
+            mask = 0
+            for name in killed[i]:
+                bit = names.get(name)
+                if bit is not None:
+                    mask |= 1 << bit
+            def_bits[i] = mask
+
+        live_in = use_bits[:]
+        live_out = [0] * len(blocks)
+        # Backward problem: seed the worklist in reverse so most blocks are
+        # visited after their successors.
+        worklist = deque(reversed(blocks))
+        queued = [True] * len(blocks)
+        while worklist:
+            block = worklist.popleft()
+            i = block.index
+            queued[i] = False
+            out = 0
+            for succ in block.succs:
+                out |= live_in[succ.index]
+            live_out[i] = out
+            new_in = use_bits[i] | (out & ~def_bits[i])
+            if new_in != live_in[i]:
+                live_in[i] = new_in
+                for pred in block.preds:
+                    if not queued[pred.index]:
+                        queued[pred.index] = True
+                        worklist.append(pred)
+        self.live_in = live_in
+        self.live_out = live_out
+
+    def live_names(self, bitset):
+        return {name for name, bit in self.bits.items() if bitset >> bit & 1}
+
+
+class Dominators:
+    # Immediate dominators by the Cooper-Harvey-Kennedy iteration over reverse
+    # postorder. idom[entry] is the entry itself; unreachable blocks have None.
+    __slots__ = ("idom", "rpo")
+
+    def __init__(self, cfg):
+        blocks = cfg.blocks
+        postorder = []
+        if blocks:
+            visited = [False] * len(blocks)
+            visited[0] = True
+            stack = [(blocks[0], iter(blocks[0].succs))]
+            while stack:
+                block, succs = stack[-1]
+                for succ in succs:
+                    if not visited[succ.index]:
+                        visited[succ.index] = True
+                        stack.append((succ, iter(succ.succs)))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(block)
+        rpo = [0] * len(blocks)
+        for number, block in enumerate(reversed(postorder)):
+            rpo[block.index] = number
+        idom = [None] * len(blocks)
+        if blocks:
+            idom[0] = 0
+        order = postorder[::-1][1:]
+        changed = True
+        while changed:
+            changed = False
+            for block in order:
+                new = None
+                for pred in block.preds:
+                    if idom[pred.index] is None:
+                        continue
+                    if new is None:
+                        new = pred.index
+                        continue
+                    a, b = pred.index, new
+                    while a != b:
+                        while rpo[a] > rpo[b]:
+                            a = idom[a]
+                        while rpo[b] > rpo[a]:
+                            b = idom[b]
+                    new = a
+                if idom[block.index] != new:
+                    idom[block.index] = new
+                    changed = True
+        self.idom = idom
+        self.rpo = rpo
+
+    def children(self):
+        # The dominator tree: children[i] lists the blocks block i immediately
+        # dominates, in index order.
+        children = [[] for _ in self.idom]
+        for index, parent in enumerate(self.idom):
+            if parent is not None and index != 0:
+                children[parent].append(index)
+        return children
+
+    def frontiers(self, cfg):
+        # Dominance frontiers (Cooper, Harvey and Kennedy): walking up from
+        # each predecessor of a join block to the join's idom.
+        idom = self.idom
+        frontiers = [set() for _ in idom]
+        for block in cfg.blocks:
+            if len(block.preds) < 2 or idom[block.index] is None:
+                continue
+            for pred in block.preds:
+                runner = pred.index
+                if idom[runner] is None:
+                    continue
+                while runner != idom[block.index]:
+                    frontiers[runner].add(block.index)
+                    runner = idom[runner]
+        return frontiers
+
+    def dominates(self, a, b):
+        # Whether block index a dominates block index b.
+        idom = self.idom
+        if idom[b] is None:
+            return False
+        while b != a:
+            if b == 0:
+                return False
+            b = idom[b]
+        return True
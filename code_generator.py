@@ -1,25 +1,22 @@
-import re
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict
 
+from ir import (
+    ASSIGN, BIN_OP, END_FUNC, FOR_RANGE, FUNC, GOTO, IF_FALSE, LABEL, PRINT, RETURN,
+    Instr, Operand, format_instr, parse_ir,
+)
 
-class IRInstr:
-    def __init__(self, kind: str, raw: str, **fields):
-        self.kind = kind
-        self.raw = raw
-        self.__dict__.update(fields)
-
-    def __repr__(self):
-        return f"IRInstr({self.kind}, {self.__dict__})"
+# Charmeleon operators spelled differently in Python.
+PY_OPERATORS = {"&&": "and", "||": "or"}
 
 
 class CodeGenerator:
-    def __init__(self, ir_code: List[str]):
-        self.ir_code = [line.strip() for line in ir_code if line.strip()]
+    def __init__(self, ir_code: List[Instr]):
+        self.instrs = ir_code
         self.python_lines: List[str] = []
         self.indent_level = 0
         self.labels: Dict[str, int] = {}
         self.consumed: set[int] = set()
-        self.instrs: List[IRInstr] = []
+        self.uses: Dict[Operand, int] = {}
 
     def indent(self) -> str:
         return "    " * self.indent_level
@@ -27,232 +24,243 @@ class CodeGenerator:
     def emit(self, line: str):
         self.python_lines.append(self.indent() + line)
 
-    def parse(self):
-        self.instrs = []
-        for i, line in enumerate(self.ir_code):
-            m = re.match(r"^FUNC\s+([^:]+):$", line)
-            if m:
-                self.instrs.append(IRInstr("FUNC", line, name=m.group(1)))
-                continue
-            m = re.match(r"^END_FUNC\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("END_FUNC", line, name=m.group(1)))
-                continue
-            m = re.match(r"^([A-Za-z_][A-Za-z0-9_]*)\:$", line)
-            if m:
-                label = m.group(1)
-                self.labels[label] = i
-                self.instrs.append(IRInstr("LABEL", line, label=label))
-                continue
-            m = re.match(r"^ASSIGN\s+([^,]+),\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("ASSIGN", line, target=m.group(1).strip(), value=m.group(2).strip()))
-                continue
-            m = re.match(r"^BIN_OP\s+([^,]+),\s+([^,]+),\s+([^,]+),\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("BIN_OP", line, target=m.group(1).strip(), left=m.group(2).strip(), op=m.group(3).strip(), right=m.group(4).strip()))
-                continue
-            m = re.match(r"^IF_FALSE\s+([^\s]+)\s+GOTO\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("IF_FALSE", line, cond=m.group(1).strip(), label=m.group(2).strip()))
-                continue
-            m = re.match(r"^GOTO\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("GOTO", line, label=m.group(1).strip()))
-                continue
-            m = re.match(r"^PRINT\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("PRINT", line, expr=m.group(1).strip()))
-                continue
-            m = re.match(r"^RETURN\s+(.+)$", line)
-            if m:
-                self.instrs.append(IRInstr("RETURN", line, expr=m.group(1).strip()))
-                continue
-            # Fallback
-            self.instrs.append(IRInstr("OTHER", line))
+    # Pontos de extensão da saída: esta classe produz texto; ASTCodeGenerator
+    # (ast_code_generator.py) os redefine para montar nós do módulo ast.
+    def _operand(self, arg):
+        return str(arg)
+
+    def _binary(self, instr: Instr):
+        left, right = instr.args
+        return f"{self._operand(left)} {PY_OPERATORS.get(instr.operator, instr.operator)} {self._operand(right)}"
+
+    def _assign(self, dest, value):
+        self.emit(f"{dest} = {value}")
+
+    def _print(self, value):
+        self.emit(f"print({value})")
+
+    def _return(self, value):
+        self.emit(f"return {value}")
+
+    def _comment(self, text: str):
+        self.emit(f"# {text}")
+
+    def _blank(self):
+        self.emit("")
+
+    def _open_def(self, name: str):
+        self._open(f"def {name}()")
+
+    def _open_while(self, cond):
+        self._open(f"while {cond}")
+
+    def _open_if(self, cond):
+        self._open(f"if {cond}")
+
+    def _open_else(self):
+        self._open("else")
+
+    def _open_for(self, target, bounds):
+        self._open(f"for {target} in range({', '.join(bounds)})")
+
+    def _open(self, header: str):
+        self.emit(header + ":")
+        self.indent_level += 1
+
+    def _mark(self):
+        return len(self.python_lines)
+
+    def _close(self, mark=None):
+        # Fecha o bloco aberto; sem comando emitido desde `mark` (só
+        # comentários, ou nada), emite "pass".
+        if mark is not None and not self._has_statement(mark):
+            self.emit("pass")
+        self.indent_level -= 1
+
+    def _close_else(self, mark):
+        if not self._has_statement(mark):
+            # Ramo else vazio (ou removido pela DCE): omite o "else:"
+            del self.python_lines[mark - 1:]
+        self.indent_level -= 1
+
+    def _has_statement(self, mark) -> bool:
+        return any(not line.lstrip().startswith("#") for line in self.python_lines[mark:])
+
+    def _result(self):
+        return "\n".join(self.python_lines)
+
+    def _single_use(self, temp) -> bool:
+        # Um temporário só pode ser embutido na instrução seguinte se ela for
+        # sua única leitura (a numeração de valores reaproveita temporários).
+        return self.uses.get(temp, 0) == 1
 
     def gen(self) -> str:
-        self.parse()
+        self.labels = {instr.label: i for i, instr in enumerate(self.instrs) if instr.op == LABEL}
+        self.uses = {}
+        for instr in self.instrs:
+            for arg in instr.args:
+                self.uses[arg] = self.uses.get(arg, 0) + 1
         i = 0
         while i < len(self.instrs):
             instr = self.instrs[i]
-            if instr.kind == "FUNC":
-                self.emit(f"def {instr.name}():")
-                self.indent_level += 1
+            if instr.op == FUNC:
+                self._open_def(instr.label)
+                body_start = self._mark()
                 i = self._gen_function_body(i + 1)
-                self.indent_level -= 1
-                self.emit("")
+                self._close(body_start)
+                self._blank()
             else:
                 i += 1
-        return "\n".join(self.python_lines)
+        return self._result()
 
     def _gen_function_body(self, start_idx: int) -> int:
+        end_idx = start_idx
+        while end_idx < len(self.instrs) and self.instrs[end_idx].op != END_FUNC:
+            end_idx += 1
+        self._gen_block(start_idx, end_idx)
+        return end_idx + 1
+
+    def _gen_block(self, start_idx: int, end_idx: int):
+        # Emite as instruções em [start_idx, end_idx), estruturando os desvios
+        # aninhados (if/else, while e for) em blocos Python.
         i = start_idx
-        while i < len(self.instrs):
+        while i < end_idx:
             instr = self.instrs[i]
-            if instr.kind == "END_FUNC":
-                return i + 1
             if i in self.consumed:
                 i += 1
                 continue
 
             # Evitar emitir a BIN_OP de condição imediatamente antes do IF_FALSE
-            if instr.kind == "BIN_OP" and i + 1 < len(self.instrs):
+            if instr.op == BIN_OP and i + 1 < end_idx:
                 nxt = self.instrs[i + 1]
-                if nxt.kind == "IF_FALSE" and nxt.cond == instr.target:
+                if nxt.op == IF_FALSE and nxt.args[0] == instr.dest and self._single_use(instr.dest):
                     # Deixe o IF_FALSE lidar com a emissão de controle
-                    i = self._gen_if_or_loop(i + 1)
+                    i = self._gen_if_or_loop(i + 1, end_idx)
                     continue
 
-            if instr.kind == "LABEL":
-                self.emit(f"# label: {instr.label}")
-                i += 1
+            if instr.op == IF_FALSE:
+                i = self._gen_if_or_loop(i, end_idx)
                 continue
-            if instr.kind == "IF_FALSE":
-                i = self._gen_if_or_loop(i)
+            if instr.op == FOR_RANGE:
+                i = self._gen_for_range(i)
                 continue
-            if instr.kind == "ASSIGN":
-                # Handle string literals with escaped quotes correctly
-                value = instr.value
-                if value.startswith('"') and value.endswith('"'):
-                    value = value.replace('\"', '"') # Replace escaped double quotes with actual double quotes
-                self.emit(f"{instr.target} = {value}")
+            if instr.op == GOTO:
+                tgt_idx = self.labels.get(instr.label)
+                if tgt_idx is None or tgt_idx > i:
+                    self._comment(f"goto {instr.label}")
+                # backward goto: já deve ter sido transformado em while; ignore
                 i += 1
                 continue
-            if instr.kind == "BIN_OP":
+            if instr.op == BIN_OP and i + 1 < end_idx:
                 # Dobra BIN_OP + ASSIGN imediato em uma única atribuição
-                folded = False
-                if i + 1 < len(self.instrs):
-                    nxt = self.instrs[i + 1]
-                    if nxt.kind == "ASSIGN" and nxt.value == instr.target:
-                        self.emit(f"{nxt.target} = {instr.left} {instr.op} {instr.right}")
-                        self.consumed.add(i + 1)
-                        folded = True
-                if not folded:
-                    self.emit(f"{instr.target} = {instr.left} {instr.op} {instr.right}")
-                i += 1
-                continue
-            if instr.kind == "PRINT":
-                self.emit(f"print({instr.expr})")
-                i += 1
-                continue
-            if instr.kind == "GOTO":
-                tgt = instr.label
-                tgt_idx = self.labels.get(tgt)
-                if tgt_idx is not None and tgt_idx < i:
-                    # backward goto: já deve ter sido transformado em while; ignore
-                    pass
-                else:
-                    self.emit(f"# goto {tgt}")
-                i += 1
-                continue
-            if instr.kind == "RETURN":
-                self.emit(f"return {instr.expr}")
-                i += 1
-                continue
-            self.emit(f"# {instr.raw}")
+                nxt = self.instrs[i + 1]
+                if nxt.op == ASSIGN and nxt.args[0] == instr.dest and self._single_use(instr.dest):
+                    self._assign(nxt.dest, self._binary(instr))
+                    self.consumed.add(i + 1)
+                    i += 2
+                    continue
+            self._emit_single(i)
             i += 1
-        return i
 
-    def _gen_if_or_loop(self, if_idx: int) -> int:
+    def _gen_if_or_loop(self, if_idx: int, end_idx: int) -> int:
         if_instr = self.instrs[if_idx]
         else_label = if_instr.label
         else_label_idx = self.labels.get(else_label, None)
 
         # Extrai expressão condicional
-        cond_expr = if_instr.cond
+        cond_expr = self._operand(if_instr.args[0])
         prev_instr = self.instrs[if_idx - 1] if if_idx - 1 >= 0 else None
-        if prev_instr and prev_instr.kind == "BIN_OP" and prev_instr.target == if_instr.cond:
-            cond_expr = f"{prev_instr.left} {prev_instr.op} {prev_instr.right}"
+        if prev_instr and prev_instr.op == BIN_OP and prev_instr.dest == if_instr.args[0] and self._single_use(prev_instr.dest):
+            cond_expr = self._binary(prev_instr)
             self.consumed.add(if_idx - 1)
 
-        # Encontra fim do bloco verdadeiro
-        true_block_end_idx = if_idx + 1
-        while true_block_end_idx < len(self.instrs):
-            current_instr = self.instrs[true_block_end_idx]
-            if current_instr.kind == "LABEL" and else_label_idx is not None and current_instr.label == else_label:
-                break
-            if current_instr.kind == "GOTO":
-                break
-            true_block_end_idx += 1
+        # Encontra fim do bloco verdadeiro: o label do IF_FALSE, precedido pelo
+        # GOTO de volta (loop) ou para depois do else, se houver
+        if else_label_idx is not None and if_idx < else_label_idx <= end_idx:
+            true_block_end_idx = else_label_idx
+            if self.instrs[true_block_end_idx - 1].op == GOTO:
+                true_block_end_idx -= 1
+        else:
+            true_block_end_idx = if_idx + 1
+            while true_block_end_idx < end_idx and self.instrs[true_block_end_idx].op != GOTO:
+                true_block_end_idx += 1
 
         # Loop: GOTO para label anterior
-        if true_block_end_idx < len(self.instrs) and self.instrs[true_block_end_idx].kind == "GOTO":
+        if true_block_end_idx < end_idx and self.instrs[true_block_end_idx].op == GOTO:
             goto_instr = self.instrs[true_block_end_idx]
             target_label = goto_instr.label
             target_idx = self.labels.get(target_label)
             if target_idx is not None and target_idx < if_idx:
-                self.emit(f"while {cond_expr}:")
-                self.indent_level += 1
-                k = if_idx + 1
-                while k < true_block_end_idx:
-                    if k not in self.consumed:
-                        self._emit_single(k)
-                        self.consumed.add(k)
-                    k += 1
-                self.indent_level -= 1
+                self._open_while(cond_expr)
+                body_start = self._mark()
+                self._gen_block(if_idx + 1, true_block_end_idx)
+                self._close(body_start)
                 # pular para depois do else_label
-                if else_label_idx is not None:
+                if else_label_idx is not None and else_label_idx <= end_idx:
                     return else_label_idx + 1
                 else:
                     return true_block_end_idx + 1
 
         # If/Else estruturado
-        self.emit(f"if {cond_expr}:")
-        self.indent_level += 1
-        k = if_idx + 1
-        while k < true_block_end_idx:
-            if k not in self.consumed:
-                self._emit_single(k)
-                self.consumed.add(k)
-            k += 1
-        self.indent_level -= 1
+        self._open_if(cond_expr)
+        body_start = self._mark()
+        self._gen_block(if_idx + 1, true_block_end_idx)
+        self._close(body_start)
 
-        if true_block_end_idx < len(self.instrs) and self.instrs[true_block_end_idx].kind == "GOTO":
+        if true_block_end_idx < end_idx and self.instrs[true_block_end_idx].op == GOTO:
             skip_label = self.instrs[true_block_end_idx].label
             skip_label_idx = self.labels.get(skip_label)
-            if else_label_idx is not None and skip_label_idx is not None and skip_label_idx > else_label_idx:
-                self.emit("else:")
-                self.indent_level += 1
-                l = else_label_idx + 1
-                while l < skip_label_idx:
-                    if l not in self.consumed:
-                        self._emit_single(l)
-                        self.consumed.add(l)
-                    l += 1
-                self.indent_level -= 1
-                return skip_label_idx + 1
+            if else_label_idx is not None and skip_label_idx is not None and else_label_idx < skip_label_idx <= end_idx:
+                self._open_else()
+                body_start = self._mark()
+                self._gen_block(else_label_idx + 1, skip_label_idx)
+                self._close_else(body_start)
+                return min(skip_label_idx + 1, end_idx)
         # If simples
-        if else_label_idx is not None:
-            return else_label_idx + 1
+        if else_label_idx is not None and else_label_idx <= end_idx:
+            return min(else_label_idx + 1, end_idx)
         return true_block_end_idx + 1
 
+    def _gen_for_range(self, for_idx: int) -> int:
+        # FOR_RANGE i, start, stop, step GOTO Lfim; corpo; GOTO Linício; Lfim:
+        for_instr = self.instrs[for_idx]
+        start, stop, step = for_instr.args
+        if str(step) != "1":
+            bounds = (start, stop, step)
+        elif str(start) != "0":
+            bounds = (start, stop)
+        else:
+            bounds = (stop,)
+        self._open_for(for_instr.dest, [self._operand(bound) for bound in bounds])
+        body_start = self._mark()
+        end_idx = self.labels[for_instr.label]
+        self._gen_block(for_idx + 1, end_idx - 1)
+        self._close(body_start)
+        return end_idx + 1
+
     def _emit_single(self, idx: int):
         ins = self.instrs[idx]
-        if ins.kind == "ASSIGN":
-            value = ins.value
-            if value.startswith('"') and value.endswith('"'):
-                value = value.replace('\"', '"')
-            self.emit(f"{ins.target} = {value}")
-        elif ins.kind == "BIN_OP":
+        if ins.op == ASSIGN:
+            self._assign(ins.dest, self._operand(ins.args[0]))
+        elif ins.op == BIN_OP:
             # Dobra se próximo for ASSIGN consumindo o temporário
             if idx + 1 < len(self.instrs):
                 nxt = self.instrs[idx + 1]
-                if nxt.kind == "ASSIGN" and nxt.value == ins.target:
-                    self.emit(f"{nxt.target} = {ins.left} {ins.op} {ins.right}")
+                if nxt.op == ASSIGN and nxt.args[0] == ins.dest and self._single_use(ins.dest):
+                    self._assign(nxt.dest, self._binary(ins))
                     self.consumed.add(idx + 1)
                     return
-            self.emit(f"{ins.target} = {ins.left} {ins.op} {ins.right}")
-        elif ins.kind == "PRINT":
-            self.emit(f"print({ins.expr})")
-        elif ins.kind == "RETURN":
-            self.emit(f"return {ins.expr}")
-        elif ins.kind == "LABEL":
-            self.emit(f"# label: {ins.label}")
-        elif ins.kind == "GOTO":
-            self.emit(f"# goto {ins.label}")
+            self._assign(ins.dest, self._binary(ins))
+        elif ins.op == PRINT:
+            self._print(self._operand(ins.args[0]))
+        elif ins.op == RETURN:
+            self._return(self._operand(ins.args[0]))
+        elif ins.op == LABEL:
+            self._comment(f"label: {ins.label}")
+        elif ins.op == GOTO:
+            self._comment(f"goto {ins.label}")
         else:
-            self.emit(f"# {ins.raw}")
+            self._comment(format_instr(ins))
 
 
 if __name__ == "__main__":
@@ -269,7 +277,7 @@ if __name__ == "__main__":
         "L2:",
         "END_FUNC main",
     ]
-    gen = CodeGenerator(ir_code_example)
+    gen = CodeGenerator(parse_ir(ir_code_example))
     print(gen.gen())
 
 
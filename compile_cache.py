@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Bump when the shape of cached entries changes.
+COMPILER_VERSION = "1"
+
+# Modules whose contents make up the compiler fingerprint: editing any of them
+# invalidates every cached artifact.
+COMPILER_MODULES = (
+    "lexer.py", "diagnostics.py", "parser.py", "ast_nodes.py", "ast_walker.py", "semantic_analyzer.py",
+    "sast_analyzer.py", "taint.py", "ir.py", "ir_generator.py", "front_end.py", "cfg.py", "constant_propagation.py",
+    "value_numbering.py", "copy_propagation.py", "loops.py", "ssa.py", "optimizer.py", "code_generator.py",
+    "ast_code_generator.py", "main.py",
+)
+
+DEFAULT_CACHE_DIR = ".charmeleon_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Temporary files older than this were left by a writer that died before
+# renaming them into place.
+STALE_TEMP_SECONDS = 5 * 60
+
+_compiler_fingerprint = None
+
+
+def compiler_fingerprint():
+    global _compiler_fingerprint
+    if _compiler_fingerprint is None:
+        digest = hashlib.sha256(COMPILER_VERSION.encode())
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in COMPILER_MODULES:
+            try:
+                with open(os.path.join(base, name), "rb") as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(b"-")
+        _compiler_fingerprint = digest.hexdigest()
+    return _compiler_fingerprint
+
+
+def cache_key(source_code, options=None):
+    digest = hashlib.sha256(compiler_fingerprint().encode())
+    digest.update(json.dumps(options or {}, sort_keys=True).encode())
+    digest.update(source_code.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CompileCache:
+    # On-disk store of compilation results, one JSON file per entry named by
+    # its key. Entries are written to a temporary file and renamed into place,
+    # so readers never see a partial entry. A hit touches the file's mtime; when
+    # the directory grows past max_bytes the least recently used entries go.
+    # The directory is only rescanned once a sixteenth of the cap has been
+    # written since the last scan, so a writer overshoots the cap by at most that.
+    # The scan also removes temporary files abandoned by crashed writers.
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._unscanned = max_bytes
+
+    def key(self, source_code, options=None):
+        return cache_key(source_code, options)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+                self._unscanned += f.tell()
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        if self._unscanned >= self.max_bytes // 16:
+            self.evict()
+
+    def evict(self):
+        self._unscanned = 0
+        entries = []
+        total = 0
+        stale = time.time() - STALE_TEMP_SECONDS
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(".json"):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+                elif item.name.endswith(".tmp"):
+                    try:
+                        stat = item.stat()
+                        if stat.st_mtime < stale:
+                            os.unlink(item.path)
+                        else:
+                            total += stat.st_size # still being written
+                    except OSError:
+                        pass # renamed or removed meanwhile
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
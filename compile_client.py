@@ -0,0 +1,69 @@
+import json
+import socket
+import struct
+
+from opt_levels import DEFAULT_OPT_LEVEL
+
+# Wire format shared with compile_server: each message is a JSON object
+# prefixed by its length as a 4-byte big-endian integer. A connection may
+# carry any number of request/response pairs.
+_HEADER = struct.Struct(">I")
+
+
+def send_message(sock, message):
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    # Returns None once the peer has closed the connection.
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+class CompileClient:
+    # Thin client for a running compile server; keeps one connection open.
+    def __init__(self, socket_path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+
+    def request(self, message):
+        send_message(self.sock, message)
+        response = recv_message(self.sock)
+        if response is None:
+            raise Exception("Erro: o servidor de compilação encerrou a conexão.")
+        return response
+
+    def compile(self, source_code, emit_ir=False, opt_level=DEFAULT_OPT_LEVEL):
+        # Returns (SAST report, Python code, IR lines or None); compile errors
+        # are raised with the server's message.
+        response = self.request({"op": "compile", "source": source_code, "emit_ir": emit_ir, "opt_level": opt_level})
+        if not response["ok"]:
+            raise Exception(response["error"])
+        return response["sast"], response["python"], response["ir"]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,125 @@
+import os
+import socket
+import socketserver
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from compile_cache import DEFAULT_CACHE_DIR, CompileCache, cache_key
+from compile_client import recv_message, send_message
+from ir import format_ir
+from main import DEFAULT_OPT_LEVEL, _compile
+
+
+def _compile_entry(source_code, fused, keep_ir, opt_level):
+    # Runs in the server's compile workers; returns a cache entry.
+    sast_output, python_code, ir_code = _compile(source_code, fused, opt_level)
+    return {"sast": sast_output, "python": python_code, "ir": format_ir(ir_code) if keep_ir else None}
+
+
+def _remove_stale_socket(socket_path):
+    # Only a socket left behind by a server that is no longer running is
+    # replaced; a live server or any other file at the path is an error.
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise Exception(f"Erro: \'{socket_path}\' já existe e não é um socket.")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise Exception(f"Erro: já há um servidor de compilação ouvindo em \'{socket_path}\'.")
+
+
+class _CompileHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            message = recv_message(self.request)
+            if message is None:
+                return
+            op = message.get("op")
+            if op == "compile":
+                try:
+                    entry = server.compile(message["source"], message.get("fused", True), message.get("emit_ir", False),
+                                           message.get("opt_level", DEFAULT_OPT_LEVEL))
+                    response = {"ok": True, "sast": entry["sast"], "python": entry["python"], "ir": entry["ir"]}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+            elif op == "ping":
+                response = {"ok": True}
+            elif op == "shutdown":
+                send_message(self.request, {"ok": True})
+                threading.Thread(target=server.shutdown).start()
+                return
+            else:
+                response = {"ok": False, "error": f"Erro: operação desconhecida: {op}"}
+            send_message(self.request, response)
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    # Long-running compiler listening on a Unix domain socket. Connections are
+    # served by a thread pool; results are kept in an in-memory LRU in front of
+    # the on-disk cache, so repeated requests never reach the compiler. Misses
+    # compile in-thread, or on a process pool when workers > 1 (the workers are
+    # forked from the already warm server).
+    def __init__(self, socket_path, workers=None, threads=8, cache_dir=DEFAULT_CACHE_DIR, memory_entries=1024):
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _CompileHandler)
+        self.socket_path = socket_path
+        self.disk_cache = CompileCache(cache_dir) if cache_dir is not None else None
+        self.memory = OrderedDict()
+        self.memory_entries = memory_entries
+        self.lock = threading.Lock()
+        self.connections = ThreadPoolExecutor(max_workers=threads)
+        workers = workers or 1
+        self.compile_pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def process_request(self, request, client_address):
+        self.connections.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def compile(self, source_code, fused=True, keep_ir=False, opt_level=DEFAULT_OPT_LEVEL):
+        key = cache_key(source_code, {"fused": fused, "opt_level": opt_level})
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+        if entry is None or (keep_ir and entry["ir"] is None):
+            if self.disk_cache is not None:
+                entry = self.disk_cache.get(key)
+            if entry is None or (keep_ir and entry.get("ir") is None):
+                if self.compile_pool is not None:
+                    entry = self.compile_pool.submit(_compile_entry, source_code, fused, keep_ir, opt_level).result()
+                else:
+                    entry = _compile_entry(source_code, fused, keep_ir, opt_level)
+                if self.disk_cache is not None:
+                    self.disk_cache.put(key, entry)
+            with self.lock:
+                self.memory[key] = entry
+                self.memory.move_to_end(key)
+                while len(self.memory) > self.memory_entries:
+                    self.memory.popitem(last=False)
+        return entry
+
+    def server_close(self):
+        super().server_close()
+        self.connections.shutdown(wait=False)
+        if self.compile_pool is not None:
+            self.compile_pool.shutdown()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -0,0 +1,223 @@
+import math
+import operator
+
+from ir import ASSIGN, BIN_OP, Const, GOTO, IF_FALSE, JUMPS, Instr, LABEL
+
+# Lattice: UNDEF (no definition reached yet) > constant > OVERDEF (varies).
+UNDEF = object()
+OVERDEF = object()
+
+# Folding mirrors what the generated Python computes (`/` is true division).
+FOLDABLE_OPERATORS = {
+    "+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "%": operator.mod,
+    "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+    "&&": lambda a, b: a and b, "||": lambda a, b: a or b,
+}
+
+# Larger integers are left for run time: folding them would bloat the IR,
+# slow the compile down and eventually overflow int -> str conversion.
+MAX_FOLD_BITS = 256
+
+_literal_values = {}
+
+
+def literal_value(const):
+    # Python value of a numeric literal, including the negative ones folding
+    # produces; other literals (strings) stand for themselves and are
+    # propagated but never folded.
+    value = _literal_values.get(const.text)
+    if value is None:
+        text = const.text
+        if text in ("True", "False"):
+            value = text == "True"
+        elif text.lstrip("-")[:1].isdigit():
+            value = float(text) if "." in text or "e" in text else int(text)
+        else:
+            value = const
+        _literal_values[text] = value
+    return value
+
+
+def constant_operand(value):
+    if value.__class__ is Const:
+        return value
+    return Const(repr(value))
+
+
+def _same(a, b):
+    return a.__class__ is b.__class__ and a == b
+
+
+def fold(operator_text, left, right):
+    # Returns the folded value, or OVERDEF when it can't (or mustn't) be
+    # computed at compile time: non-numeric operands, division by zero, inf/nan,
+    # integers past MAX_FOLD_BITS.
+    func = FOLDABLE_OPERATORS.get(operator_text)
+    if func is None or left.__class__ is Const or right.__class__ is Const:
+        return OVERDEF
+    try:
+        value = func(left, right)
+    except ArithmeticError:
+        return OVERDEF
+    if value.__class__ is float and not math.isfinite(value):
+        return OVERDEF
+    if value.__class__ is int and value.bit_length() > MAX_FOLD_BITS:
+        return OVERDEF
+    return value
+
+
+class ConstantPropagation:
+    # Sparse conditional constant propagation over one function's CFG, in the
+    # non-SSA formulation: each block has an input state mapping names to
+    # lattice values, and only edges out of executable blocks whose branch
+    # condition allows them are followed. Names live on entry (parameters)
+    # start as OVERDEF; everything else starts UNDEF.
+    def __init__(self, cfg, entry_names=()):
+        self.cfg = cfg
+        self.entry_names = entry_names
+        self.in_states = [None] * len(cfg.blocks)
+        self.loop_headers = self._loop_headers()
+        self.folded = 0
+        self.pruned = 0
+
+    def _loop_headers(self):
+        # Blocks reached by a backward GOTO. A constantly true test there stays
+        # in place (as `while True`), so the code generator can still rebuild
+        # the loop.
+        headers = set()
+        for block in self.cfg.blocks:
+            tail = block.instrs[-1]
+            if tail.op == GOTO:
+                target = self.cfg.labels.get(tail.label)
+                if target is not None and target.index <= block.index:
+                    headers.add(target.index)
+        return headers
+
+    def _value(self, state, arg):
+        if arg.__class__ is Const:
+            return literal_value(arg)
+        return state.get(arg, UNDEF)
+
+    def _substitute(self, state, arg):
+        if arg.__class__ is not Const:
+            value = state.get(arg, UNDEF)
+            if value is not UNDEF and value is not OVERDEF:
+                return constant_operand(value)
+        return arg
+
+    def _step(self, state, instr):
+        op = instr.op
+        if op == ASSIGN:
+            state[instr.dest] = self._value(state, instr.args[0])
+        elif op == BIN_OP:
+            left = self._value(state, instr.args[0])
+            right = self._value(state, instr.args[1])
+            if left is OVERDEF or right is OVERDEF:
+                state[instr.dest] = OVERDEF
+            elif left is UNDEF or right is UNDEF:
+                state[instr.dest] = UNDEF
+            else:
+                state[instr.dest] = fold(instr.operator, left, right)
+        elif instr.dest is not None:
+            state[instr.dest] = OVERDEF
+
+    def _successors(self, block, state):
+        tail = block.instrs[-1]
+        if tail.op == IF_FALSE:
+            condition = self._value(state, tail.args[0])
+            if condition is UNDEF:
+                return []
+            if condition is not OVERDEF:
+                target = self.cfg.labels[tail.label]
+                if not condition:
+                    return [target]
+                if block.index not in self.loop_headers:
+                    return [succ for succ in block.succs if succ is not target] or [target]
+        return block.succs
+
+    def analyze(self):
+        blocks = self.cfg.blocks
+        if not blocks:
+            return
+        in_states = self.in_states
+        in_states[0] = dict.fromkeys(self.entry_names, OVERDEF)
+        worklist = [blocks[0]]
+        queued = {0}
+        while worklist:
+            block = worklist.pop()
+            queued.discard(block.index)
+            state = dict(in_states[block.index])
+            for instr in block.instrs:
+                self._step(state, instr)
+            for succ in self._successors(block, state):
+                current = in_states[succ.index]
+                if current is None:
+                    in_states[succ.index] = dict(state)
+                    changed = True
+                else:
+                    changed = False
+                    for name, value in state.items():
+                        old = current.get(name, UNDEF)
+                        if old is OVERDEF or value is UNDEF or _same(old, value):
+                            continue
+                        current[name] = value if old is UNDEF else OVERDEF
+                        changed = True
+                if changed and succ.index not in queued:
+                    queued.add(succ.index)
+                    worklist.append(succ)
+
+    def rewrite(self):
+        # Substitutes known constants into operands, turns folded BIN_OPs into
+        # ASSIGNs, resolves constant IF_FALSEs and drops unreachable blocks.
+        # Returns the new instruction list of the function.
+        out = []
+        for block in self.cfg.blocks:
+            state = self.in_states[block.index]
+            if state is None:
+                self.pruned += len(block.instrs)
+                continue
+            state = dict(state)
+            for instr in block.instrs:
+                args = instr.args
+                for arg in args:
+                    if arg.__class__ is not Const:
+                        value = state.get(arg, UNDEF)
+                        if value is not UNDEF and value is not OVERDEF:
+                            args = tuple(self._substitute(state, a) for a in args)
+                            break
+                self._step(state, instr)
+                op = instr.op
+                if op == BIN_OP:
+                    value = state[instr.dest]
+                    if value is not UNDEF and value is not OVERDEF:
+                        self.folded += 1
+                        out.append(Instr(ASSIGN, instr.dest, (constant_operand(value),)))
+                        continue
+                elif op == IF_FALSE:
+                    condition = self._value(state, instr.args[0])
+                    if condition is not UNDEF and condition is not OVERDEF:
+                        if not condition:
+                            self.pruned += 1
+                            out.append(Instr(GOTO, label=instr.label))
+                            continue
+                        if block.index not in self.loop_headers:
+                            self.pruned += 1
+                            continue
+                out.append(Instr(op, instr.dest, args, instr.operator, instr.label) if args is not instr.args else instr)
+        return _remove_trivial_jumps(out)
+
+
+def _remove_trivial_jumps(instrs):
+    # Pruning leaves GOTOs to the very next label and labels nothing jumps to.
+    out = []
+    for i, instr in enumerate(instrs):
+        if instr.op == GOTO:
+            j = i + 1
+            while j < len(instrs) and instrs[j].op == LABEL and instrs[j].label != instr.label:
+                j += 1
+            if j < len(instrs) and instrs[j].op == LABEL:
+                continue
+        out.append(instr)
+    targets = {instr.label for instr in out if instr.op in JUMPS}
+    return [instr for instr in out if instr.op != LABEL or instr.label in targets]
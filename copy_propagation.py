@@ -0,0 +1,114 @@
+from ir import ASSIGN, Const, Instr
+
+
+def _copies(cfg):
+    # Every copy `ASSIGN d, s` (s not a literal) of the function, numbered; and
+    # per name, the bitmask of copies it takes part in.
+    copies = []
+    involved = {}
+    for block in cfg.blocks:
+        for instr in block.instrs:
+            if instr.op == ASSIGN:
+                source = instr.args[0]
+                if source.__class__ is not Const and source != instr.dest:
+                    bit = 1 << len(copies)
+                    copies.append(instr)
+                    involved[instr.dest] = involved.get(instr.dest, 0) | bit
+                    involved[source] = involved.get(source, 0) | bit
+    return copies, involved
+
+
+def _transfer(block, available, copy_bits, involved):
+    for instr in block.instrs:
+        dest = instr.dest
+        if dest is not None:
+            available &= ~involved.get(dest, 0)
+            bit = copy_bits.get(id(instr))
+            if bit is not None:
+                available |= bit
+    return available
+
+
+def propagate_copies(cfg):
+    # Global copy propagation. A copy `d = s` is available at a point when it
+    # runs on every path there with neither d nor s written since (a forward
+    # must-problem on bitsets); reads of d at such points read s instead.
+    # Afterwards copies whose destination is never read (or that became
+    # self-copies) are dropped.
+    # Returns (operands rewritten, copies removed).
+    blocks = cfg.blocks
+    copies, involved = _copies(cfg)
+    if not copies:
+        return 0, 0
+    copy_bits = {id(instr): 1 << i for i, instr in enumerate(copies)}
+    everything = (1 << len(copies)) - 1
+
+    avail_in = [0] * len(blocks)
+    avail_out = [everything] * len(blocks)
+    worklist = list(reversed(blocks))
+    queued = [True] * len(blocks)
+    while worklist:
+        block = worklist.pop()
+        i = block.index
+        queued[i] = False
+        if i == 0 or not block.preds:
+            available = 0
+        else:
+            available = everything
+            for pred in block.preds:
+                available &= avail_out[pred.index]
+        avail_in[i] = available
+        out = _transfer(block, available, copy_bits, involved)
+        if out != avail_out[i]:
+            avail_out[i] = out
+            for succ in block.succs:
+                if not queued[succ.index]:
+                    queued[succ.index] = True
+                    worklist.append(succ)
+
+    by_dest = {}
+    for i, instr in enumerate(copies):
+        by_dest.setdefault(instr.dest, []).append((1 << i, instr.args[0]))
+
+    rewritten = 0
+    uses = {}
+    for block in blocks:
+        available = avail_in[block.index]
+        instrs = block.instrs
+        for n, instr in enumerate(instrs):
+            args = instr.args
+            if args:
+                new_args = []
+                for arg in args:
+                    # Follow chains: x = y; z = x; ... z reads y.
+                    candidates = by_dest.get(arg)
+                    while candidates:
+                        for bit, source in candidates:
+                            if available & bit:
+                                arg = source
+                                rewritten += 1
+                                break
+                        else:
+                            break
+                        candidates = by_dest.get(arg)
+                    new_args.append(arg)
+                    uses[arg] = uses.get(arg, 0) + 1
+                if new_args != list(args):
+                    rewritten_instr = Instr(instr.op, instr.dest, tuple(new_args), instr.operator, instr.label)
+                    if id(instr) in copy_bits:
+                        copy_bits[id(rewritten_instr)] = copy_bits[id(instr)]
+                    instr = instrs[n] = rewritten_instr
+            dest = instr.dest
+            if dest is not None:
+                available &= ~involved.get(dest, 0)
+                bit = copy_bits.get(id(instr))
+                if bit is not None:
+                    available |= bit
+
+    removed = 0
+    for block in blocks:
+        kept = [instr for instr in block.instrs
+                if not (id(instr) in copy_bits and (instr.dest not in uses or instr.args[0] == instr.dest))]
+        removed += len(block.instrs) - len(kept)
+        block.instrs = kept
+    return rewritten, removed
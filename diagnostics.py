@@ -0,0 +1,68 @@
+class Diagnostic:
+    # One error found by a compilation, at a 1-based line and column of the
+    # source (None when the position is unknown).
+    __slots__ = ("message", "line", "column")
+
+    def __init__(self, message, line=None, column=None):
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __reduce__(self):
+        return Diagnostic, (self.message, self.line, self.column)
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and \
+            (self.message, self.line, self.column) == (other.message, other.line, other.column)
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        return f"linha {self.line}, coluna {self.column}: {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.message!r}, {self.line}, {self.column})"
+
+
+class CompileError(Exception):
+    # Every diagnostic of a compilation that found errors, in source order.
+    def __init__(self, diagnostics):
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+
+    def __str__(self):
+        return "\n".join(map(str, self.diagnostics))
+
+
+def source_location(source, offset):
+    # 1-based (line, column) of a character offset into `source`.
+    return source.count("\n", 0, offset) + 1, offset - source.rfind("\n", 0, offset)
+
+
+class Diagnostics:
+    # Collects the errors of one compilation instead of stopping at the first.
+    # The lexer, the parser and the semantic passes accept one; `locate` maps
+    # the source offsets they report to (line, column).
+    __slots__ = ("items", "locate")
+
+    def __init__(self, locate=None, items=None):
+        self.items = items if items is not None else []
+        self.locate = locate
+
+    def error(self, message, offset=None):
+        line = column = None
+        if offset is not None and self.locate is not None:
+            line, column = self.locate(offset)
+        self.items.append(Diagnostic(message, line, column))
+
+    def check(self):
+        # Raises CompileError if anything was reported.
+        if self.items:
+            items = sorted(self.items, key=lambda d: (d.line is None, d.line or 0, d.column or 0))
+            raise CompileError(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
@@ -0,0 +1,157 @@
+from ir import (
+    ASSIGN, END_FUNC, FUNC, GOTO, IF_FALSE, LABEL, PRINT, RETURN,
+    Const, Instr, Temp, Var,
+)
+from ir_generator import IRGenerator
+from sast_analyzer import SASTAnalyzer
+from semantic_analyzer import ERROR_TYPE, SemanticAnalyzer
+
+
+class FusedFrontEnd(SemanticAnalyzer):
+    # Type checking and IR emission in a single walk of the AST, followed by the
+    # SAST taint analysis on the IR just built. Scopes are the semantic
+    # analyzer's SymbolTable; IR goes to an IRGenerator used as a sink,
+    # so the results are the same as running the three passes one after
+    # another. Expressions evaluate to (type, operand) pairs.
+    def __init__(self, diagnostics=None):
+        super().__init__(diagnostics)
+        self.sast = SASTAnalyzer()
+        self.ir = IRGenerator()
+
+    def run(self, ast):
+        # With a Diagnostics collector, raises CompileError with everything
+        # reported to it (by the lexer and the parser too) before the SAST.
+        self.enter_scope() # Global scope
+        self.visit(ast)
+        self.exit_scope()
+        if self.diagnostics is not None:
+            self.diagnostics.check()
+        return self.sast.analyze_ir(self.ir.ir_code, self.ir.nodes), self.ir.ir_code
+
+    def visit_FunctionDeclaration(self, node):
+        func_name = node.value
+        self.declare(node, func_name, "function", {"return_type": node.return_type})
+        self.ir.emit(Instr(FUNC, label=func_name))
+        self.enter_scope() # Function scope
+        for param in node.params.children:
+            self.declare(param, param.value, param.param_type, "parameter")
+        yield node.body
+        self.exit_scope()
+        self.ir.emit(Instr(END_FUNC, label=func_name))
+
+    def visit_VariableDeclaration(self, node):
+        var_name = node.value
+        var_type = node.var_type
+        if var_type is None:
+            # Inferred: the initializer is typed before the name exists.
+            expr_type, operand = yield node.expr
+            self.declare(node, var_name, expr_type, "variable")
+        else:
+            self.declare(node, var_name, var_type, "variable")
+            expr_type, operand = yield node.expr
+            if expr_type and expr_type != ERROR_TYPE and var_type != expr_type:
+                self.report(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {var_type}, mas obteve {expr_type}.", node)
+        self.ir.emit(Instr(ASSIGN, Var(var_name), (operand,)))
+
+    def visit_AssignmentStatement(self, node):
+        var_name = node.value
+        symbol = self.symbols.get_symbol(var_name)
+        if not symbol:
+            self.report(f"Erro semântico: Variável '{var_name}' não declarada.", node)
+        expr_type, operand = yield node.expr
+        if symbol and symbol.type and expr_type and ERROR_TYPE not in (symbol.type, expr_type) and symbol.type != expr_type:
+            self.report(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {symbol.type}, mas obteve {expr_type}.", node)
+        self.ir.emit(Instr(ASSIGN, Var(var_name), (operand,)))
+
+    def visit_IfStatement(self, node):
+        ir = self.ir
+        condition_type, condition = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'if' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
+        else_label = ir.new_label()
+        end_if_label = ir.new_label()
+        ir.emit(Instr(IF_FALSE, args=(condition,), label=else_label))
+        self.enter_scope()
+        yield node.then_block
+        self.exit_scope()
+        ir.emit(Instr(GOTO, label=end_if_label))
+        ir.emit(Instr(LABEL, label=else_label))
+        if node.else_block:
+            self.enter_scope()
+            yield node.else_block
+            self.exit_scope()
+        ir.emit(Instr(LABEL, label=end_if_label))
+
+    def visit_ForStatement(self, node):
+        ir = self.ir
+        self.enter_scope()
+        if node.init:
+            yield node.init
+        loop_start_label = ir.new_label()
+        loop_end_label = ir.new_label()
+        ir.emit(Instr(LABEL, label=loop_start_label))
+        condition_type, condition = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'for' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
+        ir.emit(Instr(IF_FALSE, args=(condition,), label=loop_end_label))
+        if node.update:
+            # The update is checked before the body but emitted after it: its
+            # IR is set aside, and its temporaries renumbered to follow the
+            # body's, as the separate passes would number them.
+            code, ir.ir_code = ir.ir_code, []
+            temp_counter = ir.temp_counter
+            yield node.update
+            update_code, ir.ir_code = ir.ir_code, code
+            ir.temp_counter = temp_counter
+        yield node.body
+        if node.update:
+            temps = {}
+            for instr in update_code:
+                args = tuple(temps.get(arg, arg) for arg in instr.args)
+                dest = instr.dest
+                if isinstance(dest, Temp):
+                    temps[dest] = ir.new_temp()
+                    dest = temps[dest]
+                ir.emit(Instr(instr.op, dest, args, instr.operator, instr.label))
+        ir.emit(Instr(GOTO, label=loop_start_label))
+        ir.emit(Instr(LABEL, label=loop_end_label))
+        self.exit_scope()
+
+    def visit_WhileStatement(self, node):
+        ir = self.ir
+        loop_start_label = ir.new_label()
+        loop_end_label = ir.new_label()
+        ir.emit(Instr(LABEL, label=loop_start_label))
+        condition_type, condition = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'while' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
+        ir.emit(Instr(IF_FALSE, args=(condition,), label=loop_end_label))
+        self.enter_scope()
+        yield node.body
+        self.exit_scope()
+        ir.emit(Instr(GOTO, label=loop_start_label))
+        ir.emit(Instr(LABEL, label=loop_end_label))
+
+    def leave_ReturnStatement(self, node, expr):
+        self.ir.emit_sink(Instr(RETURN, args=(expr[1],)), node)
+        return expr[0]
+
+    def leave_PrintStatement(self, node, expr):
+        self.ir.emit_sink(Instr(PRINT, args=(expr[1],)), node)
+
+    def leave_BinaryExpression(self, node, left, right):
+        result_type = SemanticAnalyzer.leave_BinaryExpression(self, node, left[0], right[0])
+        return result_type, self.ir.leave_BinaryExpression(node, left[1], right[1])
+
+    def visit_NumberLiteral(self, node):
+        return ("float" if "." in node.value else "int"), Const(node.value)
+
+    def visit_StringLiteral(self, node):
+        return "string", Const(node.value)
+
+    def visit_Identifier(self, node):
+        symbol = self.symbols.get_symbol(node.value)
+        if not symbol:
+            self.report(f"Erro semântico: Variável '{node.value}' não declarada.", node)
+            return ERROR_TYPE, Var(node.value)
+        return symbol.type, Var(node.value)
@@ -0,0 +1,118 @@
+import hashlib
+import importlib.abc
+import importlib.util
+import json
+import os
+import sys
+
+from bytecode import cache_data, cache_header, cache_path, cache_payload, write_atomic
+from compile_cache import compiler_fingerprint
+from main import DEFAULT_OPT_LEVEL, compile_code, output_path
+
+SOURCE_SUFFIX = ".charmeleon"
+
+
+class CharmeleonLoader(importlib.abc.Loader):
+    # Compiles a .charmeleon file to a code object and runs it as the module.
+    # The code is cached under __pycache__ next to the source: a cache whose
+    # recorded mtime and size match the source is used without reading the
+    # source; otherwise it is still used if the source's hash matches. A change
+    # to the compiler or to the options invalidates it. The SAST report of the
+    # compilation is kept in the module's __sast__.
+    def __init__(self, path, opt_level=DEFAULT_OPT_LEVEL):
+        self.path = path
+        self.opt_level = opt_level
+
+    def _compiler_digest(self):
+        options = json.dumps({"fused": True, "opt_level": self.opt_level}, sort_keys=True)
+        return hashlib.sha256((compiler_fingerprint() + options).encode()).digest()
+
+    def _load(self):
+        stat = os.stat(self.path)
+        compiler_digest = self._compiler_digest()
+        cache_file = cache_path(self.path)
+        try:
+            with open(cache_file, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        header = cache_header(data)
+        if header is not None and header[2] == compiler_digest:
+            if header[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cache_payload(data)
+        with open(self.path, "rb") as f:
+            source_bytes = f.read()
+        source_digest = hashlib.sha256(source_bytes).digest()
+        if header is not None and header[2:] == (compiler_digest, source_digest):
+            # Same source with a new mtime (checkout, touch): record it.
+            payload = cache_payload(data)
+        else:
+            try:
+                payload = compile_code(source_bytes.decode("utf-8"), output_path(self.path), opt_level=self.opt_level)
+            except Exception as e:
+                raise ImportError(f"Erro ao compilar '{self.path}': {e}", path=self.path) from e
+        if not sys.dont_write_bytecode:
+            try:
+                write_atomic(cache_file, cache_data(stat, compiler_digest, source_digest, payload))
+            except OSError:
+                pass
+        return payload
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        sast_report, code = self._load()
+        module.__sast__ = sast_report
+        exec(code, module.__dict__)
+
+    def get_code(self, fullname):
+        return self._load()[1]
+
+
+class CharmeleonFinder(importlib.abc.MetaPathFinder):
+    # Finds `<name>.charmeleon` on sys.path (or in the package's __path__ for
+    # submodules). It sits after Python's own finders, so regular modules
+    # never pay for the extra lookups.
+    def __init__(self, opt_level=DEFAULT_OPT_LEVEL):
+        self.opt_level = opt_level
+
+    def find_spec(self, fullname, path=None, target=None):
+        name = fullname.rpartition(".")[2]
+        for entry in path if path is not None else sys.path:
+            candidate = os.path.join(entry or ".", name + SOURCE_SUFFIX)
+            if os.path.isfile(candidate):
+                candidate = os.path.abspath(candidate)
+                return importlib.util.spec_from_file_location(
+                    fullname, candidate, loader=CharmeleonLoader(candidate, self.opt_level))
+        return None
+
+
+def install(opt_level=DEFAULT_OPT_LEVEL):
+    # Lets `import foo` load foo.charmeleon. Returns the finder; installing
+    # again replaces the previous one.
+    uninstall()
+    finder = CharmeleonFinder(opt_level)
+    sys.meta_path.append(finder)
+    return finder
+
+
+def uninstall():
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, CharmeleonFinder)]
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, "ola.charmeleon"), "w", encoding="utf-8") as f:
+        f.write('func main() { var nome = "mundo"; print("olá, " + nome); }')
+    sys.path.insert(0, directory)
+    install()
+    for attempt in ("compilando", "do cache"):
+        start = time.perf_counter()
+        import ola
+        print(f"import {attempt}: {(time.perf_counter() - start) * 1000:.1f} ms")
+        ola.main()
+        del sys.modules["ola"]
@@ -0,0 +1,241 @@
+import hashlib
+import os
+import sys
+import time
+
+from code_generator import CodeGenerator
+from diagnostics import Diagnostics, source_location
+from front_end import FusedFrontEnd
+from lexer import Lexer, TokenStream, TK_DELIMITER, TK_KEYWORD, relex
+from main import DEFAULT_OPT_LEVEL, output_path, sast_report
+from optimizer import Optimizer
+from parser import Parser
+from semantic_analyzer import SymbolTable
+
+
+class _RecordingSymbolTable(SymbolTable):
+    # Notes every lookup that resolves to a global (a function declared before
+    # the one being analyzed) or to nothing: the function's result depends on
+    # exactly those bindings.
+    __slots__ = ("reads",)
+
+    def __init__(self):
+        super().__init__()
+        self.reads = {}
+
+    def get_symbol(self, name):
+        symbol = super().get_symbol(name)
+        if symbol is None:
+            self.reads[name] = None
+        elif symbol.depth == 0:
+            self.reads[name] = symbol.type
+        return symbol
+
+
+class _Unit:
+    # One top-level function and what was computed for it. `reads` maps the
+    # global names it looked up to the type they had (None: undeclared); None
+    # until the function has been analyzed. `start` is the source offset the
+    # node positions are relative to, where the function was when parsed.
+    __slots__ = ("node", "name", "return_type", "start", "reads", "vulnerabilities", "ir_code", "python_code")
+
+    def __init__(self, node, start):
+        self.node = node
+        self.name = node.value
+        self.return_type = node.return_type
+        self.start = start
+        self.reads = None
+
+
+def source_edit(old, new):
+    # The single edit (offset, deleted, inserted) that turns `old` into `new`:
+    # whatever lies between their common prefix and common suffix. Both are
+    # found by bisecting on slice comparisons, which run in C.
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old.startswith(new[:mid]):
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old.endswith(new[len(new) - mid:]):
+            lo = mid
+        else:
+            hi = mid - 1
+    return prefix, len(old) - prefix - lo, new[prefix:len(new) - lo]
+
+
+def split_units(tokens):
+    # (first, end) token ranges of the top-level units of a TokenStream: each
+    # starts at a `func` keyword outside any braces. Tokens before the first
+    # one (a syntax error) form a unit of their own.
+    kinds, starts, source = tokens.kinds, tokens.starts, tokens.source
+    bounds = []
+    depth = 0
+    for index, kind in enumerate(kinds):
+        if kind == TK_DELIMITER:
+            char = source[starts[index]]
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+        elif kind == TK_KEYWORD and depth == 0 and index and source.startswith("func", starts[index]):
+            bounds.append(index)
+    units = []
+    first = 0
+    for index in bounds:
+        units.append((first, index))
+        first = index
+    if first < len(kinds):
+        units.append((first, len(kinds)))
+    return units
+
+
+class IncrementalCompiler:
+    # Recompiles a file function by function. Each top-level function is a
+    # unit keyed by the SHA-256 of its text, and keeps its AST, SAST findings,
+    # optimized IR and Python code between compilations. A unit whose text is
+    # unchanged is reused as is unless a global name it read (another
+    # function's name) now resolves differently; then it is analyzed again
+    # from its cached AST. Temporaries and labels are numbered per function,
+    # so the output is that of compiling each function on its own. Errors are
+    # collected over the whole file, as in compile_charmeleon; a function
+    # with errors is not kept.
+    # The tokens are kept too: a new version of the source is re-lexed only
+    # where it differs from the last one. Splitting into units is the only
+    # pass over the whole file.
+    def __init__(self, opt_level=DEFAULT_OPT_LEVEL):
+        self.opt_level = opt_level
+        self.units = {}
+        self.tokens = None
+        # Per compile(): units parsed, analyzed (and lowered) and reused as is.
+        self.parsed = 0
+        self.analyzed = 0
+        self.reused = 0
+
+    def compile(self, source_code):
+        # Returns (SAST report, Python code), as compile_charmeleon does, or
+        # raises CompileError with every error in the file.
+        diagnostics = Diagnostics(lambda offset: source_location(source_code, offset))
+        tokens = self._tokenize(source_code, diagnostics)
+        starts, ends = tokens.starts, tokens.ends
+        self.parsed = self.analyzed = self.reused = 0
+        previous = self.units
+        units = {}
+        declared = {}
+        vulnerabilities = []
+        python_parts = []
+        for first, end in split_units(tokens):
+            start = starts[first]
+            text = source_code[start:ends[end - 1]]
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            unit = units.get(digest) or previous.get(digest)
+            errors = len(diagnostics)
+            if unit is None:
+                stream = TokenStream(source_code, tokens.kinds[first:end], starts[first:end], ends[first:end])
+                program = Parser(stream, diagnostics).parse()
+                self.parsed += 1
+                if not program.children:
+                    continue
+                unit = _Unit(program.children[0], start)
+            if (unit.reads is None or unit.name in declared
+                    or any(declared.get(name, (None,))[0] != type for name, type in unit.reads.items())):
+                self._analyze(unit, declared, diagnostics, start)
+                self.analyzed += 1
+            else:
+                self.reused += 1
+            declared[unit.name] = ("function", unit.return_type)
+            if len(diagnostics) == errors:
+                units[digest] = unit
+                vulnerabilities.extend(unit.vulnerabilities)
+                python_parts.append(unit.python_code)
+        diagnostics.check()
+        self.units = units
+        return sast_report(vulnerabilities), "\n".join(python_parts)
+
+    def _tokenize(self, source_code, diagnostics):
+        # Re-lexes only the edit since the last compilation. A source with
+        # lexical errors is lexed in full, reporting and skipping them, and its
+        # tokens are not kept: relex() would not look at the skipped text again.
+        if self.tokens is not None:
+            try:
+                relex(self.tokens, *source_edit(self.tokens.source, source_code))
+                return self.tokens
+            except Exception:
+                self.tokens = None
+        errors = len(diagnostics)
+        tokens = Lexer(source_code).tokenize_stream(diagnostics)
+        if len(diagnostics) == errors:
+            self.tokens = tokens
+        return tokens
+
+    def ir_code(self):
+        # Optimized IR of the last compilation, in source order.
+        return [instr for unit in self.units.values() for instr in unit.ir_code]
+
+    def _analyze(self, unit, declared, diagnostics, start):
+        # Errors go to `diagnostics`, located where the function now starts.
+        locate = diagnostics.locate
+        shift = start - unit.start
+        front_end = FusedFrontEnd(Diagnostics(lambda offset: locate(offset + shift), diagnostics.items))
+        symbols = front_end.symbols = _RecordingSymbolTable()
+        symbols.enter_scope() # Global scope
+        for name, (type, return_type) in declared.items():
+            symbols.add_symbol(name, type, kind={"return_type": return_type})
+        errors = len(diagnostics)
+        front_end.visit(unit.node)
+        symbols.reads.pop(unit.name, None)
+        unit.reads = symbols.reads
+        if len(diagnostics) != errors:
+            return
+        unit.vulnerabilities = front_end.sast.analyze_ir(front_end.ir.ir_code, front_end.ir.nodes)
+        unit.ir_code = Optimizer(front_end.ir.ir_code).optimize(self.opt_level)
+        unit.python_code = CodeGenerator(unit.ir_code).gen()
+
+
+def watch(input_file, opt_level=DEFAULT_OPT_LEVEL, interval=0.2):
+    # Recompiles `input_file` into its .py whenever it changes, until
+    # interrupted. Errors are reported and the next save is awaited.
+    compiler = IncrementalCompiler(opt_level)
+    output_file = output_path(input_file)
+    last = None
+    while True:
+        try:
+            stat = os.stat(input_file)
+        except OSError:
+            stat = None
+        current = (stat.st_mtime_ns, stat.st_size) if stat is not None else None
+        if current != last and current is not None:
+            last = current
+            start = time.perf_counter()
+            try:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    source_code = f.read()
+                _, python_code = compiler.compile(source_code)
+                with open(output_file, "w", encoding="utf-8") as f:
+                    f.write(python_code)
+            except Exception as e:
+                print(f"Erro ao compilar '{input_file}': {e}", file=sys.stderr)
+            else:
+                total = compiler.analyzed + compiler.reused
+                print(f"{output_file} atualizado em {(time.perf_counter() - start) * 1000:.1f} ms "
+                      f"({compiler.analyzed} de {total} funções recompiladas)", file=sys.stderr)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    code = """
+func saudacao(nome: string) { print("olá, " + nome); }
+func main() { var x = 10; if (x > 5) { print(x); } }
+"""
+    compiler = IncrementalCompiler()
+    edited = code.replace("x > 5", "x > 7")
+    for source in (code, edited, edited.replace("func saudacao", "func ola")):
+        _, python_code = compiler.compile(source)
+        print(python_code)
+        print(f"analisadas: {compiler.analyzed}, reaproveitadas: {compiler.reused}\n")
@@ -0,0 +1,176 @@
+import re
+
+# Opcodes of the three-address IR, small integers in the style of the lexer's
+# token kinds. OPCODES[op] is the mnemonic used by the text form.
+OPCODES = ("FUNC", "END_FUNC", "LABEL", "ASSIGN", "BIN_OP", "IF_FALSE", "GOTO", "PRINT", "RETURN", "FOR_RANGE", "PHI")
+OPCODE_KINDS = {name: op for op, name in enumerate(OPCODES)}
+FUNC, END_FUNC, LABEL, ASSIGN, BIN_OP, IF_FALSE, GOTO, PRINT, RETURN, FOR_RANGE, PHI = range(len(OPCODES))
+
+# FOR_RANGE heads a counted loop, `FOR_RANGE i, start, stop, step GOTO L`: on
+# entry from outside i takes `start`, on every later entry it advances by
+# `step`, and once it would reach `stop` (Python range semantics) control goes
+# to L. The optimizer produces it; IRGenerator never does.
+JUMPS = frozenset((GOTO, IF_FALSE, FOR_RANGE))
+
+# PHI only exists in SSA form (ssa.py), `PHI x.3, x.1, x.2`: args[i] is the
+# value flowing in from the block's i-th predecessor. SSA versions of a name
+# are spelled name.<n>.
+
+
+class Operand:
+    # Operands compare by class and text, so they can be used as dict/set keys.
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and self.text == other.text
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.text!r})"
+
+
+class Temp(Operand):
+    # Compiler temporary t<index>.
+    __slots__ = ("index", "text")
+
+    def __init__(self, index):
+        self.index = index
+        self.text = f"t{index}"
+
+
+class Var(Operand):
+    # Program variable or parameter.
+    __slots__ = ("text",)
+
+    def __init__(self, name):
+        self.text = name
+
+
+class Const(Operand):
+    # Literal, kept as its source text ("10", "2.5", '"abc"').
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class Instr:
+    # One IR instruction. `dest` is the operand written, `args` the operands
+    # read; `label` is the jump target, the label defined, or the function name
+    # for FUNC/END_FUNC; `operator` is the Charmeleon operator of a BIN_OP.
+    __slots__ = ("op", "dest", "args", "operator", "label")
+
+    def __init__(self, op, dest=None, args=(), operator=None, label=None):
+        self.op = op
+        self.dest = dest
+        self.args = args
+        self.operator = operator
+        self.label = label
+
+    def __eq__(self, other):
+        return isinstance(other, Instr) and self.op == other.op and self.dest == other.dest and \
+            self.args == other.args and self.operator == other.operator and self.label == other.label
+
+    __hash__ = None
+
+    def __str__(self):
+        return format_instr(self)
+
+    def __repr__(self):
+        return f"Instr({format_instr(self)!r})"
+
+
+def format_instr(instr):
+    op = instr.op
+    if op == BIN_OP:
+        left, right = instr.args
+        return f"BIN_OP {instr.dest}, {left}, {instr.operator}, {right}"
+    if op == ASSIGN:
+        return f"ASSIGN {instr.dest}, {instr.args[0]}"
+    if op == LABEL:
+        return f"{instr.label}:"
+    if op == IF_FALSE:
+        return f"IF_FALSE {instr.args[0]} GOTO {instr.label}"
+    if op == GOTO:
+        return f"GOTO {instr.label}"
+    if op == FOR_RANGE:
+        start, stop, step = instr.args
+        return f"FOR_RANGE {instr.dest}, {start}, {stop}, {step} GOTO {instr.label}"
+    if op == PRINT or op == RETURN:
+        return f"{OPCODES[op]} {instr.args[0]}"
+    if op == PHI:
+        return f"PHI {instr.dest}, {', '.join(str(arg) for arg in instr.args)}"
+    if op == FUNC:
+        return f"FUNC {instr.label}:"
+    if op == END_FUNC:
+        return f"END_FUNC {instr.label}"
+    raise Exception(f"Opcode de IR desconhecido: {op}")
+
+
+def format_ir(instrs):
+    # Text dump, one instruction per line.
+    return [format_instr(instr) for instr in instrs]
+
+
+_TEMP_RE = re.compile(r"t(\d+)$")
+_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.\d+)?$")
+_LINE_PATTERNS = (
+    (FUNC, re.compile(r"FUNC\s+([^:]+):$")),
+    (END_FUNC, re.compile(r"END_FUNC\s+(.+)$")),
+    (LABEL, re.compile(r"([A-Za-z_][A-Za-z0-9_]*):$")),
+    (ASSIGN, re.compile(r"ASSIGN\s+([^,]+),\s+(.+)$")),
+    (BIN_OP, re.compile(r"BIN_OP\s+([^,]+),\s+([^,]+),\s+([^,]+),\s+(.+)$")),
+    (IF_FALSE, re.compile(r"IF_FALSE\s+(\S+)\s+GOTO\s+(.+)$")),
+    (GOTO, re.compile(r"GOTO\s+(.+)$")),
+    (FOR_RANGE, re.compile(r"FOR_RANGE\s+([^,]+),\s+([^,]+),\s+([^,]+),\s+(\S+)\s+GOTO\s+(.+)$")),
+    (PRINT, re.compile(r"PRINT\s+(.+)$")),
+    (RETURN, re.compile(r"RETURN\s+(.+)$")),
+    (PHI, re.compile(r"PHI\s+([^,]+),\s+(.+)$")),
+)
+
+
+def parse_operand(text):
+    # In text form a variable spelled like a temporary reads back as a Temp.
+    text = text.strip()
+    m = _TEMP_RE.match(text)
+    if m:
+        return Temp(int(m.group(1)))
+    if _NAME_RE.match(text):
+        return Var(text)
+    return Const(text)
+
+
+def parse_instr(line):
+    line = line.strip()
+    for op, pattern in _LINE_PATTERNS:
+        m = pattern.match(line)
+        if m is None:
+            continue
+        groups = [g.strip() for g in m.groups()]
+        if op == FUNC or op == END_FUNC or op == LABEL or op == GOTO:
+            return Instr(op, label=groups[0])
+        if op == ASSIGN:
+            return Instr(op, parse_operand(groups[0]), (parse_operand(groups[1]),))
+        if op == BIN_OP:
+            return Instr(op, parse_operand(groups[0]), (parse_operand(groups[1]), parse_operand(groups[3])), groups[2])
+        if op == IF_FALSE:
+            return Instr(op, args=(parse_operand(groups[0]),), label=groups[1])
+        if op == FOR_RANGE:
+            return Instr(op, parse_operand(groups[0]), tuple(parse_operand(g) for g in groups[1:4]), label=groups[4])
+        if op == PHI:
+            return Instr(op, parse_operand(groups[0]), tuple(parse_operand(g) for g in groups[1].split(",")))
+        return Instr(op, args=(parse_operand(groups[0]),))
+    raise Exception(f"Instrução de IR inválida: {line}")
+
+
+def parse_ir(lines):
+    # Reads a text dump back into instructions; blank lines are skipped.
+    return [parse_instr(line) for line in lines if line.strip()]
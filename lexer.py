@@ -1,23 +1,387 @@
 import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from sys import intern
+
+KEYWORDS = frozenset((
+    "func", "if", "else", "for", "while", "var", "int", "float", "bool",
+    "string", "true", "false", "return", "print",
+))
+
+TOKEN_SPECS = [
+    ("SKIP",        r"\s+|//.*|/\*.*?\*/"),  # Whitespace and comments
+    ("KEYWORD",     r"\b(func|if|else|for|while|var|int|float|bool|string|true|false|return|print)\b"),
+    ("IDENTIFIER",  r"[a-zA-Z_][a-zA-Z0-9_]*"),
+    ("NUMBER",      r"\d+(\.\d*)?"),
+    ("STRING",      r"\"(?:[^\\\"]|\\.)*\"|\'(?:[^\\\']|\\.)*\'"), # Updated to handle escaped quotes and single quotes
+    ("ASSIGN",      r"="),
+    ("OPERATOR",    r"\+\+|--|==|!=|<=|>=|&&|\|\||->|[+\-*/%<>]"), # Added -> back
+    ("DELIMITER",   r"[(){},;:]"),
+]
+
+# Small integer token kinds used by TokenStream; index 0 marks end of input.
+TOKEN_TYPES = ("EOF", "KEYWORD", "IDENTIFIER", "NUMBER", "STRING", "ASSIGN", "OPERATOR", "DELIMITER")
+TOKEN_KINDS = {name: kind for kind, name in enumerate(TOKEN_TYPES)}
+TK_EOF, TK_KEYWORD, TK_IDENTIFIER, TK_NUMBER, TK_STRING, TK_ASSIGN, TK_OPERATOR, TK_DELIMITER = range(len(TOKEN_TYPES))
+TK_SKIP = 255
+
+_master_pattern = None
+_group_kinds = None
+# Text no token matches yet, but one may once more input follows: an
+# unterminated string, or the first character of "&&", "||" or "!=".
+_PARTIAL_TOKEN = re.compile(r"\"(?:[^\\\"]|\\.)*\\?|'(?:[^\\']|\\.)*\\?|[&|!]")
+
+
+def master_pattern():
+    # Single alternation over TOKEN_SPECS, compiled once per process. KEYWORD is
+    # left out: keywords are split from identifiers with a set lookup instead.
+    global _master_pattern, _group_kinds
+    if _master_pattern is None:
+        pattern = re.compile("|".join(
+            f"(?P<{name}>{regex})" for name, regex in TOKEN_SPECS if name != "KEYWORD"
+        ))
+        # m.lastindex is always the outermost (named) group, so map it straight to a kind.
+        kinds = [TK_SKIP] * (pattern.groups + 1)
+        for name, index in pattern.groupindex.items():
+            kinds[index] = TOKEN_KINDS.get(name, TK_SKIP)
+        _group_kinds = kinds
+        _master_pattern = pattern
+    return _master_pattern
+
+
+class TokenStream:
+    # Array-backed token list: one byte of kind plus start/end offsets into the
+    # source per token. Values are sliced from the source only when asked for.
+    # relex() leaves the offsets from token `_gap` on `_delta` short of their
+    # value, so consecutive edits only move the gap between them; reading
+    # `starts` or `ends` settles the whole tail first.
+    __slots__ = ("source", "kinds", "_starts", "_ends", "_gap", "_delta")
+
+    def __init__(self, source, kinds=None, starts=None, ends=None):
+        self.source = source
+        self.kinds = kinds if kinds is not None else array("B")
+        self._starts = starts if starts is not None else array("I")
+        self._ends = ends if ends is not None else array("I")
+        self._gap = 0
+        self._delta = 0
+
+    @property
+    def starts(self):
+        if self._delta:
+            self._settle()
+        return self._starts
+
+    @property
+    def ends(self):
+        if self._delta:
+            self._settle()
+        return self._ends
+
+    def _settle(self):
+        _shift(self._starts, self._gap, len(self._starts), self._delta)
+        _shift(self._ends, self._gap, len(self._ends), self._delta)
+        self._delta = 0
+
+    @classmethod
+    def from_dicts(cls, tokens):
+        # Compatibility path for callers still holding {"type", "value"} dicts.
+        stream = cls("")
+        parts = []
+        offset = 0
+        for token in tokens:
+            value = token["value"]
+            stream.kinds.append(TOKEN_KINDS[token["type"]])
+            stream.starts.append(offset)
+            offset += len(value)
+            stream.ends.append(offset)
+            parts.append(value)
+        stream.source = "".join(parts)
+        return stream
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, index):
+        return self.kinds[index]
+
+    def type(self, index):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def value(self, index):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {"type": TOKEN_TYPES[self.kinds[index]], "value": self.source[self.starts[index]:self.ends[index]]}
+
+    def __iter__(self):
+        source = self.source
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            yield {"type": TOKEN_TYPES[kind], "value": source[start:end]}
+
+    def __repr__(self):
+        return f"TokenStream({len(self)} tokens)"
+
+
+def _shift(offsets, lo, hi, delta):
+    # offsets[lo:hi] += delta without a Python-level loop: the slice's bytes,
+    # read as one int, get delta added to every field at once. Offsets stay
+    # within the source, so no field over- or underflows into its neighbour.
+    if lo >= hi or not delta:
+        return
+    order = sys.byteorder
+    data = offsets[lo:hi].tobytes()
+    ones = int.from_bytes((1).to_bytes(offsets.itemsize, order) * (hi - lo), order)
+    value = int.from_bytes(data, order) + delta * ones
+    offsets[lo:hi] = array(offsets.typecode, value.to_bytes(len(data), order))
+
+
+def _find(bisect, offsets, x, gap, delta):
+    # bisect(offsets, x) for offsets that lag `delta` behind from `gap` on.
+    index = bisect(offsets, x, 0, gap)
+    if index == gap:
+        index = bisect(offsets, x - delta, gap)
+    return index
+
+
+def _is_word_char(ch):
+    # Same notion of "word character" as the \b anchors of the KEYWORD spec.
+    return ch.isalnum() or ch == "_"
+
+
+class StreamingLexer:
+    # Lexes a file object (or any iterable of str chunks) lazily, yielding
+    # (kind, value) pairs; `start` is the source offset of the last one. Only
+    # the unconsumed tail of the current chunk is buffered; besides it, just
+    # the offset of each line start is kept, for location(). A Diagnostics
+    # collector works as in Lexer.tokenize_stream.
+    def __init__(self, source, chunk_size=1 << 16, diagnostics=None):
+        if isinstance(source, str):
+            source = (source,)
+        elif hasattr(source, "read"):
+            read = source.read
+            source = iter(lambda: read(chunk_size), "")
+        self.chunks = iter(source)
+        self.position = 0
+        self.start = None
+        self.line_starts = array("I", (0,))
+        self.diagnostics = diagnostics
+
+    def location(self, offset):
+        # 1-based (line, column) of a source offset already read.
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def _stable(self, m, kind, buffer, pos):
+        # Whether the match at pos can no longer change once more input arrives.
+        end = m.end()
+        if end == len(buffer):
+            return False
+        if kind == TK_OPERATOR and buffer[pos] == "/" and buffer[end] == "*":
+            # "/*" only lexes as a comment when "*/" follows on the same line.
+            return "\n" in buffer[end:]
+        return True
+
+    def __iter__(self):
+        pattern = master_pattern()
+        group_kinds = _group_kinds
+        line_starts = self.line_starts
+        partial = _PARTIAL_TOKEN.fullmatch
+        buffer = ""
+        prev_char = ""
+        final = False
+        # Whether the last character consumed was part of a run of unexpected
+        # characters, reported once as in tokenize_stream.
+        skipping = False
+        while not final:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                final = True
+            else:
+                base = self.position + len(buffer) + 1
+                at = chunk.find("\n")
+                while at != -1:
+                    line_starts.append(base + at)
+                    at = chunk.find("\n", at + 1)
+                buffer += chunk
+            pos = 0
+            end = len(buffer)
+            while pos < end:
+                m = pattern.match(buffer, pos)
+                if m is None:
+                    # Only a possibly incomplete token at the end of the buffer
+                    # waits for more input; anything else is an error now.
+                    if not final and partial(buffer, pos):
+                        break
+                    if not skipping:
+                        if self.diagnostics is None:
+                            self.position += pos
+                            raise Exception(f"Caractere inesperado: {buffer[pos]}")
+                        self.diagnostics.error(f"Caractere inesperado: {buffer[pos]}", self.position + pos)
+                        skipping = True
+                    pos += 1
+                    continue
+                kind = group_kinds[m.lastindex]
+                if not final and not self._stable(m, kind, buffer, pos):
+                    break
+                skipping = False
+                start = pos
+                pos = m.end()
+                if kind == TK_SKIP:
+                    continue
+                value = m.group()
+                if kind == TK_IDENTIFIER and value in KEYWORDS and \
+                   not _is_word_char(buffer[start - 1] if start else prev_char) and \
+                   not (pos < end and _is_word_char(buffer[pos])):
+                    kind = TK_KEYWORD
+                elif kind == TK_IDENTIFIER:
+                    value = intern(value)
+                self.start = self.position + start
+                yield kind, value
+            if pos:
+                prev_char = buffer[pos - 1]
+                self.position += pos
+                buffer = buffer[pos:]
+
+
+def relex(tokens, offset, deleted, inserted):
+    # Incremental re-lexing for editors: applies the edit
+    # source[offset:offset + deleted] = inserted to a TokenStream, in place.
+    # Lexing restarts at the end of the last token the edit cannot affect and
+    # stops as soon as a new token starts where an old one did in the
+    # unchanged text after the edit; the old tokens from there on are kept,
+    # and their offsets shifted lazily (see TokenStream).
+    # Returns (first, old_end, new_end): tokens[first:old_end] before the edit
+    # became tokens[first:new_end].
+    source = tokens.source
+    if offset < 0 or deleted < 0 or offset + deleted > len(source):
+        raise Exception(f"Edição fora do texto: {offset}+{deleted} em {len(source)} caracteres.")
+    code = source[:offset] + inserted + source[offset + deleted:]
+    kinds, starts, ends = tokens.kinds, tokens._starts, tokens._ends
+    count = len(kinds)
+    gap, delta = (tokens._gap, tokens._delta) if tokens._delta else (count, 0)
+
+    def start_of(index):
+        return starts[index] + delta if index >= gap else starts[index]
+
+    def end_of(index):
+        return ends[index] + delta if index >= gap else ends[index]
+
+    shift = len(inserted) - deleted
+    # First token that may change: the matchers look at most one character
+    # past a token's end.
+    first = _find(bisect_left, ends, offset, gap, delta)
+    # Block comments end at the line's first "*/": a "/*" before the edit on
+    # the same line may turn into one.
+    at = source.find("/*", source.rfind("\n", 0, offset) + 1, offset)
+    if at != -1:
+        first = min(first, _find(bisect_right, ends, at, gap, delta))
+    position = end_of(first - 1) if first else 0
+    # Old tokens starting at or after `unchanged` (old offsets) lie wholly in
+    # the text after the edit, with that text's previous character too.
+    old = _find(bisect_left, starts, offset + deleted + 1, gap, delta)
+    new_kinds, new_starts, new_ends = array("B"), array("I"), array("I")
+    match = master_pattern().scanner(code, position).match
+    group_kinds = _group_kinds
+    end = len(code)
+    while position < end:
+        m = match()
+        if m is None:
+            raise Exception(f"Caractere inesperado: {code[position]}")
+        start = position
+        position = m.end()
+        kind = group_kinds[m.lastindex]
+        if kind == TK_SKIP:
+            continue
+        while old < count and start_of(old) + shift < start:
+            old += 1
+        if old < count and start_of(old) + shift == start:
+            break
+        if kind == TK_IDENTIFIER and code[start:position] in KEYWORDS and \
+           not (start and _is_word_char(code[start - 1])) and \
+           not (position < end and _is_word_char(code[position])):
+            kind = TK_KEYWORD
+        new_kinds.append(kind)
+        new_starts.append(start)
+        new_ends.append(position)
+    else:
+        old = count
+    # The kept tokens must all lag by the same delta: settle those between the
+    # old gap and the edit, so the cost follows the distance between edits.
+    new_end = first + len(new_kinds)
+    if not delta:
+        gap = old
+    if gap > old:
+        _shift(starts, old, gap, shift)
+        _shift(ends, old, gap, shift)
+        gap += new_end - old
+    else:
+        if gap < first:
+            _shift(starts, gap, first, delta)
+            _shift(ends, gap, first, delta)
+        gap = new_end
+    kinds[first:old] = new_kinds
+    starts[first:old] = new_starts
+    ends[first:old] = new_ends
+    tokens.source = code
+    tokens._gap = gap
+    tokens._delta = delta + shift if gap < len(kinds) else 0
+    return first, old, new_end
+
 
 class Lexer:
     def __init__(self, code):
         self.code = code
         self.tokens = []
         self.position = 0
-
-        self.token_specs = [
-            ("SKIP",        r"\s+|//.*|/\*.*?\*/"),  # Whitespace and comments
-            ("KEYWORD",     r"\b(func|if|else|for|while|var|int|float|bool|string|true|false|return|print)\b"),
-            ("IDENTIFIER",  r"[a-zA-Z_][a-zA-Z0-9_]*"),
-            ("NUMBER",      r"\d+(\.\d*)?"),
-            ("STRING",      r"\"(?:[^\\\"]|\\.)*\"|\'(?:[^\\\"]|\\.)*\'"), # Updated to handle escaped quotes and single quotes
-            ("ASSIGN",      r"="),
-            ("OPERATOR",    r"\+\+|--|==|!=|<=|>=|&&|\|\||->|[+\-*/%<>]"), # Added -> back
-            ("DELIMITER",   r"[(){},;:]"),
-        ]
+        self.token_specs = TOKEN_SPECS
 
     def tokenize(self):
+        self.tokens.extend(self.tokenize_stream())
+        return self.tokens
+
+    def tokenize_stream(self, diagnostics=None):
+        # With a Diagnostics collector, unexpected characters are reported and
+        # skipped (a run of them as one error) instead of stopping the lexer.
+        code = self.code
+        stream = TokenStream(code)
+        kinds, starts, ends = stream.kinds, stream.starts, stream.ends
+        pattern = master_pattern()
+        match = pattern.scanner(code, self.position).match
+        group_kinds = _group_kinds
+        end = len(code)
+        position = self.position
+        while position < end:
+            m = match()
+            if m is None:
+                if diagnostics is None:
+                    self.position = position
+                    raise Exception(f"Caractere inesperado: {code[position]}")
+                diagnostics.error(f"Caractere inesperado: {code[position]}", position)
+                position += 1
+                while position < end and pattern.match(code, position) is None:
+                    position += 1
+                match = pattern.scanner(code, position).match
+                continue
+            start = position
+            position = m.end()
+            kind = group_kinds[m.lastindex]
+            if kind == TK_SKIP:
+                continue
+            if kind == TK_IDENTIFIER and code[start:position] in KEYWORDS and \
+               not (start and _is_word_char(code[start - 1])) and \
+               not (position < end and _is_word_char(code[position])):
+                kind = TK_KEYWORD
+            kinds.append(kind)
+            starts.append(start)
+            ends.append(position)
+        self.position = position
+        return stream
+
+    def tokenize_legacy(self):
+        # Original spec-by-spec matcher, kept as the reference for tests and benchmarks.
         while self.position < len(self.code):
             match = None
             for token_type, regex in self.token_specs:
@@ -47,7 +411,3 @@ func main() {
     tokens = lexer.tokenize()
     for token in tokens:
         print(token)
-
-
-
-
@@ -0,0 +1,309 @@
+from cfg import Dominators
+from constant_propagation import literal_value
+from ir import ASSIGN, BIN_OP, FOR_RANGE, GOTO, IF_FALSE, Const, Instr, JUMPS, LABEL
+
+# Operators that may raise at run time; hoisting them out of a loop that runs
+# zero times would raise where the original program did not.
+TRAPPING_OPERATORS = frozenset(("/", "%"))
+
+# Operators that keep integers integers (`/` is true division in Python).
+INTEGER_OPERATORS = frozenset(("+", "-", "*", "%"))
+
+
+class Loop:
+    # A natural loop: its header block index, the indices of its blocks and
+    # the indices of the blocks outside it that it branches to.
+    __slots__ = ("header", "blocks", "exits")
+
+    def __init__(self, header, blocks, exits):
+        self.header = header
+        self.blocks = blocks
+        self.exits = exits
+
+    def __repr__(self):
+        return f"Loop(header={self.header}, blocks={sorted(self.blocks)})"
+
+
+def find_loops(cfg, dominators=None):
+    # Natural loops from back edges (b -> h with h dominating b). Loops sharing
+    # a header are merged. Outermost loops come first.
+    dominators = dominators or Dominators(cfg)
+    bodies = {}
+    for block in cfg.blocks:
+        for succ in block.succs:
+            if dominators.dominates(succ.index, block.index):
+                body = bodies.setdefault(succ.index, {succ.index})
+                stack = [block]
+                while stack:
+                    member = stack.pop()
+                    if member.index not in body:
+                        body.add(member.index)
+                        stack.extend(member.preds)
+    loops = []
+    for header, body in bodies.items():
+        exits = set()
+        for index in body:
+            for succ in cfg.blocks[index].succs:
+                if succ.index not in body:
+                    exits.add(succ.index)
+        loops.append(Loop(header, body, exits))
+    loops.sort(key=lambda loop: -len(loop.blocks))
+    return loops
+
+
+def _has_preheader(cfg, loop):
+    # The loop is entered only by falling into its header from the block laid
+    # out just before it, so code placed before the header's label runs once,
+    # right before the loop.
+    header = cfg.blocks[loop.header]
+    if loop.header == 0 or header.instrs[0].op != LABEL:
+        return False
+    before = cfg.blocks[loop.header - 1]
+    tail = before.instrs[-1]
+    if tail.op in JUMPS and tail.label == header.instrs[0].label:
+        return False
+    return all(pred is before or pred.index in loop.blocks for pred in header.preds)
+
+
+def hoist_invariants(cfg, liveness, dominators=None):
+    # Loop-invariant code motion: a BIN_OP inside a loop whose operands are
+    # literals, names the loop never writes, or results of other hoisted
+    # BIN_OPs moves just before the loop header. Its destination must be
+    # written once in the loop and not be live into the header; unless its
+    # block dominates every exit it must also be dead at the exits, and
+    # trapping operators only move out of the header itself. Returns the new
+    # instruction list and the number of BIN_OPs hoisted.
+    dominators = dominators or Dominators(cfg)
+    blocks = cfg.blocks
+    bits = liveness.bits
+    hoisted = {}
+    moved = set()
+    for loop in find_loops(cfg, dominators):
+        if not _has_preheader(cfg, loop):
+            continue
+        members = sorted(loop.blocks)
+        writes = {}
+        for index in members:
+            for instr in blocks[index].instrs:
+                if instr.dest is not None and id(instr) not in moved:
+                    writes[instr.dest] = writes.get(instr.dest, 0) + 1
+        header_live = liveness.live_in[loop.header]
+        exit_live = 0
+        for index in loop.exits:
+            exit_live |= liveness.live_in[index]
+        dominates_exits = {
+            index: all(dominators.dominates(index, exit_block) for exit_block in loop.exits)
+            for index in members
+        }
+
+        invariant = set()
+        found = []
+        changed = True
+        while changed:
+            changed = False
+            for index in members:
+                for instr in blocks[index].instrs:
+                    if instr.op != BIN_OP or id(instr) in moved or instr.dest in invariant:
+                        continue
+                    dest = instr.dest
+                    if writes.get(dest) != 1:
+                        continue
+                    bit = bits.get(dest)
+                    if bit is not None and header_live >> bit & 1:
+                        continue
+                    if not dominates_exits[index] and bit is not None and exit_live >> bit & 1:
+                        continue
+                    if instr.operator in TRAPPING_OPERATORS and index != loop.header:
+                        continue
+                    if all(arg.__class__ is Const or arg in invariant or arg not in writes for arg in instr.args):
+                        invariant.add(dest)
+                        found.append((index, instr))
+                        changed = True
+        if found:
+            # Keep the loop's own order so definitions precede their uses.
+            position = {id(instr): n for index in members for n, instr in enumerate(blocks[index].instrs)}
+            found.sort(key=lambda item: (item[0], position[id(item[1])]))
+            hoisted.setdefault(loop.header, []).extend(instr for _, instr in found)
+            moved.update(id(instr) for _, instr in found)
+
+    out = []
+    for block in blocks:
+        out.extend(hoisted.get(block.index, ()))
+        out.extend(instr for instr in block.instrs if id(instr) not in moved)
+    return out, len(moved)
+
+
+def _int_literal(operand):
+    if operand.__class__ is not Const:
+        return None
+    value = literal_value(operand)
+    return value if value.__class__ is int else None
+
+
+def _int_names(cfg):
+    # Names that can only ever hold integers: every write is an integer literal,
+    # a copy of one of these names, an integer-preserving BIN_OP on them or a
+    # FOR_RANGE. Parameters are never written, so they are not included.
+    defs = {}
+    for block in cfg.blocks:
+        for instr in block.instrs:
+            if instr.dest is not None:
+                defs.setdefault(instr.dest, []).append(instr)
+    ints = set(defs)
+
+    def is_int(operand):
+        return _int_literal(operand) is not None or operand in ints
+
+    changed = True
+    while changed:
+        changed = False
+        for name in list(ints):
+            for instr in defs[name]:
+                if instr.op == ASSIGN:
+                    ok = is_int(instr.args[0])
+                elif instr.op == BIN_OP:
+                    ok = instr.operator in INTEGER_OPERATORS and is_int(instr.args[0]) and is_int(instr.args[1])
+                else:
+                    ok = instr.op == FOR_RANGE
+                if not ok:
+                    ints.discard(name)
+                    changed = True
+                    break
+    return ints
+
+
+def _counted_loop(cfg, loop, liveness, ints):
+    # Matches the shape a `for`/`while` counter leaves:
+    #   L: BIN_OP c, i, <rel>, n / IF_FALSE c GOTO exit ... BIN_OP u, i, +|-, k /
+    #   ASSIGN i, u / GOTO L
+    # with a single latch, i an integer only written by that update and dead
+    # after the loop, n an integer the loop never writes, k an integer literal
+    # stepping towards n, and an integer literal as i's value on entry.
+    # Returns (i, start, stop, step, relation, header instrs, update instrs)
+    # or None.
+    blocks = cfg.blocks
+    header = blocks[loop.header]
+    if len(header.instrs) != 3 or len(loop.exits) != 1:
+        return None
+    label, test, branch = header.instrs
+    if test.op != BIN_OP or branch.op != IF_FALSE or branch.args[0] != test.dest:
+        return None
+    relation = test.operator
+    counter, stop = test.args
+    if relation not in ("<", "<=", ">", ">=") or counter.__class__ is Const:
+        return None
+    latches = [pred for pred in header.preds if pred.index in loop.blocks]
+    if len(latches) != 1 or len(latches[0].instrs) < 3:
+        return None
+    update, copy, back = latches[0].instrs[-3:]
+    if (back.op != GOTO or copy.op != ASSIGN or copy.dest != counter or copy.args[0] != update.dest
+            or update.op != BIN_OP or update.operator not in ("+", "-") or update.args[0] != counter):
+        return None
+    step = _int_literal(update.args[1])
+    if not step:
+        return None
+    if update.operator == "-":
+        step = -step
+    if (step > 0) != (relation in ("<", "<=")):
+        return None
+
+    uses = {}
+    writes = {}
+    for index in loop.blocks:
+        for instr in blocks[index].instrs:
+            for arg in instr.args:
+                uses[arg] = uses.get(arg, 0) + 1
+            if instr.dest is not None:
+                writes[instr.dest] = writes.get(instr.dest, 0) + 1
+    if uses.get(test.dest) != 1 or uses.get(update.dest) != 1 or writes.get(counter) != 1:
+        return None
+    if not (_int_literal(stop) is not None or (stop in ints and stop not in writes)):
+        return None
+    bit = liveness.bits.get(counter)
+    exit_block = next(iter(loop.exits))
+    if bit is not None and liveness.live_in[exit_block] >> bit & 1:
+        return None
+
+    start = None
+    for instr in reversed(blocks[loop.header - 1].instrs):
+        if instr.dest == counter:
+            start = instr.args[0] if instr.op == ASSIGN and _int_literal(instr.args[0]) is not None else None
+            break
+    if start is None:
+        return None
+    return counter, start, stop, step, relation, (test, branch), (update, copy)
+
+
+def optimize_induction_variables(cfg, liveness, new_temp, dominators=None):
+    # Turns counted loops into FOR_RANGE loops, which the code generator emits
+    # as `for i in range(...)`. When every other use of the counter in the
+    # loop is a product `i * k` by the same positive integer literal, the range
+    # steps over the product instead and the multiplications become copies
+    # (linear-function test replacement). `new_temp()` returns a fresh Temp.
+    # Returns the new instruction list, the number of loops converted and the
+    # number of multiplications removed.
+    dominators = dominators or Dominators(cfg)
+    blocks = cfg.blocks
+    ints = _int_names(cfg)
+    replaced = {}
+    inserted = {}
+    converted = reduced = 0
+    for loop in find_loops(cfg, dominators):
+        if not _has_preheader(cfg, loop):
+            continue
+        match = _counted_loop(cfg, loop, liveness, ints)
+        if match is None:
+            continue
+        counter, start, stop, step, relation, (test, branch), (update, copy) = match
+        preheader = inserted.setdefault(loop.header, [])
+
+        # An inclusive bound becomes the exclusive one range() wants.
+        if relation in ("<=", ">="):
+            delta = 1 if relation == "<=" else -1
+            if stop.__class__ is Const:
+                stop = Const(repr(_int_literal(stop) + delta))
+            else:
+                bound = new_temp()
+                preheader.append(Instr(BIN_OP, bound, (stop, Const("1")), "+" if delta > 0 else "-"))
+                stop = bound
+
+        products = []
+        factor = None
+        for index in loop.blocks:
+            for instr in blocks[index].instrs:
+                if instr is test or instr is update or counter not in instr.args:
+                    continue
+                if instr.op == BIN_OP and instr.operator == "*" and instr.args.count(counter) == 1:
+                    other = instr.args[1] if instr.args[0] == counter else instr.args[0]
+                    value = _int_literal(other)
+                    if value is not None and value > 0 and factor in (None, value):
+                        factor = value
+                        products.append(instr)
+                        continue
+                factor = 0
+        if products and factor:
+            scaled = new_temp()
+            start = Const(repr(_int_literal(start) * factor))
+            if stop.__class__ is Const:
+                stop = Const(repr(_int_literal(stop) * factor))
+            else:
+                bound = new_temp()
+                preheader.append(Instr(BIN_OP, bound, (stop, Const(repr(factor))), "*"))
+                stop = bound
+            for instr in products:
+                replaced[id(instr)] = [Instr(ASSIGN, instr.dest, (scaled,))]
+            reduced += len(products)
+            counter, step = scaled, step * factor
+
+        replaced[id(test)] = []
+        replaced[id(branch)] = [Instr(FOR_RANGE, counter, (start, stop, Const(repr(step))), label=branch.label)]
+        replaced[id(update)] = []
+        replaced[id(copy)] = []
+        converted += 1
+
+    out = []
+    for block in blocks:
+        out.extend(inserted.get(block.index, ()))
+        for instr in block.instrs:
+            out.extend(replaced.get(id(instr), (instr,)))
+    return out, converted, reduced
@@ -1,64 +1,245 @@
+import argparse
+import glob
+import os
 import sys
-from lexer import Lexer
-from parser import Parser
-from semantic_analyzer import SemanticAnalyzer
-from optimizer import Optimizer
-from code_generator import CodeGenerator
-from sast_analyzer import SASTAnalyzer
-from ir_generator import IRGenerator # Import IRGenerator
-
-def compile_charmeleon(source_code: str):
-    # 1. Análise Léxica
-    lexer = Lexer(source_code)
-    tokens = lexer.tokenize()
+from compile_cache import DEFAULT_CACHE_DIR, CompileCache
+from compile_client import CompileClient
+from opt_levels import DEFAULT_OPT_LEVEL, OPT_LEVELS
+
+def compile_charmeleon(source_code, fused=True, opt_level=DEFAULT_OPT_LEVEL):
+    sast_output, python_code, _ = _compile(source_code, fused, opt_level)
+    return sast_output, python_code
+
+def compile_code(source_code, filename="<charmeleon>", fused=True, opt_level=DEFAULT_OPT_LEVEL):
+    # Compila direto para um objeto de código Python, montando a árvore do
+    # módulo ast sem passar pelo texto. Retorna (relatório SAST, código).
+    from ast_code_generator import ASTCodeGenerator
+    sast_output, optimized_ir_code = _analyze_and_optimize(source_code, fused, opt_level)
+    return sast_output, ASTCodeGenerator(optimized_ir_code, filename).compile()
+
+def _compile(source_code, fused=True, opt_level=DEFAULT_OPT_LEVEL):
+    from code_generator import CodeGenerator
+    sast_output, optimized_ir_code = _analyze_and_optimize(source_code, fused, opt_level)
+
+    # 7. Geração de Código Alvo (Python)
+    code_generator = CodeGenerator(optimized_ir_code)
+    python_code = code_generator.gen()
+
+    return sast_output, python_code, optimized_ir_code
+
+def _analyze_and_optimize(source_code, fused=True, opt_level=DEFAULT_OPT_LEVEL):
+    # O restante do compilador só é importado na primeira compilação: o modo
+    # cliente (--connect) não precisa carregá-lo.
+    from lexer import Lexer, StreamingLexer
+    from parser import Parser
+    from semantic_analyzer import SemanticAnalyzer
+    from optimizer import Optimizer
+    from sast_analyzer import SASTAnalyzer
+    from ir_generator import IRGenerator
+    from front_end import FusedFrontEnd
+    from diagnostics import Diagnostics, source_location
+
+    # Os erros de todas as fases são coletados e, se houver algum, levantados
+    # juntos (CompileError) ao fim da análise semântica.
+    diagnostics = Diagnostics()
+
+    # 1. Análise Léxica (arquivos/iteradores de blocos são lidos em modo streaming)
+    if isinstance(source_code, str):
+        diagnostics.locate = lambda offset: source_location(source_code, offset)
+        tokens = Lexer(source_code).tokenize_stream(diagnostics)
+    else:
+        tokens = StreamingLexer(source_code, diagnostics=diagnostics)
+        diagnostics.locate = tokens.location
 
     # 2. Análise Sintática e AST
-    parser = Parser(tokens)
+    parser = Parser(tokens, diagnostics)
     ast = parser.parse()
 
-    # 3. Análise Semântica
-    analyzer = SemanticAnalyzer()
-    analyzer.analyze(ast)
+    if fused:
+        # 3-5. Análise semântica, SAST e geração de IR em um único percurso da AST
+        vulnerabilities, ir_code = FusedFrontEnd(diagnostics).run(ast)
+    else:
+        # 3. Análise Semântica
+        analyzer = SemanticAnalyzer(diagnostics)
+        analyzer.analyze(ast)
+        diagnostics.check()
+
+        # 4. Análise de Segurança Estática (SAST)
+        sast_analyzer = SASTAnalyzer()
+        vulnerabilities = sast_analyzer.analyze(ast)
+
+        # 5. Geração de Código Intermediário (IR)
+        ir_generator = IRGenerator()
+        ir_code = ir_generator.generate(ast)
+
+    sast_output = sast_report(vulnerabilities)
+
+    # 6. Otimização de Código (DCE; no nível 2, também propagação de constantes)
+    optimizer = Optimizer(ir_code)
+    optimized_ir_code = optimizer.optimize(opt_level)
 
-    # 4. Análise de Segurança Estática (SAST)
-    sast_analyzer = SASTAnalyzer()
-    vulnerabilities = sast_analyzer.analyze(ast)
+    return sast_output, optimized_ir_code
 
+def sast_report(vulnerabilities):
     sast_output = "Resultados da Análise SAST:\n"
     if vulnerabilities:
         for vul in vulnerabilities:
             sast_output += f"- Tipo: {vul['type']}\n  Mensagem: {vul['message']}\n  Nó AST: {str(vul['node'])}\n"
     else:
         sast_output += "Nenhuma vulnerabilidade encontrada.\n"
+    return sast_output
 
-    # 5. Geração de Código Intermediário (IR)
-    ir_generator = IRGenerator()
-    ir_code = ir_generator.generate(ast)
+def output_path(input_file):
+    output_file = input_file.replace(".charmeleon", ".py")
+    if not output_file.endswith(".py"):
+        output_file += ".py"
+    return output_file
 
-    # 6. Otimização de Código (DCE)
-    optimizer = Optimizer(ir_code)
-    optimized_ir_code = optimizer.eliminate_dead_code()
+def compile_cached(source_code, cache, fused=True, keep_ir=False, opt_level=DEFAULT_OPT_LEVEL):
+    # Como compile_charmeleon, mas reaproveita resultados do cache em disco.
+    # Retorna (relatório SAST, código Python, IR otimizado em texto ou None).
+    key = cache.key(source_code, {"fused": fused, "opt_level": opt_level})
+    entry = cache.get(key)
+    if entry is not None and (not keep_ir or entry.get("ir") is not None):
+        return entry["sast"], entry["python"], entry.get("ir")
+    from ir import format_ir
+    sast_output, python_code, ir_code = _compile(source_code, fused, opt_level)
+    ir_lines = format_ir(ir_code) if keep_ir else None
+    cache.put(key, {"sast": sast_output, "python": python_code, "ir": ir_lines})
+    return sast_output, python_code, ir_lines
 
-    # 7. Geração de Código Alvo (Python)
-    code_generator = CodeGenerator(optimized_ir_code)
-    python_code = code_generator.gen()
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="main.py", description="Compilador Charmeleon")
+    arg_parser.add_argument("inputs", nargs="*", metavar="input_file",
+                            help="arquivo .charmeleon, ou - para ler de stdin; vários arquivos, diretórios ou globs compilam em lote")
+    arg_parser.add_argument("--no-cache", action="store_true", help="recompila sem consultar nem atualizar o cache")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"diretório do cache (padrão: {DEFAULT_CACHE_DIR})")
+    arg_parser.add_argument("--emit-ir", action="store_true", help="salva também o IR otimizado em <arquivo>.ir")
+    arg_parser.add_argument("--emit-pyc", action="store_true",
+                            help="salva também o bytecode do .py gerado em __pycache__, marcado com o hash do .py")
+    arg_parser.add_argument("--workers", type=int, default=None, help="processos no modo em lote (padrão: número de CPUs)")
+    arg_parser.add_argument("--chunksize", type=int, default=None, help="arquivos por tarefa enviada a cada processo no modo em lote")
+    arg_parser.add_argument("-O", dest="opt_level", type=int, choices=OPT_LEVELS, default=DEFAULT_OPT_LEVEL,
+                            help="nível de otimização: 0 nenhuma, 1 eliminação de código morto (padrão), "
+                                 "2 também propagação de constantes e poda de desvios")
+    arg_parser.add_argument("--run", action="store_true",
+                            help="compila direto para bytecode e executa o programa (chama main(), se existir)")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="recompila o arquivo a cada alteração, refazendo só as funções afetadas")
+    arg_parser.add_argument("--serve", metavar="SOCKET", help="inicia o servidor de compilação no socket Unix indicado")
+    arg_parser.add_argument("--connect", metavar="SOCKET", help="compila através de um servidor iniciado com --serve")
+    args = arg_parser.parse_args()
+    from diagnostics import CompileError
 
-    return sast_output, python_code
+    if args.serve:
+        from compile_server import CompileServer
+        try:
+            server = CompileServer(args.serve, workers=args.workers, cache_dir=None if args.no_cache else args.cache_dir)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print(f"Servidor de compilação ouvindo em {args.serve}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        sys.exit(0)
+    if not args.inputs:
+        arg_parser.error("informe ao menos um arquivo de entrada")
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python3.11 main.py <caminho_do_arquivo_charmeleon>", file=sys.stderr)
-        sys.exit(1)
+    input_file = args.inputs[0]
+    if args.watch:
+        from incremental import watch
+        print(f"Observando {input_file} (Ctrl+C para sair)", file=sys.stderr)
+        try:
+            watch(input_file, opt_level=args.opt_level)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    if args.run:
+        if input_file == "-":
+            charmeleon_code, filename = sys.stdin.read(), "<stdin>"
+        else:
+            try:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    charmeleon_code = f.read()
+            except FileNotFoundError:
+                print(f"Erro: Arquivo \'{input_file}\' não encontrado.", file=sys.stderr)
+                sys.exit(1)
+            filename = output_path(input_file)
+        try:
+            sast_report, code = compile_code(charmeleon_code, filename, opt_level=args.opt_level)
+        except CompileError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print("\n" + "="*30 + "\nResultados da Análise SAST\n" + "="*30, file=sys.stderr)
+        print("\n" + sast_report, file=sys.stderr)
+        namespace = {"__name__": "__charmeleon__"}
+        exec(code, namespace)
+        if callable(namespace.get("main")):
+            namespace["main"]()
+        sys.exit(0)
+    if len(args.inputs) > 1 or os.path.isdir(input_file) or glob.has_magic(input_file):
+        if args.connect:
+            arg_parser.error("--connect compila um arquivo por vez")
+        from batch import run_batch
+        failures = run_batch(args.inputs, args.workers, args.chunksize, None if args.no_cache else args.cache_dir,
+                             opt_level=args.opt_level, emit_pyc=args.emit_pyc, emit_ir=args.emit_ir)
+        sys.exit(1 if failures else 0)
 
-    input_file = sys.argv[1]
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            charmeleon_code = f.read()
-    except FileNotFoundError:
-        print(f"Erro: Arquivo \'{input_file}\' não encontrado.", file=sys.stderr)
-        sys.exit(1)
+    ir_lines = None
+    if args.connect:
+        if input_file == "-":
+            charmeleon_code = sys.stdin.read()
+        else:
+            try:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    charmeleon_code = f.read()
+            except FileNotFoundError:
+                print(f"Erro: Arquivo \'{input_file}\' não encontrado.", file=sys.stderr)
+                sys.exit(1)
+        try:
+            with CompileClient(args.connect) as client:
+                sast_report, generated_python_code, ir_lines = client.compile(charmeleon_code, emit_ir=args.emit_ir, opt_level=args.opt_level)
+        except OSError as e:
+            print(f"Erro: não foi possível conectar ao servidor de compilação em \'{args.connect}\': {e}", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+    elif input_file == "-":
+        # Lê o código-fonte de stdin sem carregá-lo inteiro na memória
+        try:
+            sast_report, generated_python_code, ir_code = _compile(sys.stdin, opt_level=args.opt_level)
+        except CompileError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        if args.emit_ir:
+            from ir import format_ir
+            ir_lines = format_ir(ir_code)
+    else:
+        try:
+            with open(input_file, "r", encoding="utf-8") as f:
+                charmeleon_code = f.read()
+        except FileNotFoundError:
+            print(f"Erro: Arquivo \'{input_file}\' não encontrado.", file=sys.stderr)
+            sys.exit(1)
 
-    sast_report, generated_python_code = compile_charmeleon(charmeleon_code)
+        try:
+            if args.no_cache:
+                sast_report, generated_python_code, ir_code = _compile(charmeleon_code, opt_level=args.opt_level)
+                if args.emit_ir:
+                    from ir import format_ir
+                    ir_lines = format_ir(ir_code)
+            else:
+                sast_report, generated_python_code, ir_lines = compile_cached(
+                    charmeleon_code, CompileCache(args.cache_dir), keep_ir=args.emit_ir, opt_level=args.opt_level)
+        except CompileError as e:
+            # Todos os erros encontrados, um por linha
+            print(e, file=sys.stderr)
+            sys.exit(1)
 
     # Print SAST report to stderr
     print("\n" + "="*30 + "\nResultados da Análise SAST\n" + "="*30, file=sys.stderr)
@@ -67,12 +248,22 @@ if __name__ == "__main__":
     # Print generated Python code to stdout
     print(generated_python_code)
 
+    if input_file == "-":
+        if ir_lines is not None:
+            print("\n".join(ir_lines), file=sys.stderr)
+        sys.exit(0)
+
     # Opcional: Salvar o código Python gerado em um arquivo
-    output_file = input_file.replace(".charmeleon", ".py")
-    if not output_file.endswith(".py"):
-        output_file += ".py"
+    output_file = output_path(input_file)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(generated_python_code)
     print(f"\nCódigo Python salvo em: {output_file}", file=sys.stderr)
-
-
+    if args.emit_pyc:
+        from bytecode import write_pyc
+        pyc_file = write_pyc(output_file, generated_python_code)
+        print(f"Bytecode salvo em: {pyc_file}", file=sys.stderr)
+    if ir_lines is not None:
+        ir_file = output_file[:-3] + ".ir"
+        with open(ir_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(ir_lines) + "\n")
+        print(f"IR otimizado salvo em: {ir_file}", file=sys.stderr)
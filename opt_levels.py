@@ -0,0 +1,8 @@
+# Optimization levels: 0 turns everything off, 1 (default) is DCE only and 2
+# also propagates constants, prunes branches, removes redundant computations
+# and copies, hoists loop invariants, turns counted loops into range loops and
+# removes dead cycles in SSA form before it. Kept apart from optimizer.py (which
+# re-exports them) so the command line and the compile client can read them
+# without importing the optimizer.
+OPT_LEVELS = (0, 1, 2)
+DEFAULT_OPT_LEVEL = 1
@@ -1,79 +1,251 @@
-import re
+from itertools import count
+
+from cfg import Liveness, build_cfg
+from constant_propagation import ConstantPropagation
+from copy_propagation import propagate_copies
+from ir import ASSIGN, BIN_OP, Const, END_FUNC, FUNC, LABEL, Temp
+from loops import hoist_invariants, optimize_induction_variables
+from opt_levels import DEFAULT_OPT_LEVEL, OPT_LEVELS
+from ssa import construct_ssa, destruct_ssa, eliminate_dead_ssa
+from value_numbering import number_values
+
+
 class Optimizer:
     def __init__(self, ir_code):
         self.ir_code = ir_code
-    def _parse(self, instr):
-        # Returns (def_var, use_vars, kind)
-        instr = instr.strip()
-        if not instr:
-            return (None, [], "empty")
-        if re.match(r"^[A-Za-z_][A-Za-z0-9_]*:\s*$", instr):
-            return (None, [], "label")
-        m = re.match(r"^FUNC\s+([^:]+):$", instr)
-        if m:
-            return (None, [], "func")
-        m = re.match(r"^END_FUNC\s+(.+)$", instr)
-        if m:
-            return (None, [], "end")
-        m = re.match(r"^IF_FALSE\s+([^\s]+)\s+GOTO\s+(.+)$", instr)
-        if m:
-            cond = m.group(1)
-            return (None, [cond], "if")
-        m = re.match(r"^GOTO\s+(.+)$", instr)
-        if m:
-            return (None, [], "goto")
-        m = re.match(r"^PRINT\s+(.+)$", instr)
-        if m:
-            return (None, [m.group(1)], "print")
-        m = re.match(r"^RETURN\s+(.+)$", instr)
-        if m:
-            return (None, [m.group(1)], "return")
-        m = re.match(r"^ASSIGN\s+([^,]+),\s+(.+)$", instr)
-        if m:
-            target = m.group(1).strip()
-            value = m.group(2).strip()
-            uses = []
-            # consider temps and identifiers as uses (simple heuristic)
-            tokens = re.findall(r"[A-Za-z_][A-Za-z0-9_]*|t\d+", value)
-            for tok in tokens:
-                if re.match(r"^t\d+$", tok) or re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", tok):
-                    uses.append(tok)
-            return (target, uses, "assign")
-        m = re.match(r"^BIN_OP\s+([^,]+),\s+([^,]+),\s+([^,]+),\s+(.+)$", instr)
-        if m:
-            target = m.group(1).strip()
-            left = m.group(2).strip()
-            op = m.group(3).strip()
-            right = m.group(4).strip()
-            uses = [left, right]
-            return (target, uses, "binop")
-        return (None, [], "other")
+        self.removed = 0
+        self.folded = 0
+        self.pruned = 0
+        self.numbered = 0
+        self.copies_removed = 0
+        self.hoisted = 0
+        self.counted_loops = 0
+        self.reduced = 0
+        self.ssa_removed = 0
+
+    def optimize(self, level=DEFAULT_OPT_LEVEL):
+        if level not in OPT_LEVELS:
+            raise Exception(f"Erro: nível de otimização inválido: {level}")
+        if level >= 2:
+            self.ir_code = self.propagate_constants()
+            self.ir_code = self.eliminate_redundancy()
+            self.ir_code = self.hoist_loop_invariants()
+            self.ir_code = self.optimize_induction_variables()
+            # The range loops leave copies of their counter behind.
+            numbered, copies_removed = self.numbered, self.copies_removed
+            self.ir_code = self.eliminate_redundancy()
+            self.numbered += numbered
+            self.copies_removed += copies_removed
+            self.ir_code = self.eliminate_dead_ssa()
+        if level >= 1:
+            return self.eliminate_dead_code()
+        return list(self.ir_code)
+
+    def _functions(self):
+        # Yields (FUNC, body, END_FUNC) per function; instructions outside a
+        # function come through as (None, [instr], None).
+        body = None
+        for instr in self.ir_code:
+            if instr.op == FUNC:
+                header, body = instr, []
+            elif instr.op == END_FUNC and body is not None:
+                yield header, body, instr
+                body = None
+            elif body is not None:
+                body.append(instr)
+            else:
+                yield None, [instr], None
+        if body is not None:
+            yield header, body, None
+
     def eliminate_dead_code(self):
-        used = set()
+        self.removed = 0
         out = []
-        for instr in reversed(self.ir_code):
-            d, uses, kind = self._parse(instr)
-            keep = False
-            if kind in {"label", "func", "end", "if", "goto", "print", "return", "other"}:
-                # keep labels, control flow, side-effects and unknowns
-                keep = True
-            else:
-                # assign or binop
-                # be conservative: keep if defines a non-temp (program variable)
-                if d is not None and not re.match(r"^t\d+$", d):
-                    keep = True
-                # keep if its result is used later
-                elif d is not None and d in used:
-                    keep = True
-            if keep:
-                # update liveness
-                if d in used:
-                    used.remove(d)
-                for u in uses:
-                    # consider only names that look like temps or identifiers
-                    if re.match(r"^t\d+$", u) or re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", u):
-                        used.add(u)
-                out.insert(0, instr)
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                dead = self._dead_definitions(cfg, Liveness(cfg))
+                if dead:
+                    self.removed += len(dead)
+                    body = [instr for index, instr in enumerate(cfg.instructions()) if index not in dead]
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
+        return out
+
+    def propagate_constants(self):
+        # Folds constant BIN_OPs, substitutes known constants into operands and
+        # prunes IF_FALSEs with a known condition (with the blocks they made
+        # unreachable). Leaves the dead assignments behind for the DCE.
+        self.folded = self.pruned = 0
+        out = []
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                liveness = Liveness(cfg)
+                entry = liveness.live_names(liveness.live_in[0]) if cfg.blocks else ()
+                propagation = ConstantPropagation(cfg, entry)
+                propagation.analyze()
+                body = propagation.rewrite()
+                self.folded += propagation.folded
+                self.pruned += propagation.pruned
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
+        return out
+
+    def eliminate_redundancy(self):
+        # Local value numbering turns recomputed BIN_OPs into copies, then
+        # global copy propagation reads through copies and drops the unused
+        # ones. `numbered` counts the BIN_OPs removed, `copies_removed` the
+        # copies.
+        self.numbered = self.copies_removed = 0
+        out = []
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                for block in cfg.blocks:
+                    self.numbered += number_values(block)
+                _, removed = propagate_copies(cfg)
+                self.copies_removed += removed
+                body = cfg.instructions()
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
+        return out
+
+    def hoist_loop_invariants(self):
+        # Moves loop-invariant BIN_OPs in front of their loop's header label,
+        # where the code generator still finds the loop intact.
+        self.hoisted = 0
+        out = []
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                body, hoisted = hoist_invariants(cfg, Liveness(cfg))
+                self.hoisted += hoisted
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
+        return out
+
+    def optimize_induction_variables(self):
+        # Counted loops become FOR_RANGE loops (`for i in range(...)` in the
+        # generated Python); products of the counter by a literal are folded
+        # into the range step. `counted_loops` and `reduced` count both.
+        self.counted_loops = self.reduced = 0
+        last = max((arg.index for instr in self.ir_code for arg in (instr.dest, *instr.args)
+                    if arg.__class__ is Temp), default=0)
+        temps = count(last + 1)
+        new_temp = lambda: Temp(next(temps))
+        out = []
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                body, converted, reduced = optimize_induction_variables(cfg, Liveness(cfg), new_temp)
+                self.counted_loops += converted
+                self.reduced += reduced
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
         return out
 
+    def eliminate_dead_ssa(self):
+        # Round trip through SSA form: mark-and-sweep there also removes
+        # cycles of writes nothing else reads (a loop counter whose loop became
+        # a range loop), then the versions are coalesced back into variables.
+        self.ssa_removed = 0
+        labels = {instr.label for instr in self.ir_code if instr.op == LABEL}
+        numbers = count(len(labels) + 1)
+
+        def new_label():
+            label = f"L{next(numbers)}"
+            while label in labels:
+                label = f"L{next(numbers)}"
+            labels.add(label)
+            return label
+
+        out = []
+        for header, body, footer in self._functions():
+            if header is not None:
+                out.append(header)
+                cfg = build_cfg(body)
+                origins = construct_ssa(cfg)
+                self.ssa_removed += eliminate_dead_ssa(cfg)
+                body = destruct_ssa(cfg, origins, new_label)
+            out.extend(body)
+            if footer is not None:
+                out.append(footer)
+        return out
 
+    def _dead_definitions(self, cfg, liveness):
+        # Indices (into cfg.instructions()) of the ASSIGN/BIN_OPs whose value is
+        # never used, also once the other dead ones are gone. Def-use chains
+        # come from the one liveness solve: a use sees the last definition
+        # before it in its block, or else the definitions left at the end of
+        # the blocks it is reachable from with its name live at every block
+        # entry along the way. Removing a definition then releases the uses of
+        # its operands (a worklist over use counts) instead of recomputing
+        # liveness.
+        bits = liveness.bits
+        live_in = liveness.live_in
+        blocks = cfg.blocks
+        instrs = cfg.instructions()
+        reaching = [None] * len(instrs)   # definitions each instruction reads
+        uses = [0] * len(instrs)          # uses of each definition not yet removed
+        entry_uses = []
+        defined = []
+        index = 0
+        for block in blocks:
+            last = {}
+            entry = {}
+            for instr in block.instrs:
+                sources = []
+                for arg in instr.args:
+                    if arg.__class__ is not Const:
+                        definition = last.get(arg)
+                        if definition is None:
+                            entry.setdefault(arg, []).append(sources)
+                        else:
+                            sources.append(definition)
+                            uses[definition] += 1
+                reaching[index] = sources
+                if instr.dest is not None:
+                    last[instr.dest] = index
+                index += 1
+            entry_uses.append(entry)
+            defined.append(last)
+        for block in blocks:
+            for name, definition in defined[block.index].items():
+                bit = bits.get(name)
+                if bit is None or not liveness.live_out[block.index] >> bit & 1:
+                    continue
+                bit = 1 << bit
+                seen = set()
+                stack = [succ for succ in block.succs if live_in[succ.index] & bit]
+                while stack:
+                    succ = stack.pop()
+                    if succ.index in seen:
+                        continue
+                    seen.add(succ.index)
+                    for sources in entry_uses[succ.index].get(name, ()):
+                        sources.append(definition)
+                        uses[definition] += 1
+                    if name not in defined[succ.index]:
+                        stack.extend(next_block for next_block in succ.succs if live_in[next_block.index] & bit)
+        worklist = [index for index, instr in enumerate(instrs)
+                    if not uses[index] and (instr.op == ASSIGN or instr.op == BIN_OP)]
+        dead = set(worklist)
+        while worklist:
+            for definition in reaching[worklist.pop()]:
+                uses[definition] -= 1
+                if not uses[definition] and definition not in dead and \
+                        (instrs[definition].op == ASSIGN or instrs[definition].op == BIN_OP):
+                    dead.add(definition)
+                    worklist.append(definition)
+        return dead
@@ -1,249 +1,457 @@
+from collections import deque
+from sys import intern
+
+from ast_nodes import (NODE_KINDS, UNKNOWN_KIND, Program, FunctionDeclaration, ParameterList, Parameter,
+                       Block, VariableDeclaration, AssignmentStatement, IfStatement, ForStatement,
+                       WhileStatement, ReturnStatement, PrintStatement, BinaryExpression,
+                       NumberLiteral, StringLiteral, Identifier)
+from lexer import (TokenStream, TOKEN_KINDS, TOKEN_TYPES, TK_EOF, TK_KEYWORD, TK_IDENTIFIER,
+                   TK_NUMBER, TK_STRING, TK_ASSIGN, TK_OPERATOR, TK_DELIMITER)
+
+_EOF_TOKEN = (TK_EOF, None)
+_OPEN_PAREN = (0, "(")
+
+# Binding strength of each binary operator; higher binds tighter.
+BINARY_PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "==": 3, "!=": 3, "<=": 3, ">=": 3, "<": 3, ">": 3,
+    "+": 4, "-": 4,
+    "*": 5, "/": 5, "%": 5,
+}
+
+
 class ASTNode:
+    # Generic untyped node, kept for callers that build trees by hand. The parser
+    # produces the typed __slots__ classes from ast_nodes instead.
     def __init__(self, type, value=None, children=None, metadata=None):
         self.type = type
         self.value = value
         self.children = children if children is not None else []
         self.metadata = metadata if metadata is not None else {}
 
+    @property
+    def kind(self):
+        return NODE_KINDS.get(self.type, UNKNOWN_KIND)
+
     def __repr__(self):
         return f"ASTNode(type=\\\\\\\\\'{self.type}\\\\\\, value={self.value!r}, children={self.children}, metadata={self.metadata})"
 
+class _Panic(Exception):
+    # Unwinds a recovering parser to the nearest statement or function
+    # boundary; the syntax error has already been recorded.
+    pass
+
+
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.current_token_index = 0
-        self.current_token = self.tokens[self.current_token_index] if self.tokens else None
+    LOOKAHEAD = 4
+
+    def __init__(self, tokens, diagnostics=None):
+        # Parses a TokenStream natively; lists of {"type", "value"} dicts are still
+        # accepted, and any other iterable of (kind, value) pairs (e.g. a
+        # StreamingLexer) is pulled lazily through a bounded lookahead buffer.
+        # Without a Diagnostics collector the first syntax error is raised;
+        # with one, errors are recorded and parsing resumes at the next
+        # statement (panic mode), so one pass reports them all.
+        self.current_token_index = -1
+        self.diagnostics = diagnostics
+        self._error_index = -1
+        if isinstance(tokens, (list, tuple)):
+            tokens = TokenStream.from_dicts(tokens)
+        if isinstance(tokens, TokenStream):
+            self.tokens = tokens
+            self.source = tokens.source
+            self.kinds = tokens.kinds
+            self.starts = tokens.starts
+            self.ends = tokens.ends
+            self.length = len(tokens)
+        else:
+            self.tokens = None
+            self._token_source = tokens
+            self._token_iter = iter(tokens)
+            self._lookahead = deque()
+            self._start = None
+            self.advance = self._advance_buffered
+            self.peek = self._peek_buffered
+        self.advance()
+
+    @property
+    def current_token(self):
+        if self.kind == TK_EOF:
+            return None
+        return {"type": TOKEN_TYPES[self.kind], "value": self.value}
 
     def advance(self):
         self.current_token_index += 1
-        self.current_token = self.tokens[self.current_token_index] if self.current_token_index < len(self.tokens) else None
+        index = self.current_token_index
+        if index < self.length:
+            kind = self.kind = self.kinds[index]
+            value = self.source[self.starts[index]:self.ends[index]]
+            # Identifiers are interned, so the analyzer's symbol table and the
+            # IR operands share one string per name.
+            self.value = intern(value) if kind == TK_IDENTIFIER else value
+        else:
+            self.kind = TK_EOF
+            self.value = None
+
+    def peek(self, offset=1):
+        index = self.current_token_index + offset
+        if index < self.length:
+            return self.kinds[index], self.source[self.starts[index]:self.ends[index]]
+        return _EOF_TOKEN
+
+    def _advance_buffered(self):
+        self.current_token_index += 1
+        if self._lookahead:
+            self.kind, self.value, self._start = self._lookahead.popleft()
+        else:
+            self.kind, self.value = next(self._token_iter, _EOF_TOKEN)
+            self._start = self._source_offset(self.kind)
+
+    def _peek_buffered(self, offset=1):
+        if offset > self.LOOKAHEAD:
+            raise Exception(f"Lookahead de {offset} tokens excede o limite de {self.LOOKAHEAD}")
+        lookahead = self._lookahead
+        while len(lookahead) < offset:
+            kind, value = next(self._token_iter, _EOF_TOKEN)
+            lookahead.append((kind, value, self._source_offset(kind)))
+        return lookahead[offset - 1][:2]
+
+    def _source_offset(self, kind):
+        # Offset a StreamingLexer gives for the token it just yielded (its end
+        # of input, for EOF); other iterables of pairs give none.
+        return getattr(self._token_source, "start" if kind != TK_EOF else "position", None)
+
+    def offset(self):
+        # Source offset of the current token, or None if unknown.
+        if self.tokens is None:
+            return self._start
+        index = self.current_token_index
+        return self.starts[index] if index < self.length else len(self.source)
+
+    def error(self, message):
+        # Raises a syntax error. A recovering parser records it instead (once
+        # per token: the errors of enclosing constructs at the same spot are
+        # only cascades) and unwinds to the nearest statement boundary.
+        if self.diagnostics is None:
+            raise Exception(message)
+        if self.current_token_index != self._error_index:
+            self._error_index = self.current_token_index
+            self.diagnostics.error(message, self.offset())
+        raise _Panic(message)
+
+    def synchronize(self):
+        # Panic mode: skips what is left of a failed statement. Stops after a
+        # ";" or a braced block (and the `else` parts after it) at the
+        # statement's level, or before a statement keyword there, the "}" of
+        # the enclosing block, `func` or the end of the input.
+        depth = 0
+        while self.kind != TK_EOF:
+            if self.kind == TK_KEYWORD:
+                if self.value == "func" or (depth == 0 and self.value in self._statement_handlers):
+                    return
+            elif self.kind == TK_DELIMITER:
+                if self.value == "{":
+                    depth += 1
+                elif self.value == "}":
+                    if depth == 0:
+                        return
+                    depth -= 1
+                    if depth == 0:
+                        self.advance()
+                        if not self.check(TK_KEYWORD, "else"):
+                            return
+                        continue
+                elif self.value == ";" and depth == 0:
+                    self.advance()
+                    return
+            self.advance()
+
+    def close_block(self):
+        # The "}" after a block. A recovering parser only ends a block early at
+        # `func` or at the end of the input: the brace is reported missing
+        # there and the block closed anyway.
+        if self.diagnostics is not None and not self.check(TK_DELIMITER, "}"):
+            try:
+                self.eat(TK_DELIMITER, "}")
+            except _Panic:
+                pass
+        else:
+            self.eat(TK_DELIMITER, "}")
+
+    def check(self, kind, value=None):
+        return self.kind == kind and (value is None or self.value == value)
 
     def eat(self, token_type, token_value=None):
-        if self.current_token and self.current_token["type"] == token_type and \
-           (token_value is None or self.current_token["value"] == token_value):
+        if self.kind == token_type and (token_value is None or self.value == token_value):
             self.advance()
+        elif token_type.__class__ is str:
+            self.eat(TOKEN_KINDS[token_type], token_value)
         else:
-            raise Exception(f"Erro de sintaxe: Esperado {token_type} (valor: {token_value}), mas encontrou {self.current_token}")
+            self.error(f"Erro de sintaxe: Esperado {TOKEN_TYPES[token_type]} (valor: {token_value}), mas encontrou {self.current_token}")
 
     def parse(self):
         return self.program()
 
     def program(self):
         nodes = []
-        while self.current_token:
-            if self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "func":
-                nodes.append(self.function_declaration())
-            else:
-                raise Exception(f"Declaração inesperada: {self.current_token}")
-        return ASTNode("Program", children=nodes)
+        while self.kind != TK_EOF:
+            try:
+                if self.check(TK_KEYWORD, "func"):
+                    nodes.append(self.function_declaration())
+                else:
+                    self.error(f"Declaração inesperada: {self.current_token}")
+            except _Panic:
+                # A broken header: resume at the next function.
+                while self.kind != TK_EOF and not self.check(TK_KEYWORD, "func"):
+                    self.advance()
+        return Program(nodes, 0)
 
     def function_declaration(self):
-        self.eat("KEYWORD", "func")
-        name = self.current_token["value"]
-        self.eat("IDENTIFIER")
-        self.eat("DELIMITER", "(")
+        errors = len(self.diagnostics) if self.diagnostics is not None else 0
+        position = self.offset()
+        self.eat(TK_KEYWORD, "func")
+        name = self.value
+        self.eat(TK_IDENTIFIER)
+        self.eat(TK_DELIMITER, "(")
         params = self.parameter_list()
-        self.eat("DELIMITER", ")")
+        self.eat(TK_DELIMITER, ")")
         return_type = None
-        if self.current_token and self.current_token["value"] == "->":
-            self.eat("OPERATOR", "->")
-            return_type = self.current_token["value"]
-            self.eat("KEYWORD") # int, float, bool, string
-        self.eat("DELIMITER", "{")
+        if self.value == "->":
+            self.eat(TK_OPERATOR, "->")
+            return_type = self.value
+            self.eat(TK_KEYWORD) # int, float, bool, string
+        self.eat(TK_DELIMITER, "{")
         body = self.block()
-        self.eat("DELIMITER", "}")
-        return ASTNode("FunctionDeclaration", value=name, children=[params, body], metadata={"return_type": return_type})
+        self.close_block()
+        if errors != (len(self.diagnostics) if self.diagnostics is not None else 0):
+            # Only the signature of a function with syntax errors is kept, so
+            # the semantic passes do not report on what was skipped.
+            body = Block([], body.position)
+        return FunctionDeclaration(name, params, body, return_type, position)
 
     def parameter_list(self):
         params = []
-        while self.current_token and self.current_token["type"] != "DELIMITER" and self.current_token["value"] != ")":
-            name = self.current_token["value"]
-            self.eat("IDENTIFIER")
-            self.eat("DELIMITER", ":")
-            param_type = self.current_token["value"]
-            self.eat("KEYWORD") # int, float, bool, string
-            params.append(ASTNode("Parameter", value=name, metadata={"type": param_type}))
-            if self.current_token and self.current_token["value"] == ",":
-                self.eat("DELIMITER", ",")
-        return ASTNode("ParameterList", children=params)
+        position = self.offset()
+        while self.kind != TK_EOF and self.kind != TK_DELIMITER and self.value != ")":
+            name = self.value
+            param_position = self.offset()
+            self.eat(TK_IDENTIFIER)
+            self.eat(TK_DELIMITER, ":")
+            param_type = self.value
+            self.eat(TK_KEYWORD) # int, float, bool, string
+            params.append(Parameter(name, param_type, param_position))
+            if self.value == ",":
+                self.eat(TK_DELIMITER, ",")
+        return ParameterList(params, position)
 
     def block(self):
         statements = []
-        while self.current_token and not (self.current_token["type"] == "DELIMITER" and self.current_token["value"] == "}"):
-            statements.append(self.statement())
-        return ASTNode("Block", children=statements)
+        position = self.offset()
+        recovering = self.diagnostics is not None
+        while self.kind != TK_EOF and not self.check(TK_DELIMITER, "}"):
+            if not recovering:
+                statements.append(self.statement())
+            elif self.check(TK_KEYWORD, "func"):
+                break # A "}" is missing: see close_block
+            else:
+                try:
+                    statements.append(self.statement())
+                except _Panic:
+                    self.synchronize()
+        return Block(statements, position)
 
     def statement(self):
-        if self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "var":
-            return self.variable_declaration()
-        elif self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "if":
-            return self.if_statement()
-        elif self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "for":
-            return self.for_statement()
-        elif self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "while":
-            return self.while_statement()
-        elif self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "return":
-            return self.return_statement()
-        elif self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "print":
-            return self.print_statement()
-        elif self.current_token["type"] == "IDENTIFIER":
+        if self.kind == TK_KEYWORD:
+            handler = self._statement_handlers.get(self.value)
+            if handler is not None:
+                return handler(self)
+        elif self.kind == TK_IDENTIFIER:
             return self.assignment_statement()
-        else:
-            raise Exception(f"Declaração de instrução inesperada: {self.current_token}")
+        self.error(f"Declaração de instrução inesperada: {self.current_token}")
 
     def variable_declaration(self):
-        self.eat("KEYWORD", "var")
-        name = self.current_token["value"]
-        self.eat("IDENTIFIER")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "var")
+        name = self.value
+        self.eat(TK_IDENTIFIER)
         var_type = None
-        if self.current_token and self.current_token["value"] == ":":
-            self.eat("DELIMITER", ":")
-            var_type = self.current_token["value"]
-            self.eat("KEYWORD") # int, float, bool, string
-        self.eat("ASSIGN", "=")
+        if self.value == ":":
+            self.eat(TK_DELIMITER, ":")
+            var_type = self.value
+            self.eat(TK_KEYWORD) # int, float, bool, string
+        self.eat(TK_ASSIGN, "=")
         expression = self.expression()
-        self.eat("DELIMITER", ";")
-        return ASTNode("VariableDeclaration", value=name, children=[expression], metadata={"type": var_type})
+        self.eat(TK_DELIMITER, ";")
+        return VariableDeclaration(name, expression, var_type, position)
 
     def assignment_statement(self):
-        name = self.current_token["value"]
-        self.eat("IDENTIFIER")
-        self.eat("ASSIGN", "=")
+        position = self.offset()
+        name = self.value
+        self.eat(TK_IDENTIFIER)
+        self.eat(TK_ASSIGN, "=")
         expression = self.expression()
-        self.eat("DELIMITER", ";")
-        return ASTNode("AssignmentStatement", value=name, children=[expression])
+        self.eat(TK_DELIMITER, ";")
+        return AssignmentStatement(name, expression, position)
 
     def if_statement(self):
-        self.eat("KEYWORD", "if")
-        self.eat("DELIMITER", "(")
-        condition = self.expression()
-        self.eat("DELIMITER", ")")
-        self.eat("DELIMITER", "{")
-        true_block = self.block()
-        self.eat("DELIMITER", "}")
+        # An "else if" chain is still represented as nested IfStatements, but
+        # parsed with a loop so long chains do not recurse.
+        branches = []
         false_block = None
-        if self.current_token and self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "else":
-            self.eat("KEYWORD", "else")
-            if self.current_token and self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "if":
-                # Handle else if as a nested if statement
-                false_block = self.if_statement()
-            else:
-                self.eat("DELIMITER", "{")
+        while True:
+            position = self.offset()
+            self.eat(TK_KEYWORD, "if")
+            self.eat(TK_DELIMITER, "(")
+            condition = self.expression()
+            self.eat(TK_DELIMITER, ")")
+            self.eat(TK_DELIMITER, "{")
+            true_block = self.block()
+            self.close_block()
+            branches.append((condition, true_block, position))
+            if not self.check(TK_KEYWORD, "else"):
+                break
+            self.eat(TK_KEYWORD, "else")
+            if not self.check(TK_KEYWORD, "if"):
+                self.eat(TK_DELIMITER, "{")
                 false_block = self.block()
-                self.eat("DELIMITER", "}")
-        return ASTNode("IfStatement", children=[condition, true_block, false_block])
+                self.close_block()
+                break
+        for condition, true_block, position in reversed(branches):
+            false_block = IfStatement(condition, true_block, false_block, position)
+        return false_block
 
     def for_statement(self):
-        self.eat("KEYWORD", "for")
-        self.eat("DELIMITER", "(")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "for")
+        self.eat(TK_DELIMITER, "(")
         init = None
-        if self.current_token and self.current_token["type"] == "KEYWORD" and self.current_token["value"] == "var":
+        if self.check(TK_KEYWORD, "var"):
             init = self._variable_declaration_no_semicolon()
-        elif self.current_token and self.current_token["type"] == "IDENTIFIER":
+        elif self.kind == TK_IDENTIFIER:
             init = self._assignment_statement_no_semicolon()
-        self.eat("DELIMITER", ";")
+        self.eat(TK_DELIMITER, ";")
         condition = self.expression()
-        self.eat("DELIMITER", ";")
+        self.eat(TK_DELIMITER, ";")
         update = None
-        if self.current_token and self.current_token["type"] == "IDENTIFIER":
+        if self.kind == TK_IDENTIFIER:
             update = self._assignment_statement_no_semicolon()
-        self.eat("DELIMITER", ")")
-        self.eat("DELIMITER", "{")
+        self.eat(TK_DELIMITER, ")")
+        self.eat(TK_DELIMITER, "{")
         body = self.block()
-        self.eat("DELIMITER", "}")
-        return ASTNode("ForStatement", children=[init, condition, update, body])
+        self.close_block()
+        return ForStatement(init, condition, update, body, position)
 
     def _variable_declaration_no_semicolon(self):
-        self.eat("KEYWORD", "var")
-        name = self.current_token["value"]
-        self.eat("IDENTIFIER")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "var")
+        name = self.value
+        self.eat(TK_IDENTIFIER)
         var_type = None
-        if self.current_token and self.current_token["value"] == ":":
-            self.eat("DELIMITER", ":")
-            var_type = self.current_token["value"]
-            self.eat("KEYWORD")
-        self.eat("ASSIGN", "=")
+        if self.value == ":":
+            self.eat(TK_DELIMITER, ":")
+            var_type = self.value
+            self.eat(TK_KEYWORD)
+        self.eat(TK_ASSIGN, "=")
         expression = self.expression()
-        return ASTNode("VariableDeclaration", value=name, children=[expression], metadata={"type": var_type})
+        return VariableDeclaration(name, expression, var_type, position)
 
     def _assignment_statement_no_semicolon(self):
-        name = self.current_token["value"]
-        self.eat("IDENTIFIER")
-        self.eat("ASSIGN", "=")
+        position = self.offset()
+        name = self.value
+        self.eat(TK_IDENTIFIER)
+        self.eat(TK_ASSIGN, "=")
         expression = self.expression()
-        return ASTNode("AssignmentStatement", value=name, children=[expression])
+        return AssignmentStatement(name, expression, position)
 
     def while_statement(self):
-        self.eat("KEYWORD", "while")
-        self.eat("DELIMITER", "(")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "while")
+        self.eat(TK_DELIMITER, "(")
         condition = self.expression()
-        self.eat("DELIMITER", ")")
-        self.eat("DELIMITER", "{")
+        self.eat(TK_DELIMITER, ")")
+        self.eat(TK_DELIMITER, "{")
         body = self.block()
-        self.eat("DELIMITER", "}")
-        return ASTNode("WhileStatement", children=[condition, body])
+        self.close_block()
+        return WhileStatement(condition, body, position)
 
     def return_statement(self):
-        self.eat("KEYWORD", "return")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "return")
         expression = self.expression()
-        self.eat("DELIMITER", ";")
-        return ASTNode("ReturnStatement", children=[expression])
+        self.eat(TK_DELIMITER, ";")
+        return ReturnStatement(expression, position)
 
     def print_statement(self):
-        self.eat("KEYWORD", "print")
-        self.eat("DELIMITER", "(")
+        position = self.offset()
+        self.eat(TK_KEYWORD, "print")
+        self.eat(TK_DELIMITER, "(")
         expression = self.expression()
-        self.eat("DELIMITER", ")")
-        self.eat("DELIMITER", ";")
-        return ASTNode("PrintStatement", children=[expression])
+        self.eat(TK_DELIMITER, ")")
+        self.eat(TK_DELIMITER, ";")
+        return PrintStatement(expression, position)
 
     def expression(self):
-        return self.comparison()
-
-    def comparison(self):
-        node = self.arithmetic()
-        while self.current_token and self.current_token["type"] == "OPERATOR" and self.current_token["value"] in ["==", "!=", "<=", ">=", "<", ">"]:
-            op = self.current_token["value"]
-            self.eat("OPERATOR")
-            right = self.arithmetic()
-            node = ASTNode("BinaryExpression", value=op, children=[node, right])
-        return node
-
-    def arithmetic(self):
-        node = self.term()
-        while self.current_token and self.current_token["type"] == "OPERATOR" and self.current_token["value"] in ["+", "-"]:
-            op = self.current_token["value"]
-            self.eat("OPERATOR")
-            right = self.term()
-            node = ASTNode("BinaryExpression", value=op, children=[node, right])
-        return node
-
-    def term(self):
-        node = self.factor()
-        while self.current_token and self.current_token["type"] == "OPERATOR" and self.current_token["value"] in ["*", "/"]:
-            op = self.current_token["value"]
-            self.eat("OPERATOR")
-            right = self.factor()
-            node = ASTNode("BinaryExpression", value=op, children=[node, right])
-        return node
+        # Precedence climbing over BINARY_PRECEDENCE with explicit operand and
+        # operator stacks, so neither long operator chains nor deeply nested
+        # parentheses recurse. All binary operators are left-associative.
+        operands = []
+        operators = []  # (precedence, operator, offset), or _OPEN_PAREN
+        depth = 0
+        while True:
+            while self.kind == TK_DELIMITER and self.value == "(":
+                operators.append(_OPEN_PAREN)
+                depth += 1
+                self.advance()
+            operands.append(self.factor())
+            while depth and self.kind == TK_DELIMITER and self.value == ")":
+                while operators[-1] is not _OPEN_PAREN:
+                    _reduce(operands, operators)
+                operators.pop()
+                depth -= 1
+                self.advance()
+            precedence = BINARY_PRECEDENCE.get(self.value) if self.kind == TK_OPERATOR else None
+            if precedence is None:
+                break
+            while operators and operators[-1] is not _OPEN_PAREN and operators[-1][0] >= precedence:
+                _reduce(operands, operators)
+            operators.append((precedence, self.value, self.offset()))
+            self.advance()
+        if depth:
+            self.eat(TK_DELIMITER, ")")
+        while operators:
+            _reduce(operands, operators)
+        return operands[0]
 
     def factor(self):
-        token = self.current_token
-        if token["type"] == "NUMBER":
-            self.eat("NUMBER")
-            return ASTNode("NumberLiteral", value=token["value"])
-        elif token["type"] == "STRING":
-            self.eat("STRING")
-            return ASTNode("StringLiteral", value=token["value"])
-        elif token["type"] == "IDENTIFIER":
-            self.eat("IDENTIFIER")
-            return ASTNode("Identifier", value=token["value"])
-        elif token["type"] == "DELIMITER" and token["value"] == "(":
-            self.eat("DELIMITER", "(")
-            node = self.expression()
-            self.eat("DELIMITER", ")")
-            return node
+        kind = self.kind
+        value = self.value
+        if kind == TK_NUMBER:
+            position = self.offset()
+            self.advance()
+            return NumberLiteral(value, position)
+        elif kind == TK_STRING:
+            position = self.offset()
+            self.advance()
+            return StringLiteral(value, position)
+        elif kind == TK_IDENTIFIER:
+            position = self.offset()
+            self.advance()
+            return Identifier(value, position)
         else:
-            raise Exception(f"Fator inesperado: {token}")
+            self.error(f"Fator inesperado: {self.current_token}")
+
 
+def _reduce(operands, operators):
+    right = operands.pop()
+    _, operator, position = operators.pop()
+    operands[-1] = BinaryExpression(operator, operands[-1], right, position)
 
+Parser._statement_handlers = {
+    "var": Parser.variable_declaration,
+    "if": Parser.if_statement,
+    "for": Parser.for_statement,
+    "while": Parser.while_statement,
+    "return": Parser.return_statement,
+    "print": Parser.print_statement,
+}
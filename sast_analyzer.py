@@ -1,49 +1,50 @@
-class SASTAnalyzer:
+from ir import PRINT
+from ir_generator import IRGenerator
+from taint import tainted_sinks
+
+
+class SASTAnalyzer(IRGenerator):
+    # Lowers the AST to IR, as IRGenerator does, and runs the taint analysis of
+    # taint.py on it. SensitiveDataExposure: data derived from a sensitive
+    # source (password, token, ...) reaches a print. PotentialInjection: a
+    # string literal concatenated with untrusted input (a parameter, or a
+    # variable named as input) reaches a print or a return. Findings come out
+    # in IR order, which is source order.
     def __init__(self):
+        super().__init__()
         self.vulnerabilities = []
 
     def analyze(self, ast):
-        self.vulnerabilities = []
+        self.ir_code = []
+        self.nodes = {}
         self.visit(ast)
-        return self.vulnerabilities
+        return self.analyze_ir(self.ir_code, self.nodes)
 
-    def visit(self, node):
-        if node is None:
-            return
-        method_name = f"visit_{node.type}"
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        for child in node.children:
-            self.visit(child)
-
-    def visit_PrintStatement(self, node):
-        # Simplified example: Check for direct printing of identifiers (potential for sensitive data exposure)
-        # In a real SAST, this would be much more complex, involving data flow analysis
-        if node.children and node.children[0].type == "Identifier":
-            self.vulnerabilities.append({
-                "type": "SensitiveDataExposure",
-                "message": f"Potencial exposição de dados sensíveis: Variável '{node.children[0].value}' sendo impressa diretamente.",
-                "node": node
-            })
-        self.generic_visit(node)
-
-    def visit_BinaryExpression(self, node):
-        # Simplified example: Check for string concatenation that might lead to injection (e.g., SQL injection)
-        # This assumes string literals are used directly in concatenation, which is a common pattern for vulnerabilities.
-        if node.value == "+":
-            left_child = node.children[0]
-            right_child = node.children[1]
-
-            if (left_child.type == "StringLiteral" and right_child.type == "Identifier") or \
-               (left_child.type == "Identifier" and right_child.type == "StringLiteral"):
+    def analyze_ir(self, ir_code, nodes=None):
+        # `nodes` maps id(instr) of PRINT/RETURN to their AST node; findings on
+        # instructions without one report the instruction itself.
+        nodes = nodes or {}
+        self.vulnerabilities = []
+        for instr, sensitive, injected in tainted_sinks(ir_code):
+            node = nodes.get(id(instr), instr)
+            if sensitive:
+                self.vulnerabilities.append({
+                    "type": "SensitiveDataExposure",
+                    "message": f"Potencial exposição de dados sensíveis: valor derivado de {_quoted(sensitive)} sendo impresso.",
+                    "node": node
+                })
+            if injected:
+                sink = "impressa" if instr.op == PRINT else "retornada"
                 self.vulnerabilities.append({
                     "type": "PotentialInjection",
-                    "message": "Potencial vulnerabilidade de injeção: Concatenação de string com identificador. Considere sanitização de entrada.",
+                    "message": f"Potencial vulnerabilidade de injeção: String concatenada com entrada não confiável ({_quoted(injected)}) sendo {sink}. Considere sanitização de entrada.",
                     "node": node
                 })
-        self.generic_visit(node)
+        return self.vulnerabilities
+
+
+def _quoted(names):
+    return ", ".join(f"'{name}'" for name in names)
 
 
 if __name__ == "__main__":
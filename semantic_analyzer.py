@@ -1,135 +1,181 @@
+from ast_walker import Walker
+
+# Type of an expression that could not be typed. An error has already been
+# reported for it, so no check involving it reports another.
+ERROR_TYPE = "error"
+
+
+class Symbol:
+    # Immutable record of one declaration. `depth` is the nesting level of the
+    # scope that declared it (0 = global).
+    __slots__ = ("name", "type", "kind", "depth")
+
+    def __init__(self, name, type, kind, depth):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "type", type)
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "depth", depth)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Símbolo '{self.name}' é imutável.")
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.type!r}, {self.kind!r}, {self.depth})"
+
+
 class SymbolTable:
+    # Flat symbol table: every name maps to the stack of its visible bindings,
+    # innermost last, and each open scope keeps an undo log of the names it
+    # declared. A lookup is one dict access whatever the nesting depth, and
+    # leaving a scope pops exactly what the scope pushed.
+    __slots__ = ("bindings", "scopes")
+
     def __init__(self):
-        self.symbols = {}
-        self.parent = None
+        self.bindings = {}
+        self.scopes = []
+
+    def enter_scope(self):
+        self.scopes.append([])
+
+    def exit_scope(self):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            bindings[name].pop()
 
     def add_symbol(self, name, type, kind=None):
-        if name in self.symbols:
+        depth = len(self.scopes) - 1
+        stack = self.bindings.get(name)
+        if stack is None:
+            stack = self.bindings[name] = []
+        elif stack and stack[-1].depth == depth:
             raise Exception(f"Erro semântico: Símbolo '{name}' já declarado neste escopo.")
-        self.symbols[name] = {"type": type, "kind": kind}
-
-    def get_symbol(self, name):
-        symbol = self.symbols.get(name)
-        if symbol is None and self.parent:
-            return self.parent.get_symbol(name)
+        symbol = Symbol(name, type, kind, depth)
+        stack.append(symbol)
+        self.scopes[-1].append(name)
         return symbol
 
-class SemanticAnalyzer:
-    def __init__(self):
-        self.current_scope = None
+    def get_symbol(self, name):
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
+
+class SemanticAnalyzer(Walker):
+    # Without a Diagnostics collector the first error is raised; with one,
+    # errors are recorded and the walk goes on, with ERROR_TYPE for whatever
+    # could not be typed.
+    def __init__(self, diagnostics=None):
+        super().__init__()
+        self.symbols = SymbolTable()
+        self.diagnostics = diagnostics
+
+    def report(self, message, node):
+        if self.diagnostics is None:
+            raise Exception(message)
+        self.diagnostics.error(message, getattr(node, "position", None))
+
+    def declare(self, node, name, type, kind):
+        if self.diagnostics is None:
+            return self.symbols.add_symbol(name, type, kind=kind)
+        try:
+            return self.symbols.add_symbol(name, type, kind=kind)
+        except Exception as e:
+            self.report(str(e), node)
 
     def enter_scope(self):
-        new_scope = SymbolTable()
-        new_scope.parent = self.current_scope
-        self.current_scope = new_scope
+        self.symbols.enter_scope()
 
     def exit_scope(self):
-        self.current_scope = self.current_scope.parent
+        self.symbols.exit_scope()
 
     def analyze(self, ast):
         self.enter_scope() # Global scope
         self.visit(ast)
         self.exit_scope()
 
-    def visit(self, node):
-        method_name = f"visit_{node.type}"
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        for child in node.children:
-            if child:
-                self.visit(child)
-
-    def visit_Program(self, node):
-        for child in node.children:
-            self.visit(child)
-
     def visit_FunctionDeclaration(self, node):
         func_name = node.value
-        return_type = node.metadata.get("return_type")
+        return_type = node.return_type
         # Add function to current scope (global)
-        self.current_scope.add_symbol(func_name, "function", kind={"return_type": return_type})
+        self.declare(node, func_name, "function", {"return_type": return_type})
 
         self.enter_scope() # Function scope
         # Add parameters to function scope
-        for param in node.children[0].children:
-            self.current_scope.add_symbol(param.value, param.metadata["type"], kind="parameter")
+        for param in node.params.children:
+            self.declare(param, param.value, param.param_type, "parameter")
         
-        self.visit(node.children[1]) # Visit function body (Block)
+        yield node.body # Visit function body (Block)
         self.exit_scope()
 
     def visit_VariableDeclaration(self, node):
         var_name = node.value
-        var_type = node.metadata.get("type")
+        var_type = node.var_type
         # Infer type if not explicitly declared
         if var_type is None:
-            expr_type = self.visit(node.children[0]) # Get type of expression
-            var_type = expr_type
-        
-        self.current_scope.add_symbol(var_name, var_type, kind="variable")
+            expr_type = var_type = yield node.expr # Get type of expression
+            self.declare(node, var_name, var_type, "variable")
+        else:
+            self.declare(node, var_name, var_type, "variable")
+            expr_type = yield node.expr
         # Type checking for assignment
-        expr_type = self.visit(node.children[0])
-        if var_type and expr_type and var_type != expr_type:
-            raise Exception(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {var_type}, mas obteve {expr_type}.")
+        if expr_type and expr_type != ERROR_TYPE and var_type != expr_type:
+            self.report(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {var_type}, mas obteve {expr_type}.", node)
 
     def visit_AssignmentStatement(self, node):
         var_name = node.value
-        symbol = self.current_scope.get_symbol(var_name)
+        symbol = self.symbols.get_symbol(var_name)
         if not symbol:
-            raise Exception(f"Erro semântico: Variável '{var_name}' não declarada.")
-        
-        expr_type = self.visit(node.children[0])
-        if symbol["type"] and expr_type and symbol["type"] != expr_type:
-            raise Exception(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {symbol['type']}, mas obteve {expr_type}.")
+            self.report(f"Erro semântico: Variável '{var_name}' não declarada.", node)
+
+        expr_type = yield node.expr
+        if symbol and symbol.type and expr_type and ERROR_TYPE not in (symbol.type, expr_type) and symbol.type != expr_type:
+            self.report(f"Erro semântico: Atribuição de tipo incompatível para '{var_name}'. Esperado {symbol.type}, mas obteve {expr_type}.", node)
 
     def visit_IfStatement(self, node):
-        condition_type = self.visit(node.children[0])
-        if condition_type != "bool":
-            raise Exception(f"Erro semântico: Condição 'if' deve ser do tipo booleano, mas obteve {condition_type}.")
+        condition_type = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'if' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
         self.enter_scope()
-        self.visit(node.children[1]) # True block
+        yield node.then_block # True block
         self.exit_scope()
-        if node.children[2]: # Else block or else if
+        if node.else_block: # Else block or else if
             self.enter_scope()
-            self.visit(node.children[2])
+            yield node.else_block
             self.exit_scope()
 
     def visit_ForStatement(self, node):
         self.enter_scope()
-        if node.children[0]: # init
-            self.visit(node.children[0])
-        condition_type = self.visit(node.children[1])
-        if condition_type != "bool":
-            raise Exception(f"Erro semântico: Condição 'for' deve ser do tipo booleano, mas obteve {condition_type}.")
-        if node.children[2]: # update
-            self.visit(node.children[2])
-        self.visit(node.children[3]) # body
+        if node.init: # init
+            yield node.init
+        condition_type = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'for' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
+        if node.update: # update
+            yield node.update
+        yield node.body # body
         self.exit_scope()
 
     def visit_WhileStatement(self, node):
-        condition_type = self.visit(node.children[0])
-        if condition_type != "bool":
-            raise Exception(f"Erro semântico: Condição 'while' deve ser do tipo booleano, mas obteve {condition_type}.")
+        condition_type = yield node.condition
+        if condition_type != "bool" and condition_type != ERROR_TYPE:
+            self.report(f"Erro semântico: Condição 'while' deve ser do tipo booleano, mas obteve {condition_type}.", node.condition)
         self.enter_scope()
-        self.visit(node.children[1]) # body
+        yield node.body # body
         self.exit_scope()
 
-    def visit_ReturnStatement(self, node):
+    def leave_ReturnStatement(self, node, expr_type):
         # For simplicity, assume return type matches function declaration for now
         # In a real compiler, you'd check against the current function's declared return type
-        return self.visit(node.children[0])
+        return expr_type
 
-    def visit_PrintStatement(self, node):
-        # Print can take any type, so just visit the expression
-        self.visit(node.children[0])
+    def leave_PrintStatement(self, node, expr_type):
+        # Print can take any type, so there is nothing to check
+        pass
 
-    def visit_BinaryExpression(self, node):
-        left_type = self.visit(node.children[0])
-        right_type = self.visit(node.children[1])
+    def leave_BinaryExpression(self, node, left_type, right_type):
         op = node.value
+        if left_type == ERROR_TYPE or right_type == ERROR_TYPE:
+            return ERROR_TYPE
 
-        if op in ["+", "-", "*", "/"]:
+        if op in ["+", "-", "*", "/", "%"]:
             if left_type == "int" and right_type == "int":
                 return "int"
             elif left_type == "float" and right_type == "float":
@@ -139,18 +185,20 @@ class SemanticAnalyzer:
             elif op == "+" and left_type == "string" and right_type == "string":
                 return "string"
             else:
-                raise Exception(f"Erro semântico: Operação aritmética inválida entre {left_type} e {right_type}.")
+                self.report(f"Erro semântico: Operação aritmética inválida entre {left_type} e {right_type}.", node)
         elif op in ["==", "!=", "<", ">", "<=", ">="]:
             if left_type == right_type:
                 return "bool"
             else:
-                raise Exception(f"Erro semântico: Comparação inválida entre {left_type} e {right_type}.")
+                self.report(f"Erro semântico: Comparação inválida entre {left_type} e {right_type}.", node)
         elif op in ["&&", "||"]:
             if left_type == "bool" and right_type == "bool":
                 return "bool"
             else:
-                raise Exception(f"Erro semântico: Operação lógica inválida entre {left_type} e {right_type}. Esperado booleanos.")
-        return None # Should not reach here
+                self.report(f"Erro semântico: Operação lógica inválida entre {left_type} e {right_type}. Esperado booleanos.", node)
+        else:
+            return None # Should not reach here
+        return ERROR_TYPE
 
     def visit_NumberLiteral(self, node):
         if "." in node.value:
@@ -161,10 +209,11 @@ class SemanticAnalyzer:
         return "string"
 
     def visit_Identifier(self, node):
-        symbol = self.current_scope.get_symbol(node.value)
+        symbol = self.symbols.get_symbol(node.value)
         if not symbol:
-            raise Exception(f"Erro semântico: Variável '{node.value}' não declarada.")
-        return symbol["type"]
+            self.report(f"Erro semântico: Variável '{node.value}' não declarada.", node)
+            return ERROR_TYPE
+        return symbol.type
 
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+from itertools import count
+
+from cfg import BasicBlock, Dominators, Liveness, build_cfg
+from ir import ASSIGN, BIN_OP, FOR_RANGE, GOTO, IF_FALSE, LABEL, PHI, RETURN, Instr, Temp, Var
+
+
+def _add_entry_block(cfg):
+    # PHI arguments follow the block's predecessors, so the entry block must
+    # not have any: a function starting with a loop label gets an empty block
+    # in front of it.
+    blocks = cfg.blocks
+    entry = BasicBlock(0)
+    for block in blocks:
+        block.index += 1
+    entry.succs.append(blocks[0])
+    blocks[0].preds.append(entry)
+    blocks.insert(0, entry)
+
+
+def _version(name, number):
+    return Var(f"{name.text}.{number}")
+
+
+def construct_ssa(cfg, liveness=None):
+    # Pruned SSA (Cytron et al.). Every name written more than once (a name
+    # live into the function counts as written at its entry) gets a version
+    # name.<n> per write, and PHIs at the iterated dominance frontier of its
+    # writes wherever it is live; renaming walks the dominator tree. The value
+    # a name has on entry keeps the plain name. Names written once are already
+    # in SSA form and stay as they are.
+    # Rewrites cfg in place and returns {version: original name}.
+    if not cfg.blocks:
+        return {}
+    if cfg.blocks[0].preds:
+        _add_entry_block(cfg)
+        liveness = None
+    blocks = cfg.blocks
+    liveness = liveness or Liveness(cfg)
+    dominators = Dominators(cfg)
+    bits = liveness.bits
+    entry_live = liveness.live_in[0]
+
+    writes = {}
+    for block in blocks:
+        for instr in block.instrs:
+            dest = instr.dest
+            if dest is not None:
+                writes.setdefault(dest, []).append(block.index)
+    renamed = []
+    live_on_entry = set()
+    for name, write_blocks in writes.items():
+        bit = bits.get(name)
+        if bit is not None and entry_live >> bit & 1:
+            live_on_entry.add(name)
+            write_blocks.append(0)
+        if len(write_blocks) > 1:
+            renamed.append(name)
+
+    frontiers = dominators.frontiers(cfg)
+    phis = [[] for _ in blocks]
+    for name in renamed:
+        bit = bits.get(name)
+        if bit is None:
+            # Never live across blocks: no PHI can be needed.
+            continue
+        defined = set(writes[name])
+        work = list(defined)
+        placed = set()
+        while work:
+            for index in frontiers[work.pop()]:
+                if index in placed:
+                    continue
+                placed.add(index)
+                if liveness.live_in[index] >> bit & 1:
+                    phis[index].append(Instr(PHI, name, (name,) * len(blocks[index].preds)))
+                if index not in defined:
+                    work.append(index)
+    for block in blocks:
+        if phis[block.index]:
+            at = 1 if block.instrs and block.instrs[0].op == LABEL else 0
+            block.instrs[at:at] = phis[block.index]
+
+    origins = {}
+    numbers = {name: count(1) for name in renamed}
+    stacks = {name: [name] if name in live_on_entry else [] for name in renamed}
+    phi_names = [[phi.dest for phi in block_phis] for block_phis in phis]
+
+    def current(arg):
+        stack = stacks.get(arg)
+        return stack[-1] if stack else arg
+
+    children = dominators.children()
+    work = [(0, None)]
+    while work:
+        index, pushed = work.pop()
+        if pushed is not None:
+            for name in pushed:
+                stacks[name].pop()
+            continue
+        pushed = []
+        block = blocks[index]
+        instrs = block.instrs
+        for n, instr in enumerate(instrs):
+            args = instr.args
+            if instr.op != PHI and any(arg in stacks for arg in args):
+                args = tuple(current(arg) for arg in args)
+            dest = instr.dest
+            if dest in stacks:
+                version = _version(dest, next(numbers[dest]))
+                origins[version] = dest
+                stacks[dest].append(version)
+                pushed.append(dest)
+                dest = version
+            if dest is not instr.dest or args is not instr.args:
+                if instr.op == PHI:
+                    instr.dest = dest
+                else:
+                    instrs[n] = Instr(instr.op, dest, args, instr.operator, instr.label)
+        for succ in block.succs:
+            if phis[succ.index]:
+                position = succ.preds.index(block)
+                for phi, name in zip(phis[succ.index], phi_names[succ.index]):
+                    args = list(phi.args)
+                    args[position] = current(name)
+                    phi.args = tuple(args)
+        work.append((index, pushed))
+        work.extend((child, None) for child in reversed(children[index]))
+    return origins
+
+
+def eliminate_dead_ssa(cfg):
+    # Mark-and-sweep dead code elimination on SSA form: instructions with an
+    # effect (print, return, control flow) are live, and so is every write one
+    # of their operands reads, transitively through PHIs. A cycle of writes
+    # that only feed each other (a counter nothing else reads) goes too, which
+    # liveness-based DCE cannot see. Returns the number of instructions removed,
+    # PHIs not counted.
+    writers = {}
+    work = []
+    marked = set()
+    for block in cfg.blocks:
+        for instr in block.instrs:
+            if instr.op == ASSIGN or instr.op == BIN_OP or instr.op == PHI:
+                writers.setdefault(instr.dest, []).append(instr)
+            else:
+                marked.add(id(instr))
+                work.append(instr)
+    while work:
+        for arg in work.pop().args:
+            for writer in writers.get(arg, ()):
+                if id(writer) not in marked:
+                    marked.add(id(writer))
+                    work.append(writer)
+    removed = 0
+    for block in cfg.blocks:
+        kept = [instr for instr in block.instrs if id(instr) in marked]
+        if len(kept) != len(block.instrs):
+            removed += sum(1 for instr in block.instrs if instr.op != PHI and id(instr) not in marked)
+            block.instrs = kept
+    return removed
+
+
+def _sequentialize(copies, fresh):
+    # The copies on one edge happen at once (a PHI reads the values its block
+    # is entered with); orders them so none overwrites a value another still
+    # needs, breaking cycles (swaps) through a fresh name.
+    pending = [(dest, source) for dest, source in copies if dest != source]
+    out = []
+    while pending:
+        sources = {source for _, source in pending}
+        for n, (dest, source) in enumerate(pending):
+            if dest not in sources:
+                out.append(Instr(ASSIGN, dest, (source,)))
+                del pending[n]
+                break
+        else:
+            saved = pending[0][0]
+            temp = fresh(saved)
+            out.append(Instr(ASSIGN, temp, (saved,)))
+            pending = [(dest, temp if source == saved else source) for dest, source in pending]
+    return out
+
+
+def destruct_ssa(cfg, origins, new_label):
+    # Out-of-SSA lowering: each PHI becomes copies at the end of its
+    # predecessors (an edge from a block with another successor is split
+    # first, `new_label()` naming the new block), then the versions of each
+    # name are coalesced: versions whose live ranges do not interfere share a
+    # variable, the first group keeping the original name, and copies between
+    # versions that ended up in the same variable disappear.
+    # Returns the new instruction list.
+    blocks = cfg.blocks
+    origins = dict(origins)
+    numbers = count(1)
+
+    def fresh(name):
+        temp = Var(f"{origins.get(name, name).text}.s{next(numbers)}")
+        origins[temp] = origins.get(name, name)
+        return temp
+
+    tails = {}
+    falls = {}
+    before = {}
+    for block in blocks:
+        phis = [instr for instr in block.instrs if instr.op == PHI]
+        if not phis:
+            continue
+        block.instrs = [instr for instr in block.instrs if instr.op != PHI]
+        for position, pred in enumerate(block.preds):
+            copies = _sequentialize([(phi.dest, phi.args[position]) for phi in phis], fresh)
+            if not copies:
+                continue
+            tail = pred.instrs[-1] if pred.instrs else None
+            if tail is None or tail.op not in (IF_FALSE, FOR_RANGE):
+                tails.setdefault(pred.index, []).extend(copies)
+            elif block.index == pred.index + 1 and tail.label != _label_of(block):
+                # Fallthrough edge: the copies get a block of their own
+                # between the two, right after the predecessor.
+                falls.setdefault(block.index, []).extend(copies)
+            else:
+                label = new_label()
+                pred.instrs[-1] = Instr(tail.op, tail.dest, tail.args, tail.operator, label)
+                before.setdefault(block.index, []).append(
+                    [Instr(LABEL, label=label), *copies, Instr(GOTO, label=_label_of(block))])
+
+    out = []
+    for block in blocks:
+        out.extend(falls.get(block.index, ()))
+        for split in before.get(block.index, ()):
+            if out and out[-1].op not in (GOTO, RETURN):
+                # Whatever fell through into the block must skip the copies.
+                out.append(Instr(GOTO, label=_label_of(block)))
+            out.extend(split)
+        instrs = block.instrs
+        copies = tails.get(block.index)
+        if copies:
+            if instrs and instrs[-1].op == GOTO:
+                out.extend(instrs[:-1])
+                out.extend(copies)
+                out.append(instrs[-1])
+            else:
+                out.extend(instrs)
+                out.extend(copies)
+        else:
+            out.extend(instrs)
+    return _coalesce(out, origins)
+
+
+def _label_of(block):
+    first = block.instrs[0] if block.instrs else None
+    if first is None or first.op != LABEL:
+        raise Exception(f"Erro de SSA: bloco {block.index} sem rótulo na divisão de aresta.")
+    return first.label
+
+
+def _coalesce(instrs, origins):
+    if not origins:
+        return instrs
+    cfg = build_cfg(instrs)
+    liveness = Liveness(cfg)
+    bits = liveness.bits
+    groups = {}
+    for version, name in origins.items():
+        groups.setdefault(name, [name]).append(version)
+    group_of = {member: name for name, members in groups.items() for member in members}
+    group_masks = {}
+    for member, name in group_of.items():
+        bit = bits.get(member)
+        if bit is not None:
+            group_masks[name] = group_masks.get(name, 0) | 1 << bit
+    names = liveness.names
+
+    # Interference between members of the same group: a write interferes with
+    # every other member live right after it, except the source of a copy.
+    interferes = {member: set() for member in group_of}
+    for block in cfg.blocks:
+        live = liveness.live_out[block.index]
+        local = set()
+        for instr in reversed(block.instrs):
+            dest = instr.dest
+            if dest is not None:
+                group = group_of.get(dest)
+                if group is not None:
+                    source = instr.args[0] if instr.op == ASSIGN else None
+                    others = live & group_masks.get(group, 0)
+                    while others:
+                        low = others & -others
+                        other = names[low.bit_length() - 1]
+                        others ^= low
+                        if other != dest and other != source:
+                            interferes[dest].add(other)
+                            interferes[other].add(dest)
+                    for other in local:
+                        if other != dest and other != source and group_of.get(other) == group:
+                            interferes[dest].add(other)
+                            interferes[other].add(dest)
+                bit = bits.get(dest)
+                if bit is not None:
+                    live &= ~(1 << bit)
+                else:
+                    local.discard(dest)
+            for arg in instr.args:
+                bit = bits.get(arg)
+                if bit is not None:
+                    live |= 1 << bit
+                elif arg in group_of:
+                    local.add(arg)
+
+    # Each group is colored greedily in version order: the original name
+    # first, so the first class keeps it.
+    used = temps = None
+    mapping = {}
+    for name, members in groups.items():
+        classes = []
+        for member in members:
+            for members_of_class in classes:
+                if not interferes[member] & members_of_class:
+                    members_of_class.add(member)
+                    break
+            else:
+                classes.append({member})
+        for number, members_of_class in enumerate(classes):
+            if number == 0:
+                target = name
+            else:
+                if used is None:
+                    # Versions that must stay apart are rare: only then look
+                    # for the names still free.
+                    operands = [arg for instr in instrs for arg in (instr.dest, *instr.args) if arg is not None]
+                    used = {arg.text for arg in operands}
+                    temps = count(max((arg.index for arg in operands if arg.__class__ is Temp), default=0) + 1)
+                if name.__class__ is Temp:
+                    target = Temp(next(temps))
+                else:
+                    suffix = number
+                    while f"{name.text}_{suffix}" in used:
+                        suffix += 1
+                    target = Var(f"{name.text}_{suffix}")
+                    used.add(target.text)
+            for member in members_of_class:
+                mapping[member] = target
+
+    out = []
+    for instr in instrs:
+        dest = mapping.get(instr.dest, instr.dest)
+        args = instr.args
+        if any(arg in mapping for arg in args):
+            args = tuple(mapping.get(arg, arg) for arg in args)
+        if instr.op == ASSIGN and args[0] == dest:
+            continue
+        if dest is instr.dest and args is instr.args:
+            out.append(instr)
+        else:
+            out.append(Instr(instr.op, dest, args, instr.operator, instr.label))
+    return out
+
+
+if __name__ == "__main__":
+    from ir import format_ir, parse_ir
+
+    ir_code_example = [
+        "ASSIGN x, 0",
+        "ASSIGN n, 0",
+        "L1:",
+        "BIN_OP t1, x, <, 3",
+        "IF_FALSE t1 GOTO L2",
+        "PRINT x",
+        "BIN_OP n, n, +, 1",
+        "BIN_OP x, x, +, 1",
+        "GOTO L1",
+        "L2:",
+    ]
+    cfg = build_cfg(parse_ir(ir_code_example))
+    origins = construct_ssa(cfg)
+    print("\n".join(format_ir(cfg.instructions())))
+    print("removidas:", eliminate_dead_ssa(cfg))
+    print("\n".join(format_ir(destruct_ssa(cfg, origins, None))))
@@ -0,0 +1,221 @@
+from collections import deque
+
+from cfg import Liveness, build_cfg
+from ir import ASSIGN, BIN_OP, END_FUNC, FUNC, PRINT, RETURN, Const, Var
+
+# The language has no input or I/O calls, so sources and sanitizers are named
+# by convention: lower-case fragments of variable names. Parameters are always
+# untrusted input.
+SENSITIVE_NAMES = (
+    "password", "passwd", "senha", "secret", "segredo", "token", "api_key", "apikey",
+    "credential", "credencial", "private", "privad", "ssn", "cpf", "card", "cartao",
+)
+INPUT_NAMES = ("input", "entrada", "user", "usuario", "request", "param", "form")
+SANITIZER_NAMES = ("sanitiz", "escaped", "escapad", "safe", "segur", "masked", "mascarad", "hashed")
+
+# Results that are bool: comparing tainted data leaks at most one bit, so these
+# act as sanitizers.
+BOOLEAN_OPERATORS = frozenset(("<", ">", "<=", ">=", "==", "!=", "&&", "||"))
+
+
+def _matches(name, fragments):
+    name = name.lower()
+    return any(fragment in name for fragment in fragments)
+
+
+def _is_string(const):
+    # String literals keep their quotes in the IR, single or double.
+    return const.text[:1] in ("'", '"')
+
+
+class TaintAnalysis:
+    # Forward may-analysis over one function's CFG, solved with a worklist.
+    # Every source (parameter, or variable named as input or as sensitive data)
+    # gets one bit k; a value's taint is an int holding bit k when it may derive
+    # from source k, bit n + k when source k may have been concatenated into a
+    # string literal (an injected string), and bit 2n when it may hold literal
+    # string text. Writes to a sanitizer-named variable and boolean operators
+    # clear the taint.
+    # A block state packs the taint of every name live across blocks into one
+    # int, a field per name, so joins and comparisons are single int
+    # operations; names confined to a block live in a dict while it is walked.
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.sources = []
+        self.input_mask = 0
+        self.sensitive_mask = 0
+        source_bits = {}
+        params = set()
+        slots = {}
+        if cfg.blocks:
+            liveness = Liveness(cfg)
+            params = {name for name in liveness.live_names(liveness.live_in[0]) if name.__class__ is Var}
+            slots = liveness.bits
+        seen = set()
+        for block in cfg.blocks:
+            for instr in block.instrs:
+                for name in (instr.dest, *instr.args):
+                    if name.__class__ is not Var or name in seen:
+                        continue
+                    seen.add(name)
+                    if _matches(name.text, SANITIZER_NAMES):
+                        continue
+                    sensitive = _matches(name.text, SENSITIVE_NAMES)
+                    untrusted = name in params or _matches(name.text, INPUT_NAMES)
+                    if sensitive or untrusted:
+                        bit = 1 << len(self.sources)
+                        source_bits[name] = bit
+                        self.sources.append(name)
+                        if sensitive:
+                            self.sensitive_mask |= bit
+                        if untrusted:
+                            self.input_mask |= bit
+        self.source_bits = source_bits
+        self.sanitizers = {name for name in seen if _matches(name.text, SANITIZER_NAMES)}
+        n = self.width = len(self.sources)
+        self.plain_mask = (1 << n) - 1
+        self.string_bit = 1 << 2 * n
+        self.field_mask = (1 << 2 * n + 1) - 1
+        self.shifts = {name: bit * (2 * n + 1) for name, bit in slots.items()}
+        entry = 0
+        for name in params:
+            if name in source_bits and name in self.shifts:
+                entry |= source_bits[name] << self.shifts[name]
+        self.entry_state = entry
+        # Without sources nothing can reach a sink.
+        self.in_states = self._solve() if n else None
+
+    def _value(self, arg, state, local):
+        if arg.__class__ is Const:
+            return self.string_bit if _is_string(arg) else 0
+        shift = self.shifts.get(arg)
+        if shift is None:
+            return local.get(arg, 0)
+        return state >> shift & self.field_mask
+
+    def _transfer(self, instr, state, local):
+        # Returns the block state after `instr`; block-local names go to `local`.
+        dest = instr.dest
+        if dest is None:
+            return state
+        shifts = self.shifts
+        field_mask = self.field_mask
+        string_bit = self.string_bit
+        taints = []
+        for arg in instr.args:
+            if arg.__class__ is Const:
+                taints.append(string_bit if _is_string(arg) else 0)
+            else:
+                shift = shifts.get(arg)
+                taints.append(local.get(arg, 0) if shift is None else state >> shift & field_mask)
+        op = instr.op
+        if op == ASSIGN:
+            taint = taints[0]
+        elif op == BIN_OP and instr.operator in BOOLEAN_OPERATORS:
+            taint = 0
+        elif op == BIN_OP and instr.operator == "+":
+            left, right = taints
+            taint = left | right
+            if right & string_bit:
+                taint |= (left & self.input_mask) << self.width
+            if left & string_bit:
+                taint |= (right & self.input_mask) << self.width
+        else:
+            # Arithmetic (and FOR_RANGE) results are numbers: no string text,
+            # nothing injected.
+            taint = 0
+            for value in taints:
+                taint |= value
+            taint &= self.plain_mask
+        if dest.__class__ is Var:
+            if dest in self.sanitizers:
+                taint &= string_bit
+            taint |= self.source_bits.get(dest, 0)
+        shift = shifts.get(dest)
+        if shift is None:
+            if taint:
+                local[dest] = taint
+            else:
+                local.pop(dest, None)
+            return state
+        return state & ~(field_mask << shift) | taint << shift
+
+    def _solve(self):
+        blocks = self.cfg.blocks
+        in_states = [0] * len(blocks)
+        out_states = [None] * len(blocks)
+        worklist = deque(blocks)
+        queued = [True] * len(blocks)
+        while worklist:
+            block = worklist.popleft()
+            i = block.index
+            queued[i] = False
+            state = self.entry_state if i == 0 else 0
+            for pred in block.preds:
+                out = out_states[pred.index]
+                if out is not None:
+                    state |= out
+            in_states[i] = state
+            local = {}
+            for instr in block.instrs:
+                state = self._transfer(instr, state, local)
+            if state != out_states[i]:
+                out_states[i] = state
+                for succ in block.succs:
+                    if not queued[succ.index]:
+                        queued[succ.index] = True
+                        worklist.append(succ)
+        return in_states
+
+    def _names(self, mask):
+        return [self.sources[k] for k in range(self.width) if mask >> k & 1]
+
+    def sinks(self):
+        # Yields (instr, sensitive sources, injected input sources) for every
+        # print that may output sensitive data or an injected string, and every
+        # return that may hand out an injected string, in IR order.
+        if self.in_states is None:
+            return
+        for block in self.cfg.blocks:
+            state = self.in_states[block.index]
+            local = {}
+            for instr in block.instrs:
+                if instr.op == PRINT or instr.op == RETURN:
+                    taint = self._value(instr.args[0], state, local)
+                    sensitive = taint & self.sensitive_mask if instr.op == PRINT else 0
+                    injected = taint >> self.width & self.input_mask
+                    if sensitive or injected:
+                        yield instr, self._names(sensitive), self._names(injected)
+                state = self._transfer(instr, state, local)
+
+
+def tainted_sinks(ir_code):
+    # TaintAnalysis.sinks() over every function of `ir_code`.
+    body = None
+    for instr in ir_code:
+        if instr.op == FUNC:
+            body = []
+        elif instr.op == END_FUNC and body is not None:
+            yield from TaintAnalysis(build_cfg(body)).sinks()
+            body = None
+        elif body is not None:
+            body.append(instr)
+    if body:
+        yield from TaintAnalysis(build_cfg(body)).sinks()
+
+
+if __name__ == "__main__":
+    from ir import format_instr, parse_ir
+
+    ir_code_example = [
+        "FUNC main:",
+        "ASSIGN senha, \"123\"",
+        "BIN_OP t1, \"SELECT * FROM t WHERE id = \", +, id",
+        "BIN_OP t2, senha, ==, \"x\"",
+        "PRINT t2",
+        "PRINT senha",
+        "RETURN t1",
+        "END_FUNC main",
+    ]
+    for instr, sensitive, injected in tainted_sinks(parse_ir(ir_code_example)):
+        print(format_instr(instr), [str(name) for name in sensitive], [str(name) for name in injected])
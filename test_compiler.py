@@ -1,6 +1,42 @@
+import ast as pyast
+import importlib
+import importlib.util
 import unittest
 import subprocess
 import os
+import shutil
+import socket
+import sys
+import io
+import tempfile
+import threading
+import time
+import traceback
+from unittest import mock
+
+from lexer import Lexer, StreamingLexer, TOKEN_KINDS, TOKEN_TYPES, relex
+from parser import ASTNode, Parser
+from ast_nodes import NODE_KINDS, Identifier, VariableDeclaration, dispatch_table
+from semantic_analyzer import SemanticAnalyzer, Symbol, SymbolTable
+from sast_analyzer import SASTAnalyzer
+from ir_generator import IRGenerator
+from ir import END_FUNC, FUNC, PRINT, Const, Instr, Temp, Var, format_ir, parse_ir
+from optimizer import Optimizer
+from cfg import Dominators, Liveness, build_cfg
+from ssa import construct_ssa, destruct_ssa
+from loops import find_loops
+from code_generator import CodeGenerator
+from ast_code_generator import ASTCodeGenerator
+from front_end import FusedFrontEnd
+from main import compile_cached, compile_charmeleon, compile_code
+from compile_cache import CompileCache
+from batch import compile_batch, expand_inputs, merge_sast_reports
+from bytecode import cache_path, pyc_code, write_pyc
+from import_hook import install, uninstall
+from incremental import IncrementalCompiler, source_edit
+from diagnostics import CompileError, Diagnostics, source_location
+from compile_server import CompileServer
+from compile_client import CompileClient
 
 class TestCompilerEndToEnd(unittest.TestCase):
 
@@ -92,6 +128,1075 @@ class TestCompilerEndToEnd(unittest.TestCase):
         # Verificamos o IR otimizado no stderr
         self.assertNotIn("ASSIGN y, 20", compiler_result.stderr)
 
+class TestLexer(unittest.TestCase):
+
+    def test_token_stream_matches_legacy_lexer(self):
+        source_code = """
+        func main() {
+            var x: int = 10; // comentario
+            /* bloco */ var s = 'a\\'b' + "c\\"d";
+            if (x >= 5 && x != 3 || x -> 2) { print(x % 2); }
+            var ifx = 1if; var y = 2.5; x = x++ - --x;
+        }
+        """
+        self.assertEqual(Lexer(source_code).tokenize(), Lexer(source_code).tokenize_legacy())
+
+    def test_keywords_split_from_identifiers(self):
+        tokens = Lexer("func funcs if_ else").tokenize()
+        self.assertEqual([t["type"] for t in tokens], ["KEYWORD", "IDENTIFIER", "IDENTIFIER", "KEYWORD"])
+
+    def test_unexpected_character(self):
+        with self.assertRaises(Exception):
+            Lexer("var x = @;").tokenize()
+
+    def test_token_stream_compat_view(self):
+        source_code = "func main() { var x = 10; print(x + 2.5); }"
+        stream = Lexer(source_code).tokenize_stream()
+        self.assertEqual(list(stream), Lexer(source_code).tokenize())
+        self.assertEqual(stream[1], {"type": "IDENTIFIER", "value": "main"})
+        self.assertEqual(stream.value(len(stream) - 1), "}")
+
+    def test_parser_accepts_stream_and_dicts(self):
+        source_code = "func main() { var x = 10; if (x > 5) { print(x); } }"
+        from_stream = Parser(Lexer(source_code).tokenize_stream()).parse()
+        from_dicts = Parser(Lexer(source_code).tokenize()).parse()
+        self.assertEqual(repr(from_stream), repr(from_dicts))
+
+    def test_streaming_lexer_across_chunk_boundaries(self):
+        source_code = """func main() { var s = 'a\\'b' + "c\\"d"; // fim
+        x = a /* c */ * b; y = a /* aberto
+        var ifx = 1if; var z = 2.5; print('p' + 'q'); }"""
+        expected = [(d["type"], d["value"]) for d in Lexer(source_code).tokenize()]
+        for size in range(1, 24):
+            chunks = [source_code[i:i + size] for i in range(0, len(source_code), size)]
+            got = [(TOKEN_TYPES[kind], value) for kind, value in StreamingLexer(chunks)]
+            self.assertEqual(got, expected, f"chunks de {size} caracteres")
+
+    def test_streaming_lexer_does_not_stall_on_bad_characters(self):
+        # An unexpected character early in the input is reported right away;
+        # only a token that more input could complete is held back.
+        read = []
+        def chunks():
+            yield '@ x = "a'
+            for i in range(1000):
+                read.append(i)
+                yield 'b" + y; '
+        diagnostics = Diagnostics(lambda offset: (1, offset + 1))
+        tokens = iter(StreamingLexer(chunks(), diagnostics=diagnostics))
+        self.assertEqual([next(tokens) for _ in range(3)][1:], [(TOKEN_KINDS["ASSIGN"], "="), (TOKEN_KINDS["STRING"], '"ab"')])
+        self.assertEqual([str(d) for d in diagnostics], ["linha 1, coluna 1: Caractere inesperado: @"])
+        self.assertEqual(len(read), 1)
+        read.clear()
+        with self.assertRaises(Exception) as error:
+            list(StreamingLexer(chunks()))
+        self.assertEqual(str(error.exception), "Caractere inesperado: @")
+        self.assertEqual(read, [])
+
+    def test_streaming_lexer_releases_single_quoted_strings(self):
+        # A single-quoted string ends at its own closing quote, so it comes
+        # out without waiting for the rest of the input.
+        read = []
+        def chunks():
+            for i in range(1000):
+                read.append(i)
+                yield "print('a'); "
+        tokens = iter(StreamingLexer(chunks()))
+        self.assertEqual([next(tokens) for _ in range(4)][2:], [(TOKEN_KINDS["STRING"], "'a'"), (TOKEN_KINDS["DELIMITER"], ")")])
+        self.assertLessEqual(len(read), 2)
+        self.assertEqual([value for _, value in StreamingLexer(["var s = 'a", "\\'b' + 'c'", ";"])],
+                         ["var", "s", "=", "'a\\'b'", "+", "'c'", ";"])
+
+    def test_parser_from_streaming_lexer(self):
+        source_code = "func main() { var x = 10; while (x > 0) { x = x - 1; } }"
+        expected = repr(Parser(Lexer(source_code).tokenize_stream()).parse())
+        self.assertEqual(repr(Parser(StreamingLexer(io.StringIO(source_code), chunk_size=3)).parse()), expected)
+
+    def _assert_relexed(self, tokens, source_code):
+        expected = Lexer(source_code).tokenize_stream()
+        self.assertEqual(tokens.source, source_code)
+        self.assertEqual((tokens.kinds, tokens.starts, tokens.ends), (expected.kinds, expected.starts, expected.ends))
+
+    def test_relex_matches_full_lex(self):
+        source_code = "func main() {\n    var s = 'a' + 'b'; print(\"x\");\n    y = a / b * c; // fim\n}\n"
+        edits = [
+            ("print", 0, "if (x) { print"),  # grows the token list
+            ("'; if", 0, "\\'c"),            # 'b' now runs past an escaped quote
+            ("/ b", 1, "/*"),                 # no "*/" on the line: two operators...
+            ("* c", 1, "*/ *"),               # ...until one is typed after them
+            ("// fim", 6, ""),
+        ]
+        tokens = Lexer(source_code).tokenize_stream()
+        for anchor, deleted, inserted in edits:
+            offset = tokens.source.index(anchor)
+            source_code = tokens.source[:offset] + inserted + tokens.source[offset + deleted:]
+            relex(tokens, offset, deleted, inserted)
+            self._assert_relexed(tokens, source_code)
+        with self.assertRaises(Exception):
+            relex(tokens, 0, 0, "@")
+        self.assertEqual(tokens.source, source_code)
+
+    def test_relex_touches_only_the_damaged_tokens(self):
+        lines = [f"var v{i} = a * {i};" for i in range(200)]
+        tokens = Lexer("\n".join(lines)).tokenize_stream()
+        offset = tokens.source.index("v100 =") + 1
+        # Typing at one spot leaves a pending shift that later edits move.
+        for k, inserted in enumerate("abc"):
+            self.assertEqual(relex(tokens, offset + k, 0, inserted), (701, 702, 702))
+        self.assertEqual(relex(tokens, 4, 2, ""), (1, 2, 1))
+        lines[0] = "var  = a * 0;"
+        lines[100] = "var vabc100 = a * 100;"
+        self._assert_relexed(tokens, "\n".join(lines))
+
+class TestAST(unittest.TestCase):
+
+    def test_typed_nodes_have_no_instance_dict(self):
+        ast = Parser(Lexer("func main() { var x: int = 1 + 2; }").tokenize_stream()).parse()
+        declaration = ast.children[0].body.children[0]
+        self.assertIsInstance(declaration, VariableDeclaration)
+        self.assertEqual(declaration.metadata, {"type": "int"})
+        self.assertEqual(declaration.expr.kind, NODE_KINDS["BinaryExpression"])
+        self.assertFalse(hasattr(declaration.expr.left, "__dict__"))
+
+    def test_dispatch_table_by_kind(self):
+        class Visitor:
+            def generic_visit(self, node):
+                return "generic"
+
+            def visit_Identifier(self, node):
+                return "identifier"
+
+        table = dispatch_table(Visitor)
+        self.assertIs(table, dispatch_table(Visitor))
+        self.assertEqual(table[Identifier.kind](Visitor(), Identifier("x")), "identifier")
+        self.assertEqual(table[ASTNode("Unknown").kind](Visitor(), None), "generic")
+
+class TestExpressionParser(unittest.TestCase):
+
+    def _expression(self, source_code):
+        ast = Parser(Lexer(f"func main() {{ x = {source_code}; }}").tokenize_stream()).parse()
+        return ast.children[0].body.children[0].expr
+
+    def test_logical_and_modulo_precedence(self):
+        node = self._expression("a || b && c % 2 > 1")
+        self.assertEqual(node.value, "||")
+        self.assertEqual(node.right.value, "&&")
+        self.assertEqual(node.right.right.value, ">")
+        self.assertEqual(node.right.right.left.value, "%")
+
+    def test_left_associativity_and_parentheses(self):
+        node = self._expression("a - (b - c) - d")
+        self.assertEqual((node.value, node.right.value), ("-", "d"))
+        self.assertEqual(node.left.right.value, "-")
+        self.assertEqual(node.left.right.left.value, "b")
+
+    def test_very_long_and_deeply_nested_expressions(self):
+        node = self._expression(" + ".join(["1"] * 100000))
+        self.assertEqual(node.right.value, "1")
+        node = self._expression("(" * 100000 + "a" + ")" * 100000)
+        self.assertEqual(node.value, "a")
+
+class TestWalkers(unittest.TestCase):
+
+    SOURCE = """
+func main(a: int) {
+    var name = "x";
+    var s = "id=" + name;
+    if (a > 1) { print(s); } else if (a < 0) { print("neg"); } else { a = a + 1; }
+    while (a < 10) { a = a * 2; }
+    return a;
+}
+"""
+
+    def _parse(self, source_code):
+        return Parser(Lexer(source_code).tokenize_stream()).parse()
+
+    def test_explicit_stack_matches_recursive_walk(self):
+        ast = self._parse(self.SOURCE)
+        recursive, iterative = IRGenerator(), IRGenerator()
+        iterative.RECURSION_BUDGET = 0
+        self.assertEqual(recursive.generate(ast), iterative.generate(ast))
+        ast = self._parse('func main(nome: string, senha: string) { var q = "id=" + nome; '
+                          'if (1 > 0) { print(senha); } return q; }')
+        recursive, iterative = SASTAnalyzer(), SASTAnalyzer()
+        iterative.RECURSION_BUDGET = 0
+        self.assertEqual([v["type"] for v in iterative.analyze(ast)], ["SensitiveDataExposure", "PotentialInjection"])
+        self.assertEqual(iterative.analyze(ast), recursive.analyze(ast))
+
+    def test_deeply_nested_tree(self):
+        depth = 50000
+        ast = self._parse("func main() { " + "if (1 > 0) { print(1); } else " * depth + "{ print(2); } }")
+        SemanticAnalyzer().analyze(ast)
+        self.assertEqual(len(SASTAnalyzer().analyze(ast)), 0)
+        ir = IRGenerator().generate(ast)
+        self.assertEqual(sum(1 for instr in ir if instr.op == PRINT), depth + 1)
+        ast = self._parse("func main() { var x = " + " + ".join(["1"] * depth) + "; }")
+        SemanticAnalyzer().analyze(ast)
+        self.assertEqual(str(IRGenerator().generate(ast)[-2]), f"ASSIGN x, t{depth - 1}")
+
+class TestFusedFrontEnd(unittest.TestCase):
+
+    def _both(self, source_code):
+        results = []
+        for fused in (False, True):
+            try:
+                results.append(compile_charmeleon(source_code, fused=fused))
+            except Exception as e:
+                results.append(str(e))
+        return results
+
+    def test_matches_three_pass_output(self):
+        three_pass, fused = self._both(TestWalkers.SOURCE)
+        self.assertEqual(three_pass, fused)
+        ast = Parser(Lexer(TestWalkers.SOURCE).tokenize_stream()).parse()
+        vulnerabilities, ir_code = FusedFrontEnd().run(ast)
+        self.assertEqual(ir_code, IRGenerator().generate(ast))
+        self.assertEqual([v["node"] for v in vulnerabilities], [v["node"] for v in SASTAnalyzer().analyze(ast)])
+
+    def test_for_update_checked_before_body(self):
+        # The update is type checked (and SAST scanned) ahead of the body, as in
+        # the separate passes, even though its IR comes after the body.
+        three_pass, fused = self._both('func main(s: string) { for (var i = 0; i < 3; s = s + "x") { print(s); } }')
+        self.assertEqual(three_pass, fused)
+        self.assertIn("PotentialInjection", fused[0])
+        three_pass, fused = self._both("func main() { for (var i = 0; i < 3; i = i + y) { var y = 2; } }")
+        self.assertEqual(fused, "linha 1, coluna 46: Erro semântico: Variável 'y' não declarada.")
+        self.assertEqual(three_pass, fused)
+
+    def test_for_update_ir_follows_body(self):
+        source = ("func main(n: int) { for (var i = 0; i < n; i = i * 2 + 1) { "
+                  "for (var j = i; j > 0; j = j - i * 2) { print(i + j); } print(i * 3); } }")
+        ast = Parser(Lexer(source).tokenize_stream()).parse()
+        vulnerabilities, ir_code = FusedFrontEnd().run(ast)
+        self.assertEqual(ir_code, IRGenerator().generate(ast))
+        self.assertEqual(sum(line.startswith("BIN_OP") for line in format_ir(ir_code)), 8)
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_shadowing_is_undone_on_scope_exit(self):
+        table = SymbolTable()
+        table.enter_scope()
+        table.add_symbol("x", "int", kind="variable")
+        table.enter_scope()
+        self.assertEqual(table.get_symbol("x").depth, 0)
+        inner = table.add_symbol("x", "string", kind="variable")
+        table.add_symbol("y", "bool", kind="variable")
+        self.assertIs(table.get_symbol("x"), inner)
+        with self.assertRaises(Exception) as error:
+            table.add_symbol("y", "int")
+        self.assertIn("'y' já declarado", str(error.exception))
+        table.exit_scope()
+        self.assertEqual(table.get_symbol("x").type, "int")
+        self.assertIsNone(table.get_symbol("y"))
+        with self.assertRaises(AttributeError):
+            inner.type = "int"
+
+    def test_deep_nesting_resolves_innermost_binding(self):
+        depth = 150
+        source = "func main() { var x = 1; " + "if (1 > 0) { var x = 2.5; " * depth + "print(x + 1.0);" + " }" * depth + " }"
+        SemanticAnalyzer().analyze(Parser(Lexer(source).tokenize_stream()).parse())
+        with self.assertRaises(Exception) as error:
+            SemanticAnalyzer().analyze(Parser(Lexer(source.replace("1.0", '"a"')).tokenize_stream()).parse())
+        self.assertIn("entre float e string", str(error.exception))
+
+    def test_identifiers_are_interned(self):
+        source = "func main() { var nome_longo_1 = 1; print(nome_longo_1); }"
+        block = Parser(Lexer(source).tokenize_stream()).parse().children[0].body
+        declaration, statement = block.children
+        self.assertIs(declaration.value, statement.expr.value)
+        streamed = Parser(StreamingLexer(source)).parse().children[0].body.children[0]
+        self.assertIs(streamed.value, declaration.value)
+
+class TestIR(unittest.TestCase):
+
+    def test_text_round_trip(self):
+        ast = Parser(Lexer(TestWalkers.SOURCE).tokenize_stream()).parse()
+        ir_code = IRGenerator().generate(ast)
+        text = format_ir(ir_code)
+        self.assertIn("BIN_OP t1, \"id=\", +, name", text)
+        self.assertIn("IF_FALSE t2 GOTO L1", text)
+        self.assertEqual(parse_ir(text), ir_code)
+
+    def test_operands_are_typed(self):
+        instr = parse_ir(["BIN_OP t3, a, +, 10"])[0]
+        self.assertEqual(instr.dest, Temp(3))
+        self.assertEqual(instr.args, (Var("a"), Const("10")))
+        self.assertNotEqual(Var("t3"), Temp(3))
+
+    def test_variable_named_like_a_temp_is_not_dropped(self):
+        ast = Parser(Lexer("func main() { var t1 = 5; var t2 = t1 + 1; print(t2); }").tokenize_stream()).parse()
+        optimized = Optimizer(IRGenerator().generate(ast)).eliminate_dead_code()
+        self.assertIn("ASSIGN t2, t1", format_ir(optimized))
+        self.assertIn("t2 = t1 + 1", CodeGenerator(optimized).gen())
+
+class TestCompileCache(unittest.TestCase):
+
+    SOURCE = "func main() { var x = 10; print(x); }"
+
+    def test_hit_skips_compilation(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CompileCache(cache_dir)
+            first = compile_cached(self.SOURCE, cache, keep_ir=True)
+            self.assertEqual(first[:2], compile_charmeleon(self.SOURCE))
+            self.assertIn("ASSIGN x, 10", first[2])
+            with mock.patch("main._compile") as compile_mock:
+                self.assertEqual(compile_cached(self.SOURCE, cache, keep_ir=True), first)
+                compile_mock.assert_not_called()
+            self.assertEqual([name for name in os.listdir(cache_dir) if not name.endswith(".json")], [])
+
+    def test_key_covers_source_and_options(self):
+        cache = CompileCache()
+        key = cache.key(self.SOURCE, {"fused": True})
+        self.assertEqual(key, cache.key(self.SOURCE, {"fused": True}))
+        self.assertNotEqual(key, cache.key(self.SOURCE + " ", {"fused": True}))
+        self.assertNotEqual(key, cache.key(self.SOURCE, {"fused": False}))
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CompileCache(cache_dir, max_bytes=250)
+            cache.put("a", {"python": "x" * 100})
+            cache.put("b", {"python": "y" * 100})
+            os.utime(os.path.join(cache_dir, "a.json"), (time.time() - 60, time.time() - 60))
+            self.assertIsNotNone(cache.get("a")) # hit refreshes "a"
+            os.utime(os.path.join(cache_dir, "b.json"), (time.time() - 30, time.time() - 30))
+            cache.put("c", {"python": "z" * 100})
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("c"))
+
+    def test_eviction_removes_abandoned_temp_files(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CompileCache(cache_dir, max_bytes=1000)
+            abandoned, fresh = os.path.join(cache_dir, "abandonado.tmp"), os.path.join(cache_dir, "escrevendo.tmp")
+            for path in (abandoned, fresh):
+                with open(path, "w") as f:
+                    f.write("x" * 800)
+            os.utime(abandoned, (time.time() - 3600, time.time() - 3600))
+            cache.put("a", {"python": "y" * 100})
+            os.utime(os.path.join(cache_dir, "a.json"), (time.time() - 60, time.time() - 60))
+            cache.put("b", {"python": "z" * 100})
+            cache.evict()
+            self.assertFalse(os.path.exists(abandoned))
+            self.assertTrue(os.path.exists(fresh))
+            # A write still in progress counts towards the cap.
+            self.assertIsNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("b"))
+
+class TestBatch(unittest.TestCase):
+
+    def _project(self, root):
+        os.makedirs(os.path.join(root, "sub"))
+        paths = []
+        for i, body in enumerate(['var senha = 1; print(senha);', 'var entrada = "a"; print("b" + entrada);', 'z = 1;', 'print(2);']):
+            path = os.path.join(root, "sub" if i % 2 else "", f"m{i}.charmeleon")
+            with open(path, "w") as f:
+                f.write(f"func main() {{ {body} }}")
+            paths.append(path)
+        return paths
+
+    def test_expand_inputs(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = self._project(root)
+            self.assertEqual(expand_inputs([root]), sorted(paths))
+            self.assertEqual(expand_inputs([os.path.join(root, "*.charmeleon"), paths[0]]), [paths[0], paths[2]])
+            self.assertEqual(expand_inputs([os.path.join(root, "**", "m1.charmeleon")]), [paths[1]])
+
+    def test_parallel_batch_is_ordered_and_merged(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = sorted(self._project(root))
+            results = compile_batch(paths, workers=2, chunksize=1)
+            self.assertEqual([r[0] for r in results], paths)
+            self.assertEqual([r[2] for r in results], [None, "linha 1, coluna 15: Erro semântico: Variável 'z' não declarada.", None, None])
+            with open(paths[0].replace(".charmeleon", ".py")) as f:
+                self.assertEqual(f.read(), compile_charmeleon(open(paths[0]).read())[1])
+            report, findings = merge_sast_reports(results)
+            self.assertEqual(findings, 2)
+            self.assertLess(report.index(paths[0]), report.index(paths[2]))
+            self.assertNotIn(paths[1], report)
+            serial = compile_batch(paths, workers=1)
+            self.assertEqual([r[:3] for r in serial], [r[:3] for r in results])
+
+    def test_batch_emits_pyc(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = self._project(root)[0]
+            compile_batch([path], emit_pyc=True)
+            py_file = path.replace(".charmeleon", ".py")
+            with open(py_file, "rb") as f:
+                source_bytes = f.read()
+            with open(importlib.util.cache_from_source(py_file), "rb") as f:
+                data = f.read()
+            namespace = {}
+            exec(pyc_code(data, source_bytes), namespace)
+            with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                namespace["main"]()
+            self.assertEqual(stdout.getvalue(), "1\n")
+            # A .py edited after the .pyc was written makes it stale.
+            self.assertIsNone(pyc_code(data, source_bytes + b"\n"))
+            self.assertIsNone(pyc_code(data[:8], source_bytes))
+
+    def test_batch_emits_ir(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = sorted(self._project(root))
+            for cache_dir in (None, os.path.join(root, "cache")):
+                results = compile_batch(paths, workers=1, cache_dir=cache_dir, emit_ir=True)
+                self.assertEqual([r[2] is None for r in results], [True, False, True, True])
+                with open(paths[0].replace(".charmeleon", ".ir")) as f:
+                    self.assertEqual(f.read(), "FUNC main:\nASSIGN senha, 1\nPRINT senha\nEND_FUNC main\n")
+                self.assertFalse(os.path.exists(paths[1].replace(".charmeleon", ".ir")))
+                os.unlink(paths[0].replace(".charmeleon", ".ir"))
+
+    def test_pyc_is_used_by_import(self):
+        with tempfile.TemporaryDirectory() as root:
+            py_file = os.path.join(root, "gerado.py")
+            python_code = compile_charmeleon("func main() { print(3); }")[1]
+            with open(py_file, "w", encoding="utf-8") as f:
+                f.write(python_code)
+            pyc_file = write_pyc(py_file, python_code)
+            with open(pyc_file, "rb") as f:
+                before = f.read()
+            spec = importlib.util.spec_from_file_location("gerado", py_file)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.assertEqual(module.__cached__, pyc_file)
+            with open(pyc_file, "rb") as f:
+                self.assertEqual(f.read(), before)
+
+class TestCompileServer(unittest.TestCase):
+
+    def test_compile_over_socket(self):
+        with tempfile.TemporaryDirectory() as root:
+            socket_path = os.path.join(root, "compile.sock")
+            server = CompileServer(socket_path, cache_dir=None)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                source_code = TestCompileCache.SOURCE
+                expected = compile_charmeleon(source_code)
+                results = []
+
+                def client_session():
+                    with CompileClient(socket_path, timeout=10) as client:
+                        for _ in range(5):
+                            results.append(client.compile(source_code)[:2])
+
+                clients = [threading.Thread(target=client_session) for _ in range(4)]
+                for t in clients:
+                    t.start()
+                for t in clients:
+                    t.join()
+                self.assertEqual(results, [expected] * 20)
+                with CompileClient(socket_path, timeout=10) as client:
+                    self.assertIn("ASSIGN x, 10", client.compile(source_code, emit_ir=True)[2])
+                    with self.assertRaisesRegex(Exception, "Variável 'z' não declarada"):
+                        client.compile("func main() { z = 1; }")
+                    self.assertEqual(client.request({"op": "shutdown"}), {"ok": True})
+                thread.join(10)
+                self.assertFalse(thread.is_alive())
+            finally:
+                server.shutdown()
+                server.server_close()
+            self.assertFalse(os.path.exists(socket_path))
+
+    def test_client_side_does_not_load_the_compiler(self):
+        snippet = "import sys, main, compile_client; print(sorted({'lexer', 'optimizer', 'cfg', 'ssa'} & set(sys.modules)))"
+        out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), "[]")
+
+    def test_serve_path_must_be_a_stale_socket(self):
+        with tempfile.TemporaryDirectory() as root:
+            socket_path = os.path.join(root, "compile.sock")
+            with open(socket_path, "w") as f:
+                f.write("conteúdo")
+            with self.assertRaisesRegex(Exception, "não é um socket"):
+                CompileServer(socket_path, cache_dir=None)
+            with open(socket_path) as f:
+                self.assertEqual(f.read(), "conteúdo")
+            os.unlink(socket_path)
+
+            server = CompileServer(socket_path, cache_dir=None)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with self.assertRaisesRegex(Exception, "já há um servidor"):
+                    CompileServer(socket_path, cache_dir=None)
+            finally:
+                server.shutdown()
+                thread.join(10)
+                server.server_close()
+
+            # A socket nobody listens on is left over from a previous run
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(socket_path)
+            stale.close()
+            CompileServer(socket_path, cache_dir=None).server_close()
+            self.assertFalse(os.path.exists(socket_path))
+
+class TestDeadCodeElimination(unittest.TestCase):
+
+    def _ir(self, body):
+        ast = Parser(Lexer(f"func main(a: int) {{ {body} }}").tokenize_stream()).parse()
+        return IRGenerator().generate(ast)
+
+    def _optimize(self, body):
+        optimizer = Optimizer(self._ir(body))
+        return format_ir(optimizer.eliminate_dead_code()), optimizer
+
+    def test_cfg_blocks_and_edges(self):
+        ir_code = self._ir("if (a > 1) { print(1); } else { print(2); } print(3);")
+        cfg = build_cfg(ir_code[1:-1])
+        self.assertEqual([sorted(s.index for s in b.succs) for b in cfg.blocks], [[1, 2], [3], [3], []])
+        self.assertEqual([[p.index for p in b.preds] for b in cfg.blocks], [[], [0], [0], [1, 2]])
+        liveness = Liveness(cfg)
+        self.assertEqual(liveness.live_names(liveness.live_in[0]), {Var("a")})
+
+    def test_dead_variable_assignments_removed(self):
+        ir_text, optimizer = self._optimize("var x = 10; var y = a * 20; print(x);")
+        self.assertIn("ASSIGN x, 10", ir_text)
+        self.assertFalse([line for line in ir_text if "y" in line or "20" in line])
+        self.assertEqual(optimizer.removed, 2)
+
+    def test_liveness_across_loops_and_blocks(self):
+        ir_text, _ = self._optimize("var i = 0; var s = a; while (i < 3) { var d = i * 2; s = s + i; i = i + 1; } print(s);")
+        self.assertIn("ASSIGN i, 0", ir_text)
+        self.assertIn("ASSIGN s, t3", ir_text)
+        self.assertFalse([line for line in ir_text if line.startswith("ASSIGN d")])
+        # Only dead once the use in a later block is gone.
+        ir_text, optimizer = self._optimize("var b = a + 1; if (a > 0) { var c = b; }")
+        self.assertEqual([line for line in ir_text if line.startswith(("ASSIGN", "BIN_OP"))], ["BIN_OP t2, a, >, 0"])
+        self.assertEqual(optimizer.removed, 3)
+
+    def test_dead_chain_across_blocks_removed_with_one_liveness_solve(self):
+        body = "var d0 = a; " + " ".join(f"var d{i} = d{i - 1} + 1; if (a > {i}) {{ print(a); }}" for i in range(1, 50))
+        with mock.patch("optimizer.Liveness", wraps=Liveness) as liveness:
+            ir_text, optimizer = self._optimize(body + " var x = a; x = x + 1; print(x); x = x * 2;")
+        self.assertEqual(liveness.call_count, 1)
+        self.assertEqual(optimizer.removed, 1 + 2 * 49 + 2)
+        self.assertFalse([line for line in ir_text if "d" in line.split(",")[0]])
+        self.assertEqual(ir_text[-5:-1], ["ASSIGN x, a", "BIN_OP t99, x, +, 1", "ASSIGN x, t99", "PRINT x"])
+
+    def test_emptied_blocks_still_compile(self):
+        _, python_code = compile_charmeleon("func main(a: int) { if (a > 0) { var c = 1; } else { var d = 2; } print(a); }")
+        self.assertIn("if a > 0:\n        pass\n", python_code)
+        self.assertNotIn("else:", python_code)
+        compile(python_code, "<charmeleon>", "exec")
+
+class TestConstantPropagation(unittest.TestCase):
+
+    def _optimize(self, body):
+        ast = Parser(Lexer(f"func main(a: int) {{ {body} }}").tokenize_stream()).parse()
+        optimizer = Optimizer(IRGenerator().generate(ast))
+        return format_ir(optimizer.optimize(2)), optimizer
+
+    def test_folds_and_propagates_through_assignments(self):
+        ir_text, optimizer = self._optimize("var t = 60 * 60; var ms = t * 1000; var half = 7 / 2; print(ms + half); print(a + t);")
+        self.assertEqual(ir_text[1:-1], ["PRINT 3600003.5", "BIN_OP t5, a, +, 3600", "PRINT t5"])
+        self.assertEqual(optimizer.folded, 4)
+        # Division by zero is left for run time.
+        ir_text, _ = self._optimize("var z = 0; print(1 / z);")
+        self.assertIn("BIN_OP t1, 1, /, 0", ir_text)
+
+    def test_negative_literals_fold_again(self):
+        # Folding writes negative results back as literals ("-3"); passes that
+        # read the IR again still see numbers in them.
+        optimizer = Optimizer(parse_ir(["FUNC main:", "ASSIGN x, -3", "BIN_OP t1, x, *, 2", "PRINT t1", "END_FUNC main"]))
+        self.assertEqual(format_ir(optimizer.optimize(2))[1:-1], ["PRINT -6"])
+        _, python_code = compile_charmeleon("func main() { var i = 0 - 5; while (i < 5) { print(i); i = i + 2; } }", opt_level=2)
+        self.assertIn("for i in range(-5, 5, 2):", python_code)
+
+    def test_huge_integers_are_not_folded(self):
+        # Repeated squaring stops folding once the value grows too large.
+        _, python_code = compile_charmeleon("func main() { var x = 3; " + "x = x * x; " * 10 + "print(x); }", opt_level=2)
+        square = 3 ** 2 ** 7
+        self.assertIn(f"{square} * {square}", python_code)
+        namespace = {}
+        exec(python_code, namespace)
+        output = io.StringIO()
+        with mock.patch("sys.stdout", output):
+            namespace["main"]()
+        self.assertEqual(int(output.getvalue()), 3 ** 2 ** 10)
+
+    def test_prunes_known_branches(self):
+        ir_text, optimizer = self._optimize('var debug = 0; if (debug > 0) { print("on"); } else { print("off"); } print(a);')
+        self.assertEqual(ir_text[1:-1], ['PRINT "off"', "PRINT a"])
+        self.assertGreater(optimizer.pruned, 0)
+        # Only the path actually taken feeds the merge point.
+        ir_text, _ = self._optimize("var x = 1; if (x < 2) { x = 5; } print(x);")
+        self.assertEqual(ir_text[1:-1], ["PRINT 5"])
+        ir_text, _ = self._optimize("var x = 1; if (a < 2) { x = 5; } print(x);")
+        self.assertIn("PRINT x", ir_text)
+
+    def test_loops_keep_their_shape(self):
+        ir_text, _ = self._optimize("var i = 0; var step = 2; while (i < 10) { i = i + step; } print(i);")
+        self.assertIn("BIN_OP t2, i, +, 2", ir_text)
+        self.assertIn("PRINT i", ir_text)
+        _, python_code = compile_charmeleon("func main() { var n = 1; while (n > 0) { print(n); } }", opt_level=2)
+        self.assertIn("while True:\n        print(1)", python_code)
+        _, python_code = compile_charmeleon("func main() { var on = 0; while (on > 0) { print(on); } print(2); }", opt_level=2)
+        self.assertEqual(python_code, "def main():\n    print(2)\n")
+        # The default level leaves constants alone.
+        _, python_code = compile_charmeleon("func main() { var x = 10; if (x > 5) { print(x); } }")
+        self.assertIn("if x > 5:", python_code)
+
+class TestRedundancyElimination(unittest.TestCase):
+
+    def _optimize(self, body):
+        ast = Parser(Lexer(f"func main(a: int, b: int) {{ {body} }}").tokenize_stream()).parse()
+        optimizer = Optimizer(IRGenerator().generate(ast))
+        return format_ir(optimizer.optimize(2)), optimizer
+
+    def test_repeated_expressions_computed_once(self):
+        ir_text, optimizer = self._optimize("var c = a * b + b * a; print(c);")
+        self.assertEqual(ir_text[1:-1], ["BIN_OP t1, a, *, b", "BIN_OP t3, t1, +, t1", "PRINT t3"])
+        self.assertEqual(optimizer.numbered, 1)
+        # `+` may concatenate strings, so its operands are never swapped.
+        ir_text, _ = self._optimize("print(a + b); print(b + a);")
+        self.assertEqual(len([line for line in ir_text if line.startswith("BIN_OP")]), 2)
+        # A reassigned operand invalidates the earlier result.
+        ir_text, _ = self._optimize("var x = a * b; a = 1; var y = a * b; print(x + y);")
+        self.assertEqual(len([line for line in ir_text if line.startswith("BIN_OP")]), 3)
+
+    def test_copies_propagated_across_blocks(self):
+        ir_text, optimizer = self._optimize("var c = a; var d = c; if (b > 0) { print(d); } else { print(c); }")
+        self.assertIn("PRINT a", ir_text)
+        self.assertFalse([line for line in ir_text if line.startswith("ASSIGN")])
+        self.assertEqual(optimizer.copies_removed, 2)
+        # Not available after a merge where one path redefined the source.
+        ir_text, _ = self._optimize("var c = a; if (b > 0) { a = 2; } print(c);")
+        self.assertIn("PRINT c", ir_text)
+
+    def test_reused_temporaries_generate_valid_python(self):
+        source = "func main() { var a = 3; var i = 0; while (i < 2) { var c = a * i; var d = a * i; print(c + d); i = i + 1; } }"
+        _, python_code = compile_charmeleon(source, opt_level=2)
+        namespace = {}
+        exec(python_code, namespace)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            namespace["main"]()
+        self.assertEqual(stdout.getvalue(), "0\n6\n")
+
+class TestLoopInvariantCodeMotion(unittest.TestCase):
+
+    def _ir(self, body):
+        ast = Parser(Lexer(f"func main(a: int, b: int) {{ {body} }}").tokenize_stream()).parse()
+        return IRGenerator().generate(ast)
+
+    def _hoist(self, body):
+        optimizer = Optimizer(self._ir(body))
+        return format_ir(optimizer.hoist_loop_invariants()), optimizer
+
+    def test_dominators_and_natural_loops(self):
+        ir_code = self._ir("var i = 0; while (i < a) { var j = 0; while (j < b) { j = j + 1; } i = i + 1; } print(i);")
+        cfg = build_cfg(ir_code[1:-1])
+        dominators = Dominators(cfg)
+        self.assertEqual(dominators.idom, [0, 0, 1, 2, 3, 3, 1])
+        self.assertTrue(dominators.dominates(1, 5))
+        self.assertFalse(dominators.dominates(3, 6))
+        loops = find_loops(cfg, dominators)
+        self.assertEqual([(loop.header, sorted(loop.blocks), sorted(loop.exits)) for loop in loops],
+                         [(1, [1, 2, 3, 4, 5], [6]), (3, [3, 4], [5])])
+
+    def test_invariants_hoisted_before_header(self):
+        ir_text, optimizer = self._hoist("var i = 0; while (i < 10) { var w = a * 2 + b; print(w + i); i = i + 1; }")
+        header = ir_text.index("L1:")
+        self.assertEqual(ir_text[header - 2:header], ["BIN_OP t2, a, *, 2", "BIN_OP t3, t2, +, b"])
+        self.assertIn("BIN_OP t4, w, +, i", ir_text[header:])
+        self.assertEqual(optimizer.hoisted, 2)
+        # Division may raise, so it only leaves the loop from the header.
+        ir_text, optimizer = self._hoist("var i = 0; while (i < 10) { print(a / b); i = i + 1; }")
+        self.assertEqual(optimizer.hoisted, 0)
+
+    def test_variant_operands_stay_in_loop(self):
+        _, optimizer = self._hoist("var i = 0; var s = a; while (i < 10) { s = s * b; i = i + 1; } print(s);")
+        self.assertEqual(optimizer.hoisted, 0)
+        _, optimizer = self._hoist("var i = 0; while (i < 10) { var j = 0; while (j < a) { print(i * b); j = j + 1; } i = i + 1; }")
+        self.assertEqual(optimizer.hoisted, 1)
+
+    def test_loop_still_generated_as_while(self):
+        source = ("func main() { var n = 0; while (n < 5) { n = n + 2; } var i = 0; "
+                  "while (i < n * 3) { print(i + n * 4); i = i + n; } }")
+        _, python_code = compile_charmeleon(source, opt_level=2)
+        self.assertIn("while i < t", python_code)
+        namespace = {}
+        exec(python_code, namespace)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            namespace["main"]()
+        self.assertEqual(stdout.getvalue(), "24\n30\n36\n")
+
+class TestInductionVariables(unittest.TestCase):
+
+    def _optimize(self, body):
+        ast = Parser(Lexer(f"func main() {{ {body} }}").tokenize_stream()).parse()
+        optimizer = Optimizer(IRGenerator().generate(ast))
+        return format_ir(optimizer.optimize(2)), optimizer
+
+    def _run(self, python_code):
+        namespace = {}
+        exec(python_code, namespace)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            namespace["main"]()
+        return stdout.getvalue()
+
+    def test_counted_loops_become_range(self):
+        ir_text, optimizer = self._optimize("var t = 0; for (var i = 0; i < 10; i = i + 1) { t = t + i; } print(t);")
+        self.assertIn("FOR_RANGE i, 0, 10, 1 GOTO L2", ir_text)
+        self.assertEqual(optimizer.counted_loops, 1)
+        self.assertEqual(parse_ir(ir_text), parse_ir(format_ir(parse_ir(ir_text))))
+        source = "func main() { var t = 0; for (var i = 1; i <= 9; i = i + 2) { t = t + i; } print(t); }"
+        _, python_code = compile_charmeleon(source, opt_level=2)
+        self.assertIn("for i in range(1, 10, 2):", python_code)
+        self.assertEqual(self._run(python_code), "25\n")
+        # Counting down towards a bound that is only known at run time.
+        source = "func main() { var n = 0; while (n < 7) { n = n + 2; } var k = 10; while (k >= n) { print(k); k = k - 3; } }"
+        _, python_code = compile_charmeleon(source, opt_level=2)
+        self.assertIn("for k in range(10, t", python_code)
+        self.assertEqual(self._run(python_code), "10\n")
+
+    def test_products_of_counter_iterate_the_range(self):
+        ir_text, optimizer = self._optimize("for (var i = 2; i < 6; i = i + 1) { print(i * 8); print(8 * i); }")
+        self.assertIn("FOR_RANGE t5, 16, 48, 8 GOTO L2", ir_text)
+        self.assertFalse([line for line in ir_text if line.startswith("BIN_OP")])
+        self.assertEqual(optimizer.reduced, 1) # i * 8 and 8 * i share a value number
+        _, python_code = compile_charmeleon("func main() { for (var i = 0; i < 3; i = i + 1) { print(i * 2); print(i); } }", opt_level=2)
+        self.assertIn("for i in range(3):", python_code)
+        self.assertEqual(self._run(python_code), "0\n0\n2\n1\n4\n2\n")
+
+    def test_branches_inside_counted_loops(self):
+        source = ("func main() { for (var i = 0; i < 3; i = i + 1) { if (i > 1) { print(1); } else { print(2); } "
+                  "if (i > 0) { for (var j = 0; j < i; j = j + 1) { print(j); } } } }")
+        for level in (0, 1, 2):
+            _, python_code = compile_charmeleon(source, opt_level=level)
+            self.assertEqual(self._run(python_code), "2\n2\n0\n1\n0\n1\n", level)
+            self.assertEqual(self._run(compile_code(source, opt_level=level)[1]), "2\n2\n0\n1\n0\n1\n", level)
+        self.assertIn("for i in range(3):\n        if i > 1:\n            print(1)\n        else:\n            print(2)",
+                      python_code)
+
+    def test_unsafe_loops_stay_while(self):
+        for body in ("var i = 0; while (i < 5) { i = i + 1; } print(i);",
+                     "for (var i = 0; i < 5; i = i + 1) { i = i + 1; print(i); }",
+                     "var n = 3; var i = 0; while (i < n) { print(i); i = i + 1; n = n - 1; }",
+                     "var i = 0.5; while (i < 2.5) { print(i); i = i + 1.0; }"):
+            ir_text, optimizer = self._optimize(body)
+            self.assertEqual(optimizer.counted_loops, 0, body)
+
+class TestSSA(unittest.TestCase):
+
+    def _run(self, body):
+        python_code = CodeGenerator([Instr(FUNC, label="main"), *body, Instr(END_FUNC, label="main")]).gen()
+        return TestInductionVariables._run(self, python_code)
+
+    def test_construction_places_phis_and_round_trips(self):
+        source = ("var a = 1; var b = 2; var k = 0; while (k < 3) { var t = a; a = b; b = t; k = k + 1; } "
+                  "if (a > b) { a = a - b; } else { a = b; } print(a); print(b);")
+        body = IRGenerator().generate(Parser(Lexer(f"func main() {{ {source} }}").tokenize_stream()).parse())[1:-1]
+        cfg = build_cfg(body)
+        origins = construct_ssa(cfg)
+        ssa_text = format_ir(cfg.instructions())
+        self.assertIn("PHI a.2, a.1, a.3", ssa_text)
+        self.assertIn("PHI a.6, a.4, a.5", ssa_text)
+        self.assertNotIn("PHI t", ssa_text) # t never lives across the loop header
+        self.assertEqual(parse_ir(ssa_text), cfg.instructions())
+        self.assertEqual(origins[Var("a.6")], Var("a"))
+        # Nothing interferes, so every version goes back to its variable.
+        self.assertEqual(destruct_ssa(cfg, origins, None), body)
+
+    def test_destruction_keeps_swaps_and_overlapping_versions_apart(self):
+        origins = {Var(f"{name}.{n}"): Var(name) for name in "abkx" for n in (1, 2, 3)}
+        # The PHIs of the loop header swap a and b on every iteration.
+        swap = parse_ir(["ASSIGN a.1, 1", "ASSIGN b.1, 2", "ASSIGN k.1, 0", "L1:", "PHI a.2, a.1, b.2",
+                         "PHI b.2, b.1, a.2", "PHI k.2, k.1, k.3", "BIN_OP t1, k.2, <, 3", "IF_FALSE t1 GOTO L2",
+                         "BIN_OP k.3, k.2, +, 1", "GOTO L1", "L2:", "PRINT a.2", "PRINT b.2"])
+        self.assertEqual(self._run(destruct_ssa(build_cfg(swap), origins, None)), "2\n1\n")
+        # x.2 is still read after x.3 is written: they need two variables.
+        overlap = parse_ir(["ASSIGN x.1, 0", "L1:", "PHI x.2, x.1, x.3", "BIN_OP t1, x.2, <, 3",
+                            "IF_FALSE t1 GOTO L2", "BIN_OP x.3, x.2, +, 1", "PRINT x.2", "GOTO L1", "L2:", "PRINT x.2"])
+        body = destruct_ssa(build_cfg(overlap), origins, None)
+        self.assertIn("BIN_OP x_1, x, +, 1", format_ir(body))
+        self.assertEqual(self._run(body), "0\n1\n2\n3\n")
+
+    def test_fallthrough_copies_precede_split_edges(self):
+        # L1 is entered by a jump on `a` (an edge that gets split) and by
+        # falling through the test on `b`; x.1 is still read after the PHI, so
+        # not every version coalesces into x. The fallthrough copies go before
+        # the split edge's block, not after the GOTO that skips it.
+        origins = {Var(f"x.{n}"): Var("x") for n in (1, 2, 3)}
+        ir_code = parse_ir(["ASSIGN a, 1", "ASSIGN b, 1", "ASSIGN x.1, 1", "IF_FALSE a GOTO L1", "ASSIGN x.2, 2",
+                            "IF_FALSE b GOTO L2", "L1:", "PHI x.3, x.1, x.2", "PRINT x.3", "PRINT x.1", "L2:"])
+        labels = iter(("L3", "L4"))
+        body = format_ir(destruct_ssa(build_cfg(ir_code), origins, lambda: next(labels)))
+        self.assertEqual(body[3:10], ["IF_FALSE a GOTO L3", "ASSIGN x_1, 2", "IF_FALSE b GOTO L2", "GOTO L1",
+                                      "L3:", "ASSIGN x_1, x", "GOTO L1"])
+        self.assertEqual(self._run(parse_ir(body)), "2\n1\n")
+
+    def test_dead_cycles_removed_at_level_2(self):
+        source = "func main() { var n = 0; for (var i = 0; i < 3; i = i + 1) { print(i); n = n + 1; } }"
+        ast = Parser(Lexer(source).tokenize_stream()).parse()
+        optimizer = Optimizer(IRGenerator().generate(ast))
+        ir_text = format_ir(optimizer.optimize(2))
+        self.assertFalse([line for line in ir_text if " n" in line])
+        self.assertEqual(optimizer.ssa_removed, 4) # both initializations, n + 1 and its copy
+        _, python_code = compile_charmeleon(source, opt_level=2)
+        self.assertNotIn("n = ", python_code)
+        self.assertEqual(TestInductionVariables._run(self, python_code), "0\n1\n2\n")
+        # Liveness alone keeps the counter: it reads itself.
+        self.assertIn("n = n + 1", compile_charmeleon(source, opt_level=1)[1])
+
+class TestASTBackend(unittest.TestCase):
+
+    SOURCE = ("func main() { var x = 10; if (x > 5) { print(x); } else { print(0); } "
+              "var i = 0; while (i < 3) { print(i * 2); i = i + 1; } }")
+
+    def _run(self, code):
+        namespace = {}
+        exec(code, namespace)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            namespace["main"]()
+        return stdout.getvalue()
+
+    def test_module_matches_text_backend(self):
+        for level in (0, 1, 2):
+            _, python_code = compile_charmeleon(self.SOURCE, opt_level=level)
+            ir_code = IRGenerator().generate(Parser(Lexer(self.SOURCE).tokenize_stream()).parse())
+            module = ASTCodeGenerator(Optimizer(ir_code).optimize(level)).gen()
+            parsed = pyast.parse(python_code)
+            self.assertEqual(pyast.unparse(module), pyast.unparse(parsed))
+            self.assertEqual([(node.lineno, node.col_offset) for node in pyast.walk(module) if isinstance(node, pyast.stmt)],
+                             [(node.lineno, node.col_offset) for node in pyast.walk(parsed) if isinstance(node, pyast.stmt)])
+
+    def test_compile_code_runs_in_process(self):
+        _, code = compile_code(self.SOURCE, "programa.py")
+        self.assertEqual(code.co_filename, "programa.py")
+        self.assertEqual(self._run(code), "10\n0\n2\n4\n")
+
+    def test_tracebacks_point_at_generated_lines(self):
+        source = "func main() { var a = 1; var b = 0; print(a); print(a / b); }"
+        _, python_code = compile_charmeleon(source, opt_level=0)
+        _, code = compile_code(source, "programa.py", opt_level=0)
+        try:
+            self._run(code)
+            self.fail("ZeroDivisionError esperado")
+        except ZeroDivisionError as error:
+            frames = [frame for frame in traceback.extract_tb(error.__traceback__) if frame.filename == "programa.py"]
+        line = frames[-1].lineno
+        self.assertIn("a / b", python_code.splitlines()[line - 1])
+
+class TestTaintAnalysis(unittest.TestCase):
+
+    def _findings(self, source_code):
+        ast = Parser(Lexer(source_code).tokenize_stream()).parse()
+        return [(v["type"], v["message"]) for v in SASTAnalyzer().analyze(ast)]
+
+    def test_nested_concatenation_reaches_sink(self):
+        findings = self._findings('func handler(id: string) { var q = "a" + id + "b"; var r = q + "c"; print(r); return r; }')
+        self.assertEqual([kind for kind, _ in findings], ["PotentialInjection", "PotentialInjection"])
+        self.assertIn("('id')", findings[0][1])
+        # The original end-to-end example: input named as such, not a parameter.
+        findings = self._findings('func main() { var user_input = "admin"; '
+                                  'var query = "SELECT * FROM users WHERE name = \'" + user_input + "\'"; print(query); }')
+        self.assertEqual([kind for kind, _ in findings], ["PotentialInjection"])
+        # Single-quoted literals are strings too.
+        findings = self._findings("func main() { var user_input = \"admin\"; var query = 'SELECT ' + user_input; print(query); }")
+        self.assertEqual([kind for kind, _ in findings], ["PotentialInjection"])
+        self.assertIn("('user_input')", findings[0][1])
+
+    def test_untainted_prints_are_not_flagged(self):
+        self.assertEqual(self._findings('func main() { var x = 1; var nome = "a"; print(x); print("oi, " + nome); }'), [])
+        # Concatenation alone is not a finding until the string reaches a sink.
+        self.assertEqual(self._findings('func f(id: string) { var q = "a" + id; print(id); }'), [])
+
+    def test_flows_through_branches_and_loops(self):
+        source = ('func main(n: int) { var token = "t"; var out = ""; var i = 0; '
+                  'while (i < n) { if (i > 2) { out = out + token; } i = i + 1; } print(out); print(i); }')
+        findings = self._findings(source)
+        self.assertEqual(findings, [("SensitiveDataExposure",
+                                     "Potencial exposição de dados sensíveis: valor derivado de 'token' sendo impresso.")])
+
+    def test_sanitizers_clear_taint(self):
+        self.assertEqual(self._findings('func f(id: string) { var safe_id = id; print("a" + safe_id); }'), [])
+        self.assertEqual(self._findings('func f(senha: string) { var ok = senha > "x"; print(ok); }'), [])
+
+class TestIncremental(unittest.TestCase):
+
+    FUNCTIONS = [
+        "func soma(a: int, b: int) -> int { var t = a + b; return t * 2; }",
+        'func main() { var senha = "x"; var i = 0; while (i < 3) { print(i * 2); i = i + 1; } print(senha); }',
+        "func fim() { var x = 1.5; if (x > 1.0) { print(x); } }",
+    ]
+
+    def test_matches_per_function_compilation(self):
+        compiler = IncrementalCompiler()
+        source = "\n\n".join(self.FUNCTIONS)
+        sast_report, python_code = compiler.compile(source)
+        self.assertEqual(python_code, "\n".join(compile_charmeleon(function)[1] for function in self.FUNCTIONS))
+        self.assertEqual(sast_report, compile_charmeleon(source)[0])
+        self.assertIn("SensitiveDataExposure", sast_report)
+        self.assertEqual((compiler.parsed, compiler.analyzed, compiler.reused), (3, 3, 0))
+        # Only the edited function is redone; comments between functions are
+        # not part of any unit.
+        edited = source.replace("i < 3", "i < 4").replace("\n\nfunc fim", "\n// fim\nfunc fim")
+        _, python_code = compiler.compile(edited)
+        self.assertEqual((compiler.parsed, compiler.analyzed, compiler.reused), (1, 1, 2))
+        functions = [function.replace("i < 3", "i < 4") for function in self.FUNCTIONS]
+        self.assertEqual(python_code, "\n".join(compile_charmeleon(function)[1] for function in functions))
+        self.assertIn("in range(0, 8, 2):", IncrementalCompiler(2).compile(edited)[1])
+
+    def test_dependents_are_analyzed_again(self):
+        compiler = IncrementalCompiler()
+        source = "func f() { print(1); } func main() { print(f); }"
+        compiler.compile(source)
+        with self.assertRaises(Exception) as error:
+            compiler.compile(source.replace("func f(", "func g("))
+        self.assertEqual(str(error.exception), "linha 1, coluna 44: Erro semântico: Variável 'f' não declarada.")
+        with self.assertRaises(Exception) as error:
+            compiler.compile(source.replace("print(1)", "print(2)") + " func f() { }")
+        self.assertIn("'f' já declarado", str(error.exception))
+        # A failed compilation keeps the units of the last good one.
+        compiler.compile(source)
+        self.assertEqual((compiler.parsed, compiler.analyzed, compiler.reused), (0, 0, 2))
+
+    def test_tokens_are_relexed(self):
+        compiler = IncrementalCompiler()
+        source = "\n\n".join(self.FUNCTIONS)
+        compiler.compile(source)
+        tokens = compiler.tokens
+        edited = source.replace("t * 2", "t * 20")
+        self.assertEqual(source_edit(source, edited), (source.index("2;") + 1, 0, "0"))
+        _, python_code = compiler.compile(edited)
+        self.assertIs(compiler.tokens, tokens)
+        self.assertEqual(list(tokens), Lexer(edited).tokenize())
+        self.assertIn("t * 20", python_code)
+
+class TestDiagnostics(unittest.TestCase):
+
+    SOURCE = (
+        "func soma(a: int) -> int {\n"
+        "    var t = a + ;\n"
+        "    return t;\n"
+        "}\n"
+        "func main() {\n"
+        "    var s = \"a\" * 2;\n"
+        "    print(z + 1);\n"
+        "}\n"
+        "func outra() {\n"
+        "    var q = 1\n"
+        "    print(1 @ q);\n"
+        "}\n"
+    )
+    EXPECTED = [
+        (2, 17, "Fator inesperado"),
+        (6, 17, "Operação aritmética inválida entre string e int"),
+        (7, 11, "Variável 'z' não declarada"),
+        (11, 5, "Esperado DELIMITER (valor: ;)"),
+        (11, 13, "Caractere inesperado: @"),
+        (11, 15, "Esperado DELIMITER (valor: ))"),
+    ]
+
+    def _diagnostics(self, source_code, **kwargs):
+        with self.assertRaises(CompileError) as error:
+            compile_charmeleon(source_code, **kwargs)
+        return error.exception.diagnostics
+
+    def _assert_expected(self, diagnostics):
+        self.assertEqual(len(diagnostics), len(self.EXPECTED))
+        for diagnostic, (line, column, message) in zip(diagnostics, self.EXPECTED):
+            self.assertEqual((diagnostic.line, diagnostic.column), (line, column))
+            self.assertIn(message, diagnostic.message)
+
+    def test_all_errors_reported_in_one_compile(self):
+        for fused in (False, True):
+            self._assert_expected(self._diagnostics(self.SOURCE, fused=fused))
+        # A lexical error is reported and skipped too.
+        diagnostics = self._diagnostics("func f() {\n    print(1 $ 2);\n}\nfunc main() { print(y); }")
+        self.assertEqual([(d.line, d.column) for d in diagnostics], [(2, 13), (2, 15), (4, 21)])
+        self.assertEqual(diagnostics[0].message, "Caractere inesperado: $")
+
+    def test_streaming_input_is_located(self):
+        chunks = [self.SOURCE[i:i + 7] for i in range(0, len(self.SOURCE), 7)]
+        self._assert_expected(self._diagnostics(iter(chunks)))
+
+    def test_errors_do_not_cascade(self):
+        # An undeclared name is reported where it is used; the expressions and
+        # conditions built on it are not reported again.
+        diagnostics = self._diagnostics("func main() { var s = y * 2; if (y + 1) { print(s + 1); } }")
+        self.assertEqual([str(d) for d in diagnostics], [
+            "linha 1, coluna 23: Erro semântico: Variável 'y' não declarada.",
+            "linha 1, coluna 34: Erro semântico: Variável 'y' não declarada.",
+        ])
+
+    def test_parser_recovers_at_statements(self):
+        source = "func f() { var = 1; print(2); }\nfunc main() { print(3) }\nfunc g() { }"
+        # Without a Diagnostics the first error is raised, as before.
+        with self.assertRaises(Exception) as error:
+            Parser(Lexer(source).tokenize_stream()).parse()
+        self.assertNotIsInstance(error.exception, CompileError)
+        diagnostics = Diagnostics(lambda offset: source_location(source, offset))
+        ast = Parser(Lexer(source).tokenize_stream(), diagnostics).parse()
+        self.assertEqual([(d.line, d.column) for d in diagnostics], [(1, 16), (2, 24)])
+        # Every function is kept; one with errors only by its signature.
+        self.assertEqual([node.value for node in ast.children], ["f", "main", "g"])
+        self.assertEqual(ast.children[0].body.children, [])
+
+    def test_incremental_errors_are_located_in_the_new_source(self):
+        compiler = IncrementalCompiler()
+        compiler.compile("func f() { }\nfunc main() { print(f); }")
+        with self.assertRaises(CompileError) as error:
+            compiler.compile("func g() { print(1); }\n\nfunc main() { print(f); }")
+        # main is analyzed again from the AST parsed at its old position.
+        self.assertEqual((compiler.parsed, compiler.analyzed), (1, 2))
+        self.assertEqual(str(error.exception), "linha 3, coluna 21: Erro semântico: Variável 'f' não declarada.")
+        _, python_code = compiler.compile("func g() { }\n\nfunc main() { print(g); }")
+        self.assertIn("print(g)", python_code)
+
+class TestImportHook(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        sys.path.insert(0, self.root)
+        install()
+        patcher = mock.patch("sys.dont_write_bytecode", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        uninstall()
+        sys.path.remove(self.root)
+        sys.modules.pop("modulo_charmeleon", None)
+        shutil.rmtree(self.root)
+
+    def _write(self, body, mtime_ns=None):
+        path = os.path.join(self.root, "modulo_charmeleon.charmeleon")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"func main() {{ {body} }}")
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def _import_and_run(self):
+        sys.modules.pop("modulo_charmeleon", None)
+        module = importlib.import_module("modulo_charmeleon")
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            module.main()
+        return module, stdout.getvalue()
+
+    def test_import_compiles_then_uses_cache(self):
+        path = self._write("print(1);", 10**18)
+        module, output = self._import_and_run()
+        self.assertEqual(output, "1\n")
+        self.assertEqual(module.__file__, path)
+        self.assertIn("Nenhuma vulnerabilidade", module.__sast__)
+        self.assertTrue(os.path.exists(cache_path(path)))
+        with mock.patch("import_hook.compile_code", side_effect=AssertionError("recompilou")):
+            self.assertEqual(self._import_and_run()[1], "1\n")
+            # Same contents with a new mtime: the hash still matches.
+            self._write("print(1);", 2 * 10**18)
+            self.assertEqual(self._import_and_run()[1], "1\n")
+        self._write("print(2);", 3 * 10**18)
+        self.assertEqual(self._import_and_run()[1], "2\n")
+
+    def test_compile_errors_raise_import_error(self):
+        self._write("print(y);")
+        with self.assertRaises(ImportError) as raised:
+            importlib.import_module("modulo_charmeleon")
+        self.assertIn("Variável 'y' não declarada", str(raised.exception))
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,49 @@
+from itertools import count
+
+from ir import ASSIGN, BIN_OP, Instr
+
+# Operators whose operands may be swapped whatever their types. `+` is not
+# one of them: it also concatenates strings.
+COMMUTATIVE_OPERATORS = frozenset(("*", "==", "!="))
+
+
+def number_values(block):
+    # Local value numbering over one basic block. A BIN_OP whose operator and
+    # operand value numbers were already computed into a name that still holds
+    # that value becomes a copy of that name. Returns the number of BIN_OPs
+    # replaced.
+    numbers = {}
+    available = {}
+    fresh = count()
+    replaced = 0
+    out = []
+
+    def number(operand):
+        value = numbers.get(operand)
+        if value is None:
+            value = numbers[operand] = next(fresh)
+        return value
+
+    for instr in block.instrs:
+        op = instr.op
+        if op == BIN_OP:
+            left, right = number(instr.args[0]), number(instr.args[1])
+            if instr.operator in COMMUTATIVE_OPERATORS and left > right:
+                left, right = right, left
+            key = (instr.operator, left, right)
+            holder = available.get(key)
+            if holder is not None and numbers.get(holder[0]) == holder[1]:
+                numbers[instr.dest] = holder[1]
+                out.append(Instr(ASSIGN, instr.dest, (holder[0],)))
+                replaced += 1
+                continue
+            value = numbers[instr.dest] = next(fresh)
+            available[key] = (instr.dest, value)
+        elif op == ASSIGN:
+            numbers[instr.dest] = number(instr.args[0])
+        elif instr.dest is not None:
+            numbers[instr.dest] = next(fresh)
+        out.append(instr)
+    if replaced:
+        block.instrs = out
+    return replaced